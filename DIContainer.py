@@ -7,6 +7,10 @@ from dependency_injector import containers, providers
 
 from candidates.repos import CandidateRepo
 from candidates.services import CandidateServices
+from core.cache import LRUCache
+from core.common_repos import max_time_ms_from_settings, read_preferences_from_settings
+from core.settings import Settings
+from core.single_flight import SingleFlight
 from users.repos import UserRepo
 from users.services import UserServices
 
@@ -18,11 +22,38 @@ class DIContainer(containers.DeclarativeContainer):
     then we can inject them to any function or method to use them.
     """
 
+    settings = providers.Singleton(Settings)
     user_repo = providers.Singleton(UserRepo)
-    candidate_repo = providers.Singleton(CandidateRepo)
+    candidate_repo = providers.Singleton(
+        CandidateRepo,
+        read_preferences=providers.Callable(read_preferences_from_settings, settings),
+        max_time_ms=providers.Callable(max_time_ms_from_settings, settings),
+    )
+    facets_cache = providers.Singleton(
+        LRUCache,
+        max_size=settings.provided.FACETS_CACHE_MAX_SIZE,
+        ttl=settings.provided.FACETS_CACHE_TTL_SECONDS,
+    )
+    candidate_cache = providers.Singleton(
+        LRUCache,
+        max_size=settings.provided.CANDIDATE_CACHE_MAX_SIZE,
+        ttl=settings.provided.CANDIDATE_CACHE_TTL_SECONDS,
+    )
+    listing_cache = providers.Singleton(
+        LRUCache,
+        max_size=settings.provided.LISTING_CACHE_MAX_SIZE,
+        ttl=settings.provided.LISTING_CACHE_TTL_SECONDS,
+        max_bytes=settings.provided.LISTING_CACHE_MAX_BYTES,
+    )
+    single_flight = providers.Singleton(SingleFlight)
     candidate_services = providers.Singleton(
         CandidateServices,
         candidate_repo=candidate_repo,
+        facets_cache=facets_cache,
+        candidate_cache=candidate_cache,
+        listing_cache=listing_cache,
+        single_flight=single_flight,
+        not_found_ttl=settings.provided.CANDIDATE_CACHE_NOT_FOUND_TTL_SECONDS,
     )
     user_services = providers.Singleton(
         UserServices,
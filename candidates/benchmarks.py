@@ -0,0 +1,248 @@
+"""A module to benchmark candidate queries on a synthetic dataset.
+
+The dataset is written to its own collection, so the benchmarks
+never touch the candidates collection.
+"""
+import json
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Iterator
+from uuid import uuid4
+
+import pydantic_core
+from beanie import init_beanie
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+
+from candidates.models import Candidate
+from candidates.schemas import CandidatesPage, CareerLevel, Countries, DegreeType, Gender, JobMajor
+from candidates.services import CANDIDATE_PROJECTION
+from core.explain import ExplainSummary, explain_find
+
+BENCHMARK_COLLECTION = "candidates_benchmark"
+
+FIRST_NAMES = ["Ahmad", "Sara", "Omar", "Lina", "John", "Emma", "Yuki", "Li", "Pierre", "Anna", "Karim", "Maya"]
+LAST_NAMES = ["Almohammad", "Smith", "Haddad", "Tanaka", "Wang", "Dubois", "Muller", "Brown", "Khalil", "Garcia"]
+CITIES = ["Amman", "Irbid", "London", "Paris", "Berlin", "Tokyo", "Beijing", "Toronto", "New York", "Lyon"]
+SKILLS = ["python", "java", "mongodb", "fastapi", "docker", "react", "sql", "go", "rust", "aws", "kubernetes", "excel"]
+
+
+@dataclass
+class QueryBenchmark:
+    """Timings and plan of one query."""
+
+    name: str
+    median_ms: float
+    matched: int
+    plan: ExplainSummary
+
+
+@dataclass
+class ThroughputBenchmark:
+    """Timings of one way of serving a page."""
+
+    name: str
+    median_ms: float
+    docs_per_second: float
+
+
+def legacy_keyword_filter(keyword: str) -> dict[str, Any]:
+    """The keyword criteria that was used before the text index, kept to compare against.
+
+    Args:
+        keyword (str): keyword to search for.
+
+    Returns:
+        dict[str, Any]: $or of case insensitive regexes over every candidate field.
+    """
+    fields = [
+        "first_name",
+        "last_name",
+        "email",
+        "career_level",
+        "job_major",
+        "years_of_experience",
+        "degree_type",
+        "skills",
+        "nationality",
+        "city",
+        "salary",
+        "gender",
+    ]
+    return {"$or": [{field: {"$regex": keyword, "$options": "i"}} for field in fields]}
+
+
+def generate_candidates(count: int, seed: int = 0) -> Iterator[dict[str, Any]]:
+    """Generate random candidate documents.
+
+    Args:
+        count (int): number of documents to generate.
+        seed (int): random seed, the same seed generates the same dataset.
+
+    Yields:
+        dict[str, Any]: raw candidate document.
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        yield {
+            "uuid": Binary.from_uuid(uuid4()),
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": f"{first_name}.{last_name}.{index}@example.com".lower(),
+            "career_level": rng.choice(list(CareerLevel)).value,
+            "job_major": rng.choice(list(JobMajor)).value,
+            "years_of_experience": rng.randint(0, 30),
+            "degree_type": rng.choice(list(DegreeType)).value,
+            "skills": rng.sample(SKILLS, rng.randint(1, 4)),
+            "nationality": rng.choice(list(Countries)).value,
+            "city": rng.choice(CITIES),
+            "salary": float(rng.randrange(300, 10000, 50)),
+            "gender": rng.choice(list(Gender)).value,
+        }
+
+
+async def seed_collection(collection: AsyncIOMotorCollection, count: int, batch_size: int = 10000) -> None:
+    """Fill the collection with generated candidates and build the candidate indexes.
+
+    Nothing is inserted if the collection already has enough documents.
+
+    Args:
+        collection (AsyncIOMotorCollection): benchmark collection.
+        count (int): number of documents the collection should have.
+        batch_size (int): number of documents per insert_many.
+    """
+    existing = await collection.estimated_document_count()
+    if existing < count:
+        batch: list[dict[str, Any]] = []
+        for document in generate_candidates(count - existing, seed=existing):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                await collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            await collection.insert_many(batch, ordered=False)
+    await collection.create_indexes(Candidate.Settings.indexes)
+
+
+async def time_query(
+    collection: AsyncIOMotorCollection,
+    name: str,
+    filters: dict[str, Any],
+    runs: int,
+) -> QueryBenchmark:
+    """Time fetching the _id of every document matching the filters.
+
+    Args:
+        collection (AsyncIOMotorCollection): collection to query.
+        name (str): label of the query.
+        filters (dict[str, Any]): A valid MongoDB search criteria.
+        runs (int): number of runs, the median is reported.
+
+    Returns:
+        QueryBenchmark: median duration, number of matches and winning plan.
+    """
+    durations = []
+    matched = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        matched = len(await collection.find(filters, {"_id": 1}).to_list(None))
+        durations.append((time.perf_counter() - start) * 1000)
+    plan = await explain_find(collection, filters)
+    return QueryBenchmark(name=name, median_ms=statistics.median(durations), matched=matched, plan=plan)
+
+
+async def benchmark_keyword_search(
+    database: AsyncIOMotorDatabase,
+    keyword: str,
+    documents: int = 1_000_000,
+    runs: int = 5,
+) -> list[QueryBenchmark]:
+    """Compare the legacy regex keyword search with the text index search.
+
+    Args:
+        database (AsyncIOMotorDatabase): database to create the benchmark collection in.
+        keyword (str): keyword to search for.
+        documents (int): size of the dataset.
+        runs (int): number of runs per query.
+
+    Returns:
+        list[QueryBenchmark]: results of the regex query then the text query.
+    """
+    collection = database[BENCHMARK_COLLECTION]
+    await seed_collection(collection, documents)
+    return [
+        await time_query(collection, "regex", legacy_keyword_filter(keyword), runs),
+        await time_query(collection, "text", {"$text": {"$search": keyword}}, runs),
+    ]
+
+
+async def hydrated_page(collection: AsyncIOMotorCollection, page_size: int) -> bytes:
+    """Serve a page the way it was served before the raw read mode.
+
+    Beanie documents are built, then FastAPI validates them
+    into the response model and serializes the result.
+
+    Args:
+        collection (AsyncIOMotorCollection): benchmark collection.
+        page_size (int): number of candidates of the page.
+
+    Returns:
+        bytes: response body.
+    """
+    documents = await collection.find({}).sort("_id", 1).limit(page_size).to_list(None)
+    candidates = [Candidate.model_validate(document) for document in documents]
+    page = CandidatesPage.model_validate({"items": [candidate.model_dump() for candidate in candidates]})
+    return json.dumps(page.model_dump(mode="json")).encode()
+
+
+async def raw_page(collection: AsyncIOMotorCollection, page_size: int) -> bytes:
+    """Serve a page using the raw read mode.
+
+    Args:
+        collection (AsyncIOMotorCollection): benchmark collection.
+        page_size (int): number of candidates of the page.
+
+    Returns:
+        bytes: response body.
+    """
+    documents = await collection.find({}, CANDIDATE_PROJECTION).sort("_id", 1).limit(page_size).to_list(None)
+    for document in documents:
+        del document["_id"]
+    return pydantic_core.to_json({"items": documents, "next_cursor": None})
+
+
+async def benchmark_listing(
+    database: AsyncIOMotorDatabase,
+    documents: int = 100_000,
+    page_size: int = 500,
+    runs: int = 20,
+) -> list[ThroughputBenchmark]:
+    """Compare serving a listing page through beanie and pydantic with the raw read mode.
+
+    Args:
+        database (AsyncIOMotorDatabase): database to create the benchmark collection in.
+        documents (int): size of the dataset.
+        page_size (int): number of candidates per page.
+        runs (int): number of pages served per mode.
+
+    Returns:
+        list[ThroughputBenchmark]: results of the hydrated mode then the raw mode.
+    """
+    # Beanie documents can not be built before their collection is initialized.
+    await init_beanie(database=database, document_models=[Candidate])
+    collection = database[BENCHMARK_COLLECTION]
+    await seed_collection(collection, max(documents, page_size))
+    results = []
+    for name, serve in (("hydrated", hydrated_page), ("raw", raw_page)):
+        durations = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            await serve(collection, page_size)
+            durations.append(time.perf_counter() - start)
+        median = statistics.median(durations)
+        results.append(ThroughputBenchmark(name=name, median_ms=median * 1000, docs_per_second=page_size / median))
+    return results
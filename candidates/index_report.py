@@ -0,0 +1,148 @@
+"""A module that reports how the /all-candidates filter shapes use the indexes.
+
+Each filter shape is built with CandidateServices.build_filters, the same way
+the router builds it, using values of a sample candidate, then explained
+as the query of the first page, with the sort the listing uses for it.
+"""
+from dataclasses import dataclass
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING
+
+from candidates.repos import CandidateRepo
+from candidates.schemas import CandidateSort, CareerLevel, Countries, DegreeType, Gender, JobMajor
+from candidates.services import CandidateServices
+from core.explain import ExplainSummary, explain_find
+from utils.pagination import DEFAULT_PAGE_SIZE
+
+# Search terms combinations of /all-candidates to check.
+FILTER_SHAPES: list[tuple[str, ...]] = [
+    ("career_level",),
+    ("career_level", "job_major"),
+    ("job_major",),
+    ("job_major", "degree_type"),
+    ("degree_type",),
+    ("degree_type", "career_level"),
+    ("nationality",),
+    ("nationality", "city"),
+    ("city",),
+    ("skills",),
+    ("skills", "career_level"),
+    ("last_name",),
+    ("first_name", "last_name"),
+    ("email",),
+    ("gender",),
+    ("keyword",),
+    ("salary_min", "salary_max"),
+    ("career_level", "salary_min"),
+    ("experience_min",),
+    ("job_major", "experience_min", "experience_max"),
+]
+
+# Search terms combinations of /all-candidates checked with a sort.
+SORTED_SHAPES: list[tuple[tuple[str, ...], CandidateSort]] = [
+    (("career_level",), CandidateSort.salary),
+    (("career_level",), CandidateSort.salary_desc),
+    (("job_major",), CandidateSort.years_of_experience),
+    (("salary_min", "salary_max"), CandidateSort.salary),
+    (("experience_min",), CandidateSort.years_of_experience_desc),
+]
+
+# Search terms left without an index on purpose, see the Candidate indexes.
+UNINDEXED_TERMS = {"gender"}
+
+ENUM_FIELDS = {
+    "career_level": CareerLevel,
+    "job_major": JobMajor,
+    "degree_type": DegreeType,
+    "nationality": Countries,
+    "gender": Gender,
+}
+
+
+# Range search terms and the candidate field they apply to.
+RANGE_FIELDS = {
+    "salary_min": "salary",
+    "salary_max": "salary",
+    "experience_min": "years_of_experience",
+    "experience_max": "years_of_experience",
+}
+
+
+@dataclass
+class ShapeReport:
+    """Plan of one filter shape."""
+
+    shape: tuple[str, ...]
+    plan: ExplainSummary
+    sort: CandidateSort | None = None
+
+    @property
+    def unindexed_filters(self) -> bool:
+        """True if the only index scanned is _id_, none of the filtered fields narrows down the scan.
+
+        The planner picks _id_ to serve the default sort when no index matches the filters.
+        """
+        return set(self.plan.indexes) == {"_id_"} and not set(self.shape) <= UNINDEXED_TERMS
+
+
+def search_terms(shape: tuple[str, ...], sample: dict[str, Any]) -> dict[str, Any]:
+    """Build the build_filters arguments of a shape from a sample candidate.
+
+    Args:
+        shape (tuple[str, ...]): names of the search terms.
+        sample (dict[str, Any]): raw candidate document.
+
+    Returns:
+        dict[str, Any]: search terms as the router passes them.
+    """
+    terms: dict[str, Any] = {}
+    for name in shape:
+        if name in ENUM_FIELDS:
+            terms[name] = ENUM_FIELDS[name](sample[name])
+        elif name in RANGE_FIELDS:
+            terms[name] = sample[RANGE_FIELDS[name]]
+        elif name in ("skills", "keyword"):
+            terms[name] = sample["skills"][0]
+        else:
+            terms[name] = sample[name]
+    return terms
+
+
+def listing_sort(filters: dict[str, Any], sort: CandidateSort | None) -> dict[str, int] | None:
+    """Build the sort of the first page query, as CandidateServices.read_candidates_page does.
+
+    Args:
+        filters (dict[str, Any]): search criteria generated by build_filters.
+        sort (CandidateSort | None): sort order of the candidates.
+
+    Returns:
+        dict[str, int] | None: sort specification, None for a keyword search sorted by relevance.
+    """
+    if sort is None:
+        return None if "$text" in filters else {"_id": ASCENDING}
+    direction = DESCENDING if sort.descending else ASCENDING
+    return {sort.field: direction, "_id": direction}
+
+
+async def index_usage_report(collection: AsyncIOMotorCollection) -> list[ShapeReport]:
+    """Explain the first page query of every filter shape, and of the sorted ones.
+
+    Args:
+        collection (AsyncIOMotorCollection): candidates collection.
+
+    Returns:
+        list[ShapeReport]: plan of each shape, empty if the collection is empty.
+    """
+    sample = await collection.find_one()
+    if not sample:
+        return []
+    services = CandidateServices(CandidateRepo())
+    reports = []
+    shapes: list[tuple[tuple[str, ...], CandidateSort | None]] = [(shape, None) for shape in FILTER_SHAPES]
+    for shape, sort in shapes + SORTED_SHAPES:
+        filters = services.build_filters(**search_terms(shape, sample))
+        plan = await explain_find(collection, filters, listing_sort(filters, sort), DEFAULT_PAGE_SIZE + 1)
+        reports.append(ShapeReport(shape=shape, plan=plan, sort=sort))
+    return reports
@@ -1,17 +1,34 @@
 """A module that has the DB model for Candidate."""
+from datetime import datetime
+from typing import Annotated
 from uuid import UUID, uuid4
 
 from beanie import Document, Indexed
 from pydantic import EmailStr, Field
+from pymongo import ASCENDING, TEXT, IndexModel
+
+# Text fields covered by the keyword search text index.
+KEYWORD_FIELDS = (
+    "first_name",
+    "last_name",
+    "email",
+    "career_level",
+    "job_major",
+    "degree_type",
+    "skills",
+    "nationality",
+    "city",
+    "gender",
+)
 
 
 class Candidate(Document):
     """DB model to interact with Candidate collections."""
 
-    uuid: UUID = Field(default_factory=uuid4)
+    uuid: Annotated[UUID, Indexed(unique=True)] = Field(default_factory=uuid4)
     first_name: str
     last_name: str
-    email: EmailStr = Indexed(unique=True)
+    email: Annotated[EmailStr, Indexed(unique=True)]
     career_level: str
     job_major: str
     years_of_experience: int
@@ -21,11 +38,40 @@ class Candidate(Document):
     city: str
     salary: float
     gender: str
+    # Maintained by AbstractRepo on every write, revision is the source of the ETags.
+    revision: int = 0
+    updated_at: datetime | None = None
 
     class Settings:
         """Setting class."""
 
         collection = "candidates"
+        # Compound indexes for the filter combinations of /all-candidates,
+        # equality fields first then _id which is the pagination sort key.
+        # gender is left out on purpose, its three values do not narrow down the scan.
+        indexes = [
+            IndexModel([("career_level", ASCENDING), ("job_major", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("job_major", ASCENDING), ("degree_type", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("degree_type", ASCENDING), ("career_level", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("nationality", ASCENDING), ("city", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("city", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("skills", ASCENDING), ("career_level", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("last_name", ASCENDING), ("first_name", ASCENDING), ("_id", ASCENDING)]),
+            # Range filters and sorts on salary and years of experience,
+            # (field, _id) is the keyset of the sorted listing.
+            IndexModel([("salary", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("years_of_experience", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("career_level", ASCENDING), ("salary", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("job_major", ASCENDING), ("years_of_experience", ASCENDING), ("_id", ASCENDING)]),
+            # default_language "none" disables stemming and stop words,
+            # names, skills and cities have to match as they are written.
+            IndexModel(
+                [(field, TEXT) for field in KEYWORD_FIELDS],
+                name="candidate_keyword_text",
+                default_language="none",
+                weights={"first_name": 10, "last_name": 10, "email": 5, "skills": 5},
+            ),
+        ]
 
     class Config:
         """Configuration class."""
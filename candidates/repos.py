@@ -1,4 +1,6 @@
 """A module for Candidate data repository."""
+from pymongo.read_preferences import _ServerMode
+
 from candidates.models import Candidate
 from core.common_repos import AbstractRepo
 
@@ -6,6 +8,15 @@ from core.common_repos import AbstractRepo
 class CandidateRepo(AbstractRepo):
     """Data layer class to interact with Candidate model."""
 
-    def __init__(self) -> None:
-        """Class constructor."""
-        super().__init__(Candidate)
+    def __init__(
+        self,
+        read_preferences: dict[str, _ServerMode] | None = None,
+        max_time_ms: dict[str, int] | None = None,
+    ) -> None:
+        """Class constructor.
+
+        Args:
+            read_preferences (dict[str, _ServerMode] | None): read preference per kind of heavy read.
+            max_time_ms (dict[str, int] | None): server side time limit in milliseconds per kind of read.
+        """
+        super().__init__(Candidate, read_preferences=read_preferences, max_time_ms=max_time_ms)
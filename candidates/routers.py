@@ -1,17 +1,38 @@
 """A module that has the routes to interact with Candidate model."""
-from typing import Annotated
+from typing import Annotated, Any
 from uuid import UUID
 
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from pydantic import EmailStr
 
-from candidates.schemas import CandidateIn, CandidateOut, CareerLevel, Countries, DegreeType, Gender, JobMajor
-from candidates.services import CandidateServices
+from candidates.schemas import (
+    CandidateFacets,
+    CandidateIn,
+    CandidateOut,
+    CandidatesBatch,
+    CandidatesBatchIn,
+    CandidatesDeleted,
+    CandidatesImport,
+    CandidateSort,
+    CandidatesPage,
+    CandidatesUpdated,
+    CandidatesUpdateIn,
+    CareerLevel,
+    Countries,
+    DegreeType,
+    Gender,
+    JobMajor,
+)
+from candidates.services import IMPORT_FORMATS, CandidateServices
 from DIContainer import DIContainer
 from users.models import User
+from utils.disconnect import cancel_on_disconnect
+from utils.etags import etag_matches, not_modified
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.responses import ClosingStreamingResponse, RawJSONResponse
 from utils.security import get_current_user
+from utils.streams import iter_lines
 
 candidate_router = APIRouter(prefix="/candidate", tags=["candidate"])
 
@@ -19,6 +40,8 @@ all_candidate_router = APIRouter(prefix="/all-candidates", tags=["all_candidates
 
 generate_report_router = APIRouter(prefix="/generate-report", tags=["generate_report"])
 
+FIELDS_DESCRIPTION = f"Comma separated fields to return, any of: {', '.join(CandidateOut.model_fields)}."
+
 
 @candidate_router.get(
     "/{candidate_id}",
@@ -28,13 +51,25 @@ generate_report_router = APIRouter(prefix="/generate-report", tags=["generate_re
 @inject
 async def get_candidate(
     candidate_id: UUID,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
     current_user: User = Depends(get_current_user),
     candidate_services: CandidateServices = Depends(
         Provide[DIContainer.candidate_services],
     ),
 ):
-    """### Get candidate instance by uuid."""
-    return await candidate_services.get_candidate_by_uuid(candidate_id)
+    """### Get candidate instance by uuid.
+
+    #### Pass `fields` to get only some of the candidate fields.
+    #### The response has an `ETag`, send it back in `If-None-Match` to get a 304 if the candidate did not change.
+    """
+    requested_fields = candidate_services.parse_fields(fields)
+    candidate = await candidate_services.get_raw_candidate(candidate_id)
+    etag = candidate_services.candidate_etag(candidate, requested_fields)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    candidate_out = candidate_services.candidate_out(candidate, requested_fields)
+    return RawJSONResponse(candidate_out.model_dump(mode="json"), headers={"ETag": etag})
 
 
 @candidate_router.post(
@@ -54,6 +89,68 @@ async def create_candidate(
     return await candidate_services.create(candidate)
 
 
+@candidate_router.post(
+    "/batch",
+    response_model=CandidatesBatch,
+    status_code=status.HTTP_200_OK,
+)
+@inject
+async def get_candidates_batch(
+    batch: CandidatesBatchIn,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+    current_user: User = Depends(get_current_user),
+    candidate_services: CandidateServices = Depends(
+        Provide[DIContainer.candidate_services],
+    ),
+):
+    """### Get the candidate instances of a list of uuids.
+
+    #### Candidates are returned in the order of the uuids, the uuids that do not exist are listed in `missing`.
+    #### Pass `fields` to get only some of the candidates fields.
+    """
+    requested_fields = candidate_services.parse_fields(fields)
+    result = await candidate_services.get_candidates_by_uuids(batch.uuids, requested_fields)
+    return RawJSONResponse(result)
+
+
+@candidate_router.post(
+    "/import",
+    response_model=CandidatesImport,
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string", "format": "binary"}},
+                "application/x-ndjson": {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
+)
+@inject
+async def import_candidates(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    candidate_services: CandidateServices = Depends(
+        Provide[DIContainer.candidate_services],
+    ),
+):
+    """### Create candidates in bulk from a CSV or NDJSON file.
+
+    #### The CSV file has the columns of `/generate-report`, the NDJSON file has one candidate per line.
+    #### The file is sent as the request body and is read while it is uploaded.
+    #### Invalid lines and duplicate emails are reported per line, the other candidates are inserted.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    file_format = IMPORT_FORMATS.get(content_type)
+    if not file_format:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content type must be one of: {', '.join(IMPORT_FORMATS)}.",
+        )
+    return await candidate_services.import_candidates(iter_lines(request.stream()), file_format)
+
+
 @candidate_router.put(
     "/{candidate_id}",
     response_model=CandidateOut,
@@ -92,13 +189,8 @@ async def delete_candidate(
     return await candidate_services.delete_candidate_by_uuid(candidate_id)
 
 
-@all_candidate_router.get(
-    "/",
-    response_model=list[CandidateOut],
-    status_code=status.HTTP_200_OK,
-)
 @inject
-async def get_all_candidates(
+def get_candidate_filters(
     first_name: Annotated[str | None, Query(min_length=2, max_length=50)] = None,
     last_name: Annotated[str | None, Query(min_length=2, max_length=50)] = None,
     email: EmailStr | None = None,
@@ -112,16 +204,19 @@ async def get_all_candidates(
     salary: Annotated[float | None, Query(ge=0)] = None,
     gender: Gender | None = None,
     keyword: str | None = None,
-    current_user: User = Depends(get_current_user),
+    salary_min: Annotated[float | None, Query(ge=0)] = None,
+    salary_max: Annotated[float | None, Query(ge=0)] = None,
+    experience_min: Annotated[int | None, Query(ge=0)] = None,
+    experience_max: Annotated[int | None, Query(ge=0)] = None,
     candidate_services: CandidateServices = Depends(
         Provide[DIContainer.candidate_services],
     ),
-):
-    """### Get all candidates.
+) -> dict[str, Any]:
+    """Dependency that builds the search criteria from the candidates search query parameters.
 
-    #### Search criteria is using and condition between search terms.
+    Search criteria is using and condition between search terms.
     """
-    return await candidate_services.get_all_candidates(
+    return candidate_services.build_filters(
         first_name,
         last_name,
         email,
@@ -135,7 +230,120 @@ async def get_all_candidates(
         salary,
         gender,
         keyword,
+        salary_min=salary_min,
+        salary_max=salary_max,
+        experience_min=experience_min,
+        experience_max=experience_max,
+    )
+
+
+@all_candidate_router.get(
+    "/",
+    response_model=CandidatesPage,
+    status_code=status.HTTP_200_OK,
+)
+@inject
+async def get_all_candidates(
+    request: Request,
+    filters: Annotated[dict[str, Any], Depends(get_candidate_filters)],
+    sort: CandidateSort | None = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    current_user: User = Depends(get_current_user),
+    candidate_services: CandidateServices = Depends(
+        Provide[DIContainer.candidate_services],
+    ),
+):
+    """### Get all candidates.
+
+    #### Search criteria is using and condition between search terms.
+    #### Results are paginated, pass the returned `next_cursor` as `cursor` to get the next page.
+    #### Pass `fields` to get only some of the candidates fields.
+    #### `sort` orders by salary or years of experience, prefix it with `-` for descending order,
+    #### keyword searches without `sort` are ordered by relevance.
+    #### The response has an `ETag` that changes whenever the page changes,
+    #### send it back in `If-None-Match` to get a 304 if nothing changed.
+    #### The search is stopped if the client disconnects before it is done.
+    """
+    requested_fields = candidate_services.parse_fields(fields)
+    page, etag = await cancel_on_disconnect(
+        request,
+        candidate_services.get_all_candidates(filters, limit, cursor, requested_fields, sort),
     )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return RawJSONResponse(page, headers={"ETag": etag})
+
+
+@all_candidate_router.patch(
+    "/",
+    response_model=CandidatesUpdated,
+    status_code=status.HTTP_200_OK,
+)
+@inject
+async def update_candidates(
+    filters: Annotated[dict[str, Any], Depends(get_candidate_filters)],
+    candidates_update: CandidatesUpdateIn,
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_user),
+    candidate_services: CandidateServices = Depends(
+        Provide[DIContainer.candidate_services],
+    ),
+):
+    """### Update all the candidates matching the search criteria.
+
+    #### Takes the same search criteria as `/all-candidates`, at least one search term is required.
+    #### Only the fields in the body are set, email can not be updated in bulk.
+    #### Pass `dry_run=true` to only count the matching candidates.
+    """
+    return await candidate_services.update_candidates(filters, candidates_update, dry_run)
+
+
+@all_candidate_router.delete(
+    "/",
+    response_model=CandidatesDeleted,
+    status_code=status.HTTP_200_OK,
+)
+@inject
+async def delete_candidates(
+    filters: Annotated[dict[str, Any], Depends(get_candidate_filters)],
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_user),
+    candidate_services: CandidateServices = Depends(
+        Provide[DIContainer.candidate_services],
+    ),
+):
+    """### Delete all the candidates matching the search criteria.
+
+    #### Takes the same search criteria as `/all-candidates`, at least one search term is required.
+    #### Pass `dry_run=true` to only count the matching candidates.
+    """
+    return await candidate_services.delete_candidates(filters, dry_run)
+
+
+@all_candidate_router.get(
+    "/facets",
+    response_model=CandidateFacets,
+    status_code=status.HTTP_200_OK,
+)
+@inject
+async def get_candidates_facets(
+    request: Request,
+    filters: Annotated[dict[str, Any], Depends(get_candidate_filters)],
+    current_user: User = Depends(get_current_user),
+    candidate_services: CandidateServices = Depends(
+        Provide[DIContainer.candidate_services],
+    ),
+):
+    """### Count the candidates matching the search criteria per value of the filterable fields.
+
+    #### Counts are grouped by career level, job major, degree type, nationality and gender.
+    #### Takes the same search criteria as `/all-candidates`.
+    #### The counts are stopped if the client disconnects before they are done.
+    """
+    return await cancel_on_disconnect(request, candidate_services.get_facets(filters))
 
 
 @generate_report_router.get(
@@ -154,10 +362,13 @@ async def generate_candidates_report(
         Provide[DIContainer.candidate_services],
     ),
 ):
-    """### Generate A CSV file with all candidate data."""
-    csv_file = await candidate_services.generate_csv_file_with_all_candidates()
-    return StreamingResponse(
-        csv_file,
+    """### Generate A CSV file with all candidate data.
+
+    #### The file is streamed while the candidates are read from the database,
+    #### the read stops if the client disconnects.
+    """
+    return ClosingStreamingResponse(
+        candidate_services.generate_csv_file_with_all_candidates(),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=candidates.csv"},
     )
@@ -1,8 +1,11 @@
 """A module that contains Candidate's data pydantic schemas."""
 from enum import Enum
+from functools import lru_cache
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, create_model
+
+from utils.pagination import MAX_PAGE_SIZE
 
 
 class CareerLevel(str, Enum):
@@ -71,6 +74,28 @@ class Gender(str, Enum):
     ns = "Not Specified"
 
 
+class CandidateSort(str, Enum):
+    """Enum for the sort orders of candidates listing.
+
+    A leading '-' sorts in descending order.
+    """
+
+    salary = "salary"
+    salary_desc = "-salary"
+    years_of_experience = "years_of_experience"
+    years_of_experience_desc = "-years_of_experience"
+
+    @property
+    def field(self) -> str:
+        """Candidate field to sort by."""
+        return self.value.lstrip("-")
+
+    @property
+    def descending(self) -> bool:
+        """True if the sort is in descending order."""
+        return self.value.startswith("-")
+
+
 class Candidate(BaseModel):
     """Base class for candidate info."""
 
@@ -94,6 +119,25 @@ class CandidateIn(Candidate):
     pass
 
 
+class CandidatesUpdateIn(BaseModel):
+    """A class that represent the fields to set on all the candidates matching a search criteria.
+
+    Email is left out, it is unique so it can not be set on many candidates.
+    """
+
+    first_name: str | None = Field(None, min_length=2, max_length=50)
+    last_name: str | None = Field(None, min_length=2, max_length=50)
+    career_level: CareerLevel | None = None
+    job_major: JobMajor | None = None
+    years_of_experience: int | None = Field(None, ge=0)
+    degree_type: DegreeType | None = None
+    skills: list[str] | None = Field(None, min_items=1)
+    nationality: Countries | None = None
+    city: str | None = Field(None, min_length=2, max_length=100)
+    salary: float | None = Field(None, ge=0)
+    gender: Gender | None = None
+
+
 class CandidateOut(Candidate):
     """A class that represent the output to return for the created candidate."""
 
@@ -106,3 +150,80 @@ class CandidateOut(Candidate):
         json_encoders = {
             UUID: str,
         }
+
+
+@lru_cache(maxsize=256)
+def partial_candidate_out(fields: tuple[str, ...]) -> type[BaseModel]:
+    """Build the output model of a subset of CandidateOut fields.
+
+    Models are cached, so each subset is built once.
+
+    Args:
+        fields (tuple[str, ...]): CandidateOut fields to keep.
+
+    Returns:
+        type[BaseModel]: pydantic model with only the requested fields.
+    """
+    return create_model(
+        "PartialCandidateOut",
+        **{field: (CandidateOut.model_fields[field].annotation, ...) for field in fields},
+    )
+
+
+class CandidatesPage(BaseModel):
+    """A class that represent one page of candidates and the cursor to get the next one."""
+
+    items: list[CandidateOut]
+    next_cursor: str | None = None
+
+
+class CandidatesBatchIn(BaseModel):
+    """A class that represent the uuids of the candidates to get in one request."""
+
+    uuids: list[UUID] = Field(..., min_length=1, max_length=MAX_PAGE_SIZE)
+
+
+class CandidatesBatch(BaseModel):
+    """A class that represent the candidates found for a list of uuids and the uuids not found."""
+
+    items: list[CandidateOut]
+    missing: list[UUID]
+
+
+class CandidatesUpdated(BaseModel):
+    """A class that represent the result of a bulk update, nothing is modified in a dry run."""
+
+    matched: int
+    modified: int
+
+
+class CandidatesDeleted(BaseModel):
+    """A class that represent the result of a bulk delete, nothing is deleted in a dry run."""
+
+    matched: int
+    deleted: int
+
+
+class CandidateFacets(BaseModel):
+    """A class that represent the number of candidates per value of the filterable fields."""
+
+    career_level: dict[str, int]
+    job_major: dict[str, int]
+    degree_type: dict[str, int]
+    nationality: dict[str, int]
+    gender: dict[str, int]
+
+
+class CandidateImportError(BaseModel):
+    """A class that represent a line of an import file that was not inserted."""
+
+    line: int
+    detail: str
+
+
+class CandidatesImport(BaseModel):
+    """A class that represent the result of a candidates import."""
+
+    inserted: int
+    failed: int
+    errors: list[CandidateImportError]
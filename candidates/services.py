@@ -1,42 +1,265 @@
 """This module has the service for interacting with Candidate model."""
 import csv
 import io
-from uuid import UUID
+import json
+from contextlib import aclosing
+from typing import Any, AsyncIterator
+from uuid import UUID, uuid4
 
+import pydantic_core
+from bson import Binary, ObjectId
 from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from pymongo import ASCENDING, DESCENDING
 
 from candidates.models import Candidate
 from candidates.repos import CandidateRepo
-from candidates.schemas import CandidateIn, CareerLevel, Countries, DegreeType, Gender, JobMajor
+from candidates.schemas import (
+    CandidateIn,
+    CandidateOut,
+    CandidateSort,
+    CandidatesUpdateIn,
+    CareerLevel,
+    Countries,
+    DegreeType,
+    Gender,
+    JobMajor,
+    partial_candidate_out,
+)
+from core.cache import Cache, LRUCache, canonical_key
+from core.monitoring import SERIALIZATION, timed
+from core.single_flight import SingleFlight
+from utils.etags import content_etag, make_etag
+from utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from utils.streams import CSVRecordError, iter_csv_rows, iter_numbered_lines
+
+# Header of the CSV report and the candidate field of each column.
+CSV_COLUMNS = {
+    "UUID": "uuid",
+    "First Name": "first_name",
+    "Last Name": "last_name",
+    "Email": "email",
+    "Career Level": "career_level",
+    "Job Major": "job_major",
+    "Years Of Experience": "years_of_experience",
+    "Degree Type": "degree_type",
+    "Skills": "skills",
+    "Nationality": "nationality",
+    "City": "city",
+    "Salary": "salary",
+    "Gender": "gender",
+}
+
+# Formats accepted by the import endpoint per content type.
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# Fields counted by the facets endpoint.
+FACET_FIELDS = ["career_level", "job_major", "degree_type", "nationality", "gender"]
+
+# Default of the cache lookups, tells a missing entry from a cached unknown uuid (None).
+MISSING = object()
+
+# Fields returned by the candidate read endpoints, _id is kept for the pagination cursor.
+CANDIDATE_PROJECTION = {field: 1 for field in CandidateOut.model_fields}
 
 
 class CandidateServices:
     """Service that interact with Candidate model."""
 
-    def __init__(self, candidate_repo: CandidateRepo) -> None:
+    def __init__(
+        self,
+        candidate_repo: CandidateRepo,
+        facets_cache: Cache | None = None,
+        candidate_cache: Cache | None = None,
+        not_found_ttl: float = 5,
+        listing_cache: Cache | None = None,
+        single_flight: SingleFlight | None = None,
+    ) -> None:
         """Class constructor.
 
         Args:
             candidate_repo (CandidateRepo): instance of CandidateRepo
+            facets_cache (Cache | None): cache of the facets counts per search criteria.
+            candidate_cache (Cache | None): cache of the candidates per uuid.
+            not_found_ttl (float): time to live in seconds of the cached unknown uuids.
+            listing_cache (Cache | None): cache of the candidates pages per search criteria.
+            single_flight (SingleFlight | None): coalesces the identical reads that run at the same time.
         """
         self.repo = candidate_repo
+        self.facets_cache = LRUCache() if facets_cache is None else facets_cache
+        self.candidate_cache = LRUCache() if candidate_cache is None else candidate_cache
+        self.not_found_ttl = not_found_ttl
+        self.listing_cache = LRUCache() if listing_cache is None else listing_cache
+        self.single_flight = SingleFlight() if single_flight is None else single_flight
+        # Bumped by every write through this service, a candidate read while it changes is not cached.
+        self.generation = 0
+
+    def invalidate_caches(self) -> None:
+        """Drop the cached results that a candidate write may have changed."""
+        self.generation += 1
+        self.facets_cache.clear()
 
-    async def get_candidate_by_uuid(self, candidate_uuid: UUID) -> Candidate:
+    def parse_fields(self, fields: str | None) -> tuple[str, ...] | None:
+        """Parse the comma separated fields requested by the client.
+
+        Args:
+            fields (str | None): comma separated CandidateOut fields.
+
+        Raises:
+            HTTPException: If a field is not a CandidateOut field.
+
+        Returns:
+            tuple[str, ...] | None: requested fields in CandidateOut order, None to return all of them.
+        """
+        if not fields:
+            return None
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - CandidateOut.model_fields.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}.",
+            )
+        return tuple(field for field in CandidateOut.model_fields if field in requested) or None
+
+    def build_projection(self, fields: tuple[str, ...] | None) -> dict[str, Any]:
+        """Build the MongoDB projection of the requested fields.
+
+        Args:
+            fields (tuple[str, ...] | None): fields returned by parse_fields.
+
+        Returns:
+            dict[str, Any]: projection that keeps _id and the requested fields.
+        """
+        if not fields:
+            return CANDIDATE_PROJECTION
+        return {field: 1 for field in fields}
+
+    async def get_candidate_by_uuid(
+        self,
+        candidate_uuid: UUID,
+        fields: tuple[str, ...] | None = None,
+    ) -> BaseModel:
         """Get the candidate by uuid.
 
+        The raw candidate is read through the candidate cache, one entry per uuid
+        serves every fields selection. Unknown uuids are cached too, for not_found_ttl.
+
         Args:
             candidate_uuid (UUID): Candidate uuid.
+            fields (tuple[str, ...] | None): fields to return, all of them if None.
 
         Raises:
             HTTPException: If the user not found.
 
         Returns:
-            Candidate: An instance of Candidate model.
+            BaseModel: An instance of CandidateOut, or of a model
+            with only the requested fields if fields are provided.
         """
-        candidate: Candidate | None = await self.repo.get_by_uuid(candidate_uuid)
-        if candidate:
-            return candidate
-        raise HTTPException(status_code=404, detail="Candidate not found")
+        return self.candidate_out(await self.get_raw_candidate(candidate_uuid), fields)
+
+    async def get_raw_candidate(self, candidate_uuid: UUID) -> dict[str, Any]:
+        """Get the raw candidate by uuid through the candidate cache.
+
+        A cached candidate is served without any db call. A write through this worker
+        drops the entry of its uuid, a write through another worker is seen once the entry expires.
+
+        Args:
+            candidate_uuid (UUID): Candidate uuid.
+
+        Raises:
+            HTTPException: If the candidate is not found.
+
+        Returns:
+            dict[str, Any]: the CandidateOut fields and the revision of the candidate.
+        """
+        candidate = self.candidate_cache.get(candidate_uuid, MISSING)
+        if candidate is MISSING:
+            candidate = await self.single_flight.do(
+                ("candidate", candidate_uuid, self.generation),
+                lambda: self.read_candidate(candidate_uuid),
+            )
+        if not candidate:
+            raise HTTPException(status_code=404, detail="Candidate not found")
+        return candidate
+
+    def candidate_out(self, candidate: dict[str, Any], fields: tuple[str, ...] | None = None) -> BaseModel:
+        """Build the output model of a raw candidate.
+
+        Args:
+            candidate (dict[str, Any]): raw candidate returned by get_raw_candidate.
+            fields (tuple[str, ...] | None): fields to return, all of them if None.
+
+        Returns:
+            BaseModel: An instance of CandidateOut, or of a model with only the requested fields.
+        """
+        if fields:
+            return partial_candidate_out(fields).model_validate({field: candidate[field] for field in fields})
+        return CandidateOut.model_validate(candidate)
+
+    def candidate_etag(self, candidate: dict[str, Any], fields: tuple[str, ...] | None = None) -> str:
+        """Build the ETag of a candidate representation.
+
+        Args:
+            candidate (dict[str, Any]): raw candidate returned by get_raw_candidate.
+            fields (tuple[str, ...] | None): fields returned to the client, all of them if None.
+
+        Returns:
+            str: strong ETag, it changes with the revision of the candidate.
+        """
+        return make_etag(candidate["uuid"], candidate.get("revision", 0), fields)
+
+    async def read_candidate(self, candidate_uuid: UUID) -> dict[str, Any] | None:
+        """Read a raw candidate from the db and cache it, see get_candidate_by_uuid.
+
+        The candidate is not cached if a write happened while it was read,
+        it may be the candidate from before the write.
+
+        Args:
+            candidate_uuid (UUID): Candidate uuid.
+
+        Returns:
+            dict[str, Any] | None: the raw candidate, None if the uuid is unknown.
+        """
+        generation = self.generation
+        projection = {**CANDIDATE_PROJECTION, "revision": 1, "_id": 0}
+        candidate = await self.repo.get_by_uuid(candidate_uuid, raw=True, projection=projection)
+        if generation == self.generation:
+            ttl = None if candidate else self.not_found_ttl
+            self.candidate_cache.set(candidate_uuid, candidate, ttl=ttl)
+        return candidate
+
+    async def get_candidates_by_uuids(
+        self,
+        candidate_uuids: list[UUID],
+        fields: tuple[str, ...] | None = None,
+    ) -> dict[str, Any]:
+        """Get the candidates of a list of uuids with a single query.
+
+        Args:
+            candidate_uuids (list[UUID]): Candidates uuids.
+            fields (tuple[str, ...] | None): fields to return, all of them if None.
+
+        Returns:
+            dict[str, Any]: The raw candidates under items, in the order of the uuids,
+            and the uuids that were not found under missing, the CandidatesBatch shape.
+        """
+        unique_uuids = list(dict.fromkeys(candidate_uuids))
+        projection = {**self.build_projection(fields), "uuid": 1, "_id": 0}
+        candidates = await self.repo.get_by_uuids(unique_uuids, raw=True, projection=projection)
+        found = {candidate["uuid"]: candidate for candidate in candidates}
+        if fields and "uuid" not in fields:
+            for candidate in candidates:
+                del candidate["uuid"]
+        return {
+            "items": [found[uuid] for uuid in candidate_uuids if uuid in found],
+            "missing": [uuid for uuid in unique_uuids if uuid not in found],
+        }
 
     async def create(self, candidate: CandidateIn) -> Candidate:
         """Create candidate in the db.
@@ -47,14 +270,10 @@ class CandidateServices:
         Returns:
             Candidate: An instance of Candidate.
         """
-        created_candidate = await self.repo.get_by_email(candidate.email)
-        if created_candidate:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already used.",
-            )
         candidate = Candidate(**candidate.model_dump())
-        return await self.repo.create(candidate)
+        created_candidate = await self.repo.create(candidate)
+        self.invalidate_caches()
+        return created_candidate
 
     async def update_candidate_by_uuid(
         self,
@@ -70,15 +289,11 @@ class CandidateServices:
         Returns:
             Candidate: Updated record.
         """
-        if candidate_update.email:
-            created_candidate = await self.repo.get_by_email(candidate_update.email)
-            if created_candidate and str(created_candidate.uuid) != str(candidate_uuid):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already used.",
-                )
         updated_data: dict = candidate_update.model_dump(exclude_unset=True)
-        return await self.repo.update(candidate_uuid, updated_data)
+        updated_candidate = await self.repo.update(candidate_uuid, updated_data)
+        self.candidate_cache.delete(candidate_uuid)
+        self.invalidate_caches()
+        return updated_candidate
 
     async def delete_candidate_by_uuid(self, candidate_uuid: UUID) -> None:
         """Delete candidate.
@@ -86,9 +301,222 @@ class CandidateServices:
         Args:
             candidate_uuid (UUID): Candidate uuid.
         """
-        return await self.repo.delete(candidate_uuid)
+        await self.repo.delete(candidate_uuid)
+        self.candidate_cache.delete(candidate_uuid)
+        self.invalidate_caches()
 
-    async def get_all_candidates(
+    async def import_candidates(
+        self,
+        lines: AsyncIterator[str],
+        file_format: str,
+        batch_size: int = 1000,
+        max_errors: int = 1000,
+    ) -> dict[str, Any]:
+        """Import candidates from the lines of a CSV or NDJSON file.
+
+        CSV files have the columns of the CSV report, the UUID column is optional
+        and ignored, every candidate gets a new uuid. NDJSON files have one
+        CandidateIn JSON object per line. A quoted CSV value can span several lines.
+
+        Lines are validated against CandidateIn as they are read and the valid
+        candidates are inserted batch_size at a time, a line that fails
+        does not stop the import of the other lines.
+
+        Args:
+            lines (AsyncIterator[str]): lines of the file.
+            file_format (str): csv or ndjson.
+            batch_size (int): number of candidates per insert.
+            max_errors (int): maximum number of errors listed in the result, the others are only counted.
+
+        Raises:
+            HTTPException: If the CSV header does not have the report columns.
+
+        Returns:
+            dict[str, Any]: number of inserted and failed candidates and the errors per line,
+            the CandidatesImport shape.
+        """
+        result: dict[str, Any] = {"inserted": 0, "failed": 0, "errors": []}
+        columns: list[str] | None = None
+        batch: list[tuple[int, dict[str, Any]]] = []
+        records = iter_csv_rows(lines) if file_format == "csv" else iter_numbered_lines(lines)
+        try:
+            async for line_number, record in records:
+                if file_format == "csv" and columns is None:
+                    columns = self.parse_csv_header(record)
+                    continue
+                try:
+                    row = self.parse_import_line(record, columns)
+                    candidate = CandidateIn.model_validate(row).model_dump(mode="json")
+                except ValidationError as error:
+                    detail = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+                    self.add_import_error(result, line_number, detail, max_errors)
+                    continue
+                except ValueError as error:
+                    self.add_import_error(result, line_number, str(error), max_errors)
+                    continue
+                batch.append((line_number, candidate))
+                if len(batch) >= batch_size:
+                    await self.insert_import_batch(batch, result, max_errors)
+                    batch = []
+        except CSVRecordError as error:
+            # The lines after a record that can not be parsed can not be split into records.
+            self.add_import_error(result, error.line, f"{error} The rest of the file was not read.", max_errors)
+        if batch:
+            await self.insert_import_batch(batch, result, max_errors)
+        result["errors"].sort(key=lambda error: error["line"])
+        return result
+
+    def parse_csv_header(self, values: list[str]) -> list[str]:
+        """Map the CSV header to the candidate fields.
+
+        Args:
+            values (list[str]): first row of the CSV file.
+
+        Raises:
+            HTTPException: If a column is unknown or missing.
+
+        Returns:
+            list[str]: candidate field of each column.
+        """
+        header = [column.strip() for column in values]
+        unknown = [column for column in header if column not in CSV_COLUMNS]
+        missing = [column for column in CSV_COLUMNS if column not in header and column != "UUID"]
+        if unknown or missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid CSV header, unknown columns: {unknown}, missing columns: {missing}.",
+            )
+        return [CSV_COLUMNS[column] for column in header]
+
+    def parse_import_line(self, record: str | list[str], columns: list[str] | None) -> Any:
+        """Parse a record of an import file.
+
+        Args:
+            record (str | list[str]): values of a CSV row, or JSON object.
+            columns (list[str] | None): candidate field of each CSV column, None for NDJSON.
+
+        Raises:
+            ValueError: If the row does not have the header columns or the line is not valid JSON.
+
+        Returns:
+            Any: the candidate data to validate.
+        """
+        if columns is None:
+            return json.loads(record)
+        values = record
+        if len(values) != len(columns):
+            raise ValueError(f"Expected {len(columns)} columns, got {len(values)}.")
+        row = {field: value for field, value in zip(columns, values) if value != "" and field != "uuid"}
+        if "skills" in row:
+            row["skills"] = [skill.strip() for skill in row["skills"].split(";") if skill.strip()]
+        return row
+
+    async def insert_import_batch(
+        self,
+        batch: list[tuple[int, dict[str, Any]]],
+        result: dict[str, Any],
+        max_errors: int,
+    ) -> None:
+        """Insert a batch of validated candidates and record the duplicates.
+
+        The caches are invalidated even if the insert fails, part of the batch may be inserted.
+
+        Args:
+            batch (list[tuple[int, dict[str, Any]]]): line number and data of each candidate.
+            result (dict[str, Any]): import result to update.
+            max_errors (int): maximum number of errors listed in the result.
+        """
+        documents = [{"uuid": Binary.from_uuid(uuid4()), **candidate} for _, candidate in batch]
+        try:
+            rejected = await self.repo.insert_many(documents)
+        finally:
+            self.invalidate_caches()
+        for index in rejected:
+            self.add_import_error(result, batch[index][0], self.repo.duplicate_key_detail, max_errors)
+        result["inserted"] += len(batch) - len(rejected)
+
+    def add_import_error(self, result: dict[str, Any], line: int, detail: str, max_errors: int) -> None:
+        """Record a line that was not imported.
+
+        Args:
+            result (dict[str, Any]): import result to update.
+            line (int): line number in the file.
+            detail (str): why the line was not imported.
+            max_errors (int): maximum number of errors listed in the result.
+        """
+        result["failed"] += 1
+        if len(result["errors"]) < max_errors:
+            result["errors"].append({"line": line, "detail": detail})
+
+    async def update_candidates(
+        self,
+        filters: dict[str, Any],
+        candidates_update: CandidatesUpdateIn,
+        dry_run: bool = False,
+    ) -> dict[str, int]:
+        """Update all the candidates matching the search criteria with a single query.
+
+        Args:
+            filters (dict[str, Any]): search criteria generated by build_filters.
+            candidates_update (CandidatesUpdateIn): fields to set, the ones left to None are not changed.
+            dry_run (bool): only count the matching candidates.
+
+        Raises:
+            HTTPException: If there is no search term or no field to set.
+
+        Returns:
+            dict[str, int]: number of matched and modified candidates, the CandidatesUpdated shape.
+        """
+        self.check_bulk_filters(filters)
+        updated_data = candidates_update.model_dump(mode="json", exclude_none=True)
+        if not updated_data:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No field to update.")
+        if dry_run:
+            return {"matched": await self.repo.count(filters), "modified": 0}
+        matched, modified = await self.repo.update_many(filters, updated_data)
+        if modified:
+            self.candidate_cache.clear()
+            self.invalidate_caches()
+        return {"matched": matched, "modified": modified}
+
+    async def delete_candidates(self, filters: dict[str, Any], dry_run: bool = False) -> dict[str, int]:
+        """Delete all the candidates matching the search criteria with a single query.
+
+        Args:
+            filters (dict[str, Any]): search criteria generated by build_filters.
+            dry_run (bool): only count the matching candidates.
+
+        Raises:
+            HTTPException: If there is no search term.
+
+        Returns:
+            dict[str, int]: number of matched and deleted candidates, the CandidatesDeleted shape.
+        """
+        self.check_bulk_filters(filters)
+        if dry_run:
+            return {"matched": await self.repo.count(filters), "deleted": 0}
+        deleted = await self.repo.delete_many(filters)
+        if deleted:
+            self.candidate_cache.clear()
+            self.invalidate_caches()
+        return {"matched": deleted, "deleted": deleted}
+
+    def check_bulk_filters(self, filters: dict[str, Any]) -> None:
+        """Make sure a bulk write does not target every candidate by mistake.
+
+        Args:
+            filters (dict[str, Any]): search criteria generated by build_filters.
+
+        Raises:
+            HTTPException: If the search criteria is empty.
+        """
+        if not filters:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="At least one search term is required.",
+            )
+
+    def build_filters(
         self,
         first_name: str | None = None,
         last_name: str | None = None,
@@ -103,10 +531,14 @@ class CandidateServices:
         salary: float | None = None,
         gender: Gender | None = None,
         keyword: str | None = None,
-    ) -> list[Candidate] | None:
-        """Get all candidates or filter them based on search criteria.
+        salary_min: float | None = None,
+        salary_max: float | None = None,
+        experience_min: int | None = None,
+        experience_max: int | None = None,
+    ) -> dict[str, Any]:
+        """Build the MongoDB search criteria from the search terms.
 
-        This method is filtering candidates using 'and' between search terms.
+        The search terms are combined using 'and'.
 
         Args:
             first_name (str | None): Candidate first name to search for.
@@ -123,10 +555,16 @@ class CandidateServices:
             gender (Gender | None): Candidate gender to search for.
             keyword (str | None): Any info about candidate to search for
             the candidate using all candidate's fields.
+            salary_min (float | None): Minimum candidate salary.
+            salary_max (float | None): Maximum candidate salary.
+            experience_min (int | None): Minimum candidate years of experience.
+            experience_max (int | None): Maximum candidate years of experience.
+
+        Raises:
+            HTTPException: If the minimum of a range is greater than its maximum.
 
         Returns:
-            list[Candidate] | None: If no candidate found using the search criteria
-            then return None else return list of Candidates.
+            dict[str, Any]: A valid MongoDB search criteria.
         """
         filters = {}
         if first_name:
@@ -139,8 +577,13 @@ class CandidateServices:
             filters["career_level"] = career_level.value
         if job_major:
             filters["job_major"] = job_major.value
-        if years_of_experience:
-            filters["years_of_experience"] = years_of_experience
+        if years_of_experience is not None or experience_min is not None or experience_max is not None:
+            filters["years_of_experience"] = self.build_range(
+                "experience",
+                years_of_experience,
+                experience_min,
+                experience_max,
+            )
         if degree_type:
             filters["degree_type"] = degree_type.value
         if skills:
@@ -149,76 +592,303 @@ class CandidateServices:
             filters["nationality"] = nationality.value
         if city:
             filters["city"] = city
-        if salary is not None:
-            filters["salary"] = salary
+        if salary is not None or salary_min is not None or salary_max is not None:
+            filters["salary"] = self.build_range("salary", salary, salary_min, salary_max)
         if gender:
             filters["gender"] = gender.value
         if keyword:
-            filters["$or"] = [
-                {"first_name": {"$regex": keyword, "$options": "i"}},
-                {"last_name": {"$regex": keyword, "$options": "i"}},
-                {"email": {"$regex": keyword, "$options": "i"}},
-                {"career_level": {"$regex": keyword, "$options": "i"}},
-                {"job_major": {"$regex": keyword, "$options": "i"}},
-                {"years_of_experience": {"$regex": keyword, "$options": "i"}},
-                {"degree_type": {"$regex": keyword, "$options": "i"}},
-                {"skills": {"$regex": keyword, "$options": "i"}},
-                {"nationality": {"$regex": keyword, "$options": "i"}},
-                {"city": {"$regex": keyword, "$options": "i"}},
-                {"salary": {"$regex": keyword, "$options": "i"}},
-                {"gender": {"$regex": keyword, "$options": "i"}},
-            ]
-
-        return await self.repo.get_all(filters)
-
-    async def generate_csv_file_with_all_candidates(self) -> io.StringIO:
-        """Generate CSV StringIO with all candidates data.
-
-        Returns:
-            io.StringIO: In memeory csv file.
-        """
-        all_candidates: list[Candidate] = await self.get_all_candidates()
-        output = io.StringIO()
-        writer = csv.writer(output)
+            filters.update(self.build_keyword_filter(keyword))
+        return filters
 
-        writer.writerow(
-            [
-                "UUID",
-                "First Name",
-                "Last Name",
-                "Email",
-                "Career Level",
-                "Job Major",
-                "Years Of Experience",
-                "Degree Type",
-                "Skills",
-                "Nationality",
-                "City",
-                "Salary",
-                "Gender",
-            ],
-        )
+    def build_range(self, name: str, exact: Any, minimum: Any, maximum: Any) -> Any:
+        """Build the criteria of a field that can be searched by value and by range.
+
+        Args:
+            name (str): prefix of the range search terms, used in the error message.
+            exact (Any): value the field must be equal to, if any.
+            minimum (Any): minimum value of the field (inclusive), if any.
+            maximum (Any): maximum value of the field (inclusive), if any.
+
+        Raises:
+            HTTPException: If the minimum is greater than the maximum.
+
+        Returns:
+            Any: the exact value when there is no range else $eq/$gte/$lte operators.
+        """
+        if minimum is None and maximum is None:
+            return exact
+        if minimum is not None and maximum is not None and minimum > maximum:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{name}_min must not be greater than {name}_max.",
+            )
+        criteria = {}
+        if exact is not None:
+            criteria["$eq"] = exact
+        if minimum is not None:
+            criteria["$gte"] = minimum
+        if maximum is not None:
+            criteria["$lte"] = maximum
+        return criteria
+
+    def build_keyword_filter(self, keyword: str) -> dict[str, Any]:
+        """Build the search criteria for a keyword.
+
+        Words are searched using the text index of the candidate's text fields,
+        they match whole words only, e.g. "john" matches "John" but not "Johnson".
+        A numeric keyword is searched in the text index too, for the words made of digits,
+        and against salary and years of experience which are not part of the text index.
+        Every clause of the $or is indexed, so it is still served by indexes.
+
+        Args:
+            keyword (str): word(s) or number to search for.
+
+        Returns:
+            dict[str, Any]: A valid MongoDB search criteria.
+        """
+        text = {"$text": {"$search": keyword}}
+        try:
+            number = float(keyword)
+        except ValueError:
+            return text
+        return {"$or": [text, {"salary": number}, {"years_of_experience": number}]}
+
+    async def get_all_candidates(
+        self,
+        filters: dict[str, Any],
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        fields: tuple[str, ...] | None = None,
+        sort: CandidateSort | None = None,
+    ) -> tuple[bytes, str]:
+        """Get one page of candidates matching the search criteria.
 
-        for candidate in all_candidates:
-            uuid = str(candidate.uuid)
-            skills = "; ".join(candidate.skills)
-            writer.writerow(
-                [
-                    uuid,
-                    candidate.first_name,
-                    candidate.last_name,
-                    candidate.email,
-                    candidate.career_level,
-                    candidate.job_major,
-                    candidate.years_of_experience,
-                    candidate.degree_type,
-                    skills,
-                    candidate.nationality,
-                    candidate.city,
-                    candidate.salary,
-                    candidate.gender,
-                ],
+        Candidates are ordered by the sort field then _id, by _id when there is no sort,
+        or by relevance then _id for a keyword search without sort. They are paginated
+        using a cursor, so the latency is the same whatever the page is.
+
+        Candidates are read as raw documents projected on the requested CandidateOut fields,
+        the page is serialized without being validated again.
+
+        Pages are cached JSON encoded with their ETag, per search criteria, page and generation,
+        so a hit is served without any db call or serialization. A candidate written through this worker
+        changes the generation, a write through another worker is seen once the cache TTL expires.
+
+        Args:
+            filters (dict[str, Any]): search criteria generated by build_filters.
+            limit (int): Maximum number of candidates to return.
+            cursor (str | None): next_cursor returned with the previous page.
+            fields (tuple[str, ...] | None): fields to return, all of them if None.
+            sort (CandidateSort | None): sort order of the candidates.
+
+        Returns:
+            tuple[bytes, str]: the JSON encoded page and its ETag. The page has the candidates under items
+            and the cursor of the next page under next_cursor which is None when there are no more candidates,
+            the CandidatesPage shape.
+        """
+        key = canonical_key(
+            {
+                "filters": filters,
+                "limit": limit,
+                "cursor": cursor,
+                "fields": fields,
+                "sort": sort,
+                "generation": self.generation,
+            },
+        )
+        page = self.listing_cache.get(key)
+        if page is None:
+            page = await self.single_flight.do(
+                key,
+                lambda: self.cache_candidates_page(key, filters, limit, cursor, fields, sort),
             )
+        return page
+
+    async def cache_candidates_page(
+        self,
+        cache_key: str,
+        filters: dict[str, Any],
+        limit: int,
+        cursor: str | None,
+        fields: tuple[str, ...] | None,
+        sort: CandidateSort | None,
+    ) -> tuple[bytes, str]:
+        """Read one page of candidates from the db, encode it and store it in the listing cache.
+
+        The ETag is built from the encoded page, it changes whenever the page does.
 
+        Args:
+            cache_key (str): listing cache key to store the page under.
+            filters (dict[str, Any]): search criteria generated by build_filters.
+            limit (int): Maximum number of candidates to return.
+            cursor (str | None): next_cursor returned with the previous page.
+            fields (tuple[str, ...] | None): fields to return, all of them if None.
+            sort (CandidateSort | None): sort order of the candidates.
+
+        Returns:
+            tuple[bytes, str]: the JSON encoded page and its ETag.
+        """
+        page = await self.read_candidates_page(filters, limit, cursor, fields, sort)
+        with timed(SERIALIZATION):
+            body = pydantic_core.to_json(page)
+        encoded = body, content_etag(body)
+        self.listing_cache.set(cache_key, encoded, size=len(body))
+        return encoded
+
+    async def read_candidates_page(
+        self,
+        filters: dict[str, Any],
+        limit: int,
+        cursor: str | None,
+        fields: tuple[str, ...] | None,
+        sort: CandidateSort | None,
+    ) -> dict[str, Any]:
+        """Read one page of candidates from the db, see get_all_candidates.
+
+        Args:
+            filters (dict[str, Any]): search criteria generated by build_filters.
+            limit (int): Maximum number of candidates to return.
+            cursor (str | None): next_cursor returned with the previous page.
+            fields (tuple[str, ...] | None): fields to return, all of them if None.
+            sort (CandidateSort | None): sort order of the candidates.
+
+        Returns:
+            dict[str, Any]: The candidates of the page and the cursor of the next page, the CandidatesPage shape.
+        """
+        last_id, last_value = decode_cursor(cursor) if cursor else (None, None)
+        projection = self.build_projection(fields)
+        if "$text" in filters and not sort:
+            return await self.get_candidates_by_relevance(filters, limit, last_id, last_value, projection)
+        sort_field = sort.field if sort else "_id"
+        candidates = await self.repo.get_page(
+            filters,
+            limit + 1,
+            last_id,
+            raw=True,
+            projection={**projection, sort_field: 1},
+            sort_field=sort_field,
+            direction=DESCENDING if sort and sort.descending else ASCENDING,
+            after_value=last_value,
+        )
+        next_cursor = None
+        if len(candidates) > limit:
+            candidates = candidates[:limit]
+            last_candidate = candidates[-1]
+            next_cursor = encode_cursor(last_candidate["_id"], last_candidate.get(sort_field) if sort else None)
+        for candidate in candidates:
+            del candidate["_id"]
+            if sort_field not in projection:
+                candidate.pop(sort_field, None)
+        return {"items": candidates, "next_cursor": next_cursor}
+
+    async def get_candidates_by_relevance(
+        self,
+        filters: dict[str, Any],
+        limit: int,
+        last_id: ObjectId | None = None,
+        last_score: float | None = None,
+        projection: dict[str, Any] = CANDIDATE_PROJECTION,
+    ) -> dict[str, Any]:
+        """Get one page of candidates matching a keyword search ordered by relevance.
+
+        Args:
+            filters (dict[str, Any]): search criteria with a $text criteria.
+            limit (int): Maximum number of candidates to return.
+            last_id (ObjectId | None): _id of the last candidate of the previous page.
+            last_score (float | None): text score of the last candidate of the previous page.
+            projection (dict[str, Any]): fields to return.
+
+        Raises:
+            HTTPException: If the cursor does not belong to a keyword search.
+
+        Returns:
+            dict[str, Any]: The candidates of the page and the cursor of the next page, the CandidatesPage shape.
+        """
+        after = None
+        if last_id is not None:
+            if not isinstance(last_score, (int, float)):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+            after = (last_score, last_id)
+        results = await self.repo.get_text_page(filters, limit + 1, after, raw=True, projection=projection)
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            last_candidate, score = results[-1]
+            next_cursor = encode_cursor(last_candidate["_id"], score)
+        candidates = []
+        for candidate, _ in results:
+            del candidate["_id"]
+            candidates.append(candidate)
+        return {"items": candidates, "next_cursor": next_cursor}
+
+    async def get_facets(self, filters: dict[str, Any]) -> dict[str, dict[str, int]]:
+        """Count the candidates matching the search criteria per value of the facet fields.
+
+        Counts are cached per search criteria and served without any db call until the cache TTL expires
+        or a candidate is written through this worker. Counts read while a write happens are cached under
+        the generation from before the write, so they are never served after it.
+
+        Args:
+            filters (dict[str, Any]): search criteria generated by build_filters.
+
+        Returns:
+            dict[str, dict[str, int]]: number of candidates per value, for each facet field.
+        """
+        key = canonical_key({"filters": filters, "generation": self.generation})
+        facets = self.facets_cache.get(key)
+        if facets is None:
+            facets = await self.single_flight.do(key, lambda: self.count_facets(filters, key))
+        return facets
+
+    async def count_facets(self, filters: dict[str, Any], cache_key: str) -> dict[str, dict[str, int]]:
+        """Count the facets in the db and cache them, see get_facets.
+
+        Args:
+            filters (dict[str, Any]): search criteria generated by build_filters.
+            cache_key (str): facets cache key to store the counts under.
+
+        Returns:
+            dict[str, dict[str, int]]: number of candidates per value, for each facet field.
+        """
+        counts = await self.repo.count_by_fields(filters, FACET_FIELDS)
+        facets = {
+            field: {str(value): count for value, count in values.items() if value is not None}
+            for field, values in counts.items()
+        }
+        self.facets_cache.set(cache_key, facets)
+        return facets
+
+    async def generate_csv_file_with_all_candidates(self, chunk_size: int = 500) -> AsyncIterator[str]:
+        """Generate the CSV file with all candidates data chunk by chunk.
+
+        Candidates are read from a batched cursor as raw documents and
+        written chunk_size rows at a time, so memory stays the same whatever
+        the size of the collection. The header is sent right away.
+        Closing the generator closes the cursor, so a report abandoned
+        by the client stops reading the collection.
+
+        Args:
+            chunk_size (int): number of rows per yielded chunk.
+
+        Yields:
+            str: CSV text, the first chunk is the header alone, sent before the collection is read.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(CSV_COLUMNS.keys())
+        yield output.getvalue()
         output.seek(0)
-        return output
+        output.truncate()
+        rows = 0
+        projection = {"_id": 0, **{field: 1 for field in CSV_COLUMNS.values()}}
+        async with aclosing(self.repo.iter_raw({}, projection, batch_size=chunk_size)) as candidates:
+            async for candidate in candidates:
+                candidate["skills"] = "; ".join(candidate.get("skills", []))
+                writer.writerow([candidate.get(field) for field in CSV_COLUMNS.values()])
+                rows += 1
+                if rows % chunk_size == 0:
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate()
+        if rows % chunk_size:
+            yield output.getvalue()
@@ -0,0 +1,15 @@
+"""Fixtures of the candidates tests."""
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from candidates.repos import CandidateRepo
+from candidates.services import CandidateServices
+from core.db import DOCUMENT_MODELS
+
+
+@pytest.fixture()
+async def services() -> CandidateServices:
+    """Candidate services on a fresh in-memory database."""
+    await init_beanie(database=AsyncMongoMockClient()["tests"], document_models=DOCUMENT_MODELS)
+    return CandidateServices(CandidateRepo())
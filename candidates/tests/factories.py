@@ -0,0 +1,31 @@
+"""Builders of the data of the candidates tests."""
+from typing import Any
+
+from candidates.schemas import CandidateIn
+
+
+def candidate_in(index: int = 0, **fields: Any) -> CandidateIn:
+    """Build a valid candidate, with a unique email per index.
+
+    Args:
+        index (int): number of the candidate.
+        fields (Any): values that replace the default ones.
+
+    Returns:
+        CandidateIn: the candidate.
+    """
+    data = {
+        "first_name": "John",
+        "last_name": "Smith",
+        "email": f"candidate{index}@example.com",
+        "career_level": "Junior",
+        "job_major": "Computer Science",
+        "years_of_experience": 2,
+        "degree_type": "Bachelor",
+        "skills": ["python", "mongodb"],
+        "nationality": "Jordan",
+        "city": "Amman",
+        "salary": 1000,
+        "gender": "Male",
+    }
+    return CandidateIn(**{**data, **fields})
@@ -0,0 +1,89 @@
+"""Tests of the batch read of candidates by uuid."""
+from typing import Any
+from uuid import uuid4
+
+import pytest
+from pydantic import ValidationError
+
+from candidates.models import Candidate
+from candidates.schemas import CandidatesBatchIn
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+from utils.pagination import MAX_PAGE_SIZE
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def _standard_uuids(services: CandidateServices, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Decode the raw uuids like the app client does, mongomock only supports the default representation."""
+    get_by_uuids = services.repo.get_by_uuids
+
+    async def decoded_get_by_uuids(*args: Any, **kwargs: Any) -> list[dict[str, Any]]:
+        candidates = await get_by_uuids(*args, **kwargs)
+        for candidate in candidates:
+            candidate["uuid"] = candidate["uuid"].as_uuid()
+        return candidates
+
+    monkeypatch.setattr(services.repo, "get_by_uuids", decoded_get_by_uuids)
+
+
+@pytest.fixture()
+async def candidates(services: CandidateServices) -> list[Candidate]:
+    """Create three candidates."""
+    return [await services.create(candidate_in(index)) for index in range(3)]
+
+
+async def test_candidates_are_returned_in_the_order_of_the_uuids(
+    services: CandidateServices,
+    candidates: list[Candidate],
+) -> None:
+    """Found candidates follow the order of the request, a repeated uuid is returned each time."""
+    uuids = [candidates[2].uuid, candidates[0].uuid, candidates[2].uuid]
+
+    result = await services.get_candidates_by_uuids(uuids, ("email",))
+    assert result == {
+        "items": [
+            {"email": "candidate2@example.com"},
+            {"email": "candidate0@example.com"},
+            {"email": "candidate2@example.com"},
+        ],
+        "missing": [],
+    }
+
+
+async def test_missing_uuids_are_listed_once(services: CandidateServices, candidates: list[Candidate]) -> None:
+    """Unknown uuids are listed under missing once, in the order of the request."""
+    unknown = [uuid4(), uuid4()]
+    uuids = [unknown[1], candidates[1].uuid, unknown[0], unknown[1]]
+
+    result = await services.get_candidates_by_uuids(uuids, ("uuid", "email"))
+    assert result["items"] == [{"uuid": candidates[1].uuid, "email": "candidate1@example.com"}]
+    assert result["missing"] == [unknown[1], unknown[0]]
+
+
+async def test_batch_reads_the_candidates_with_one_query(
+    services: CandidateServices,
+    candidates: list[Candidate],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """All the uuids are resolved by a single query."""
+    queries = []
+    get_by_uuids = services.repo.get_by_uuids
+
+    async def counted_get_by_uuids(*args: Any, **kwargs: Any) -> list[dict[str, Any]]:
+        queries.append(args)
+        return await get_by_uuids(*args, **kwargs)
+
+    monkeypatch.setattr(services.repo, "get_by_uuids", counted_get_by_uuids)
+    result = await services.get_candidates_by_uuids([candidate.uuid for candidate in candidates])
+    assert len(result["items"]) == 3
+    assert len(queries) == 1
+
+
+def test_batch_size_is_limited() -> None:
+    """A batch has between one and MAX_PAGE_SIZE uuids."""
+    CandidatesBatchIn(uuids=[uuid4() for _ in range(MAX_PAGE_SIZE)])
+    for size in (0, MAX_PAGE_SIZE + 1):
+        with pytest.raises(ValidationError):
+            CandidatesBatchIn(uuids=[uuid4() for _ in range(size)])
@@ -0,0 +1,67 @@
+"""Tests of the bulk update and bulk delete of candidates."""
+import pytest
+from fastapi import HTTPException
+
+from candidates.models import Candidate
+from candidates.schemas import CandidatesUpdateIn
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+async def _candidates(services: CandidateServices) -> None:
+    """Create two candidates in Amman, one of them already paid 2000, and one in Irbid."""
+    await services.create(candidate_in(0, salary=1000))
+    await services.create(candidate_in(1, salary=2000))
+    await services.create(candidate_in(2, city="Irbid"))
+
+
+async def test_dry_run_update_counts_without_modifying(services: CandidateServices) -> None:
+    """A dry run counts the matching candidates and changes nothing."""
+    result = await services.update_candidates({"city": "Amman"}, CandidatesUpdateIn(salary=2000), dry_run=True)
+    assert result == {"matched": 2, "modified": 0}
+    assert await Candidate.find(Candidate.salary == 2000).count() == 1
+
+
+async def test_update_counts_matched_and_modified(services: CandidateServices) -> None:
+    """Candidates that already have the values are matched but not modified."""
+    result = await services.update_candidates({"city": "Amman"}, CandidatesUpdateIn(salary=2000))
+    assert result == {"matched": 2, "modified": 1}
+    assert await Candidate.find(Candidate.salary == 2000).count() == 2
+    assert await Candidate.find(Candidate.city == "Irbid", Candidate.salary == 1000).count() == 1
+
+
+async def test_update_without_field_is_rejected(services: CandidateServices) -> None:
+    """An update that sets nothing answers a 400."""
+    with pytest.raises(HTTPException) as error:
+        await services.update_candidates({"city": "Amman"}, CandidatesUpdateIn())
+    assert error.value.status_code == 400
+
+
+async def test_dry_run_delete_counts_without_deleting(services: CandidateServices) -> None:
+    """A dry run counts the candidates a delete would remove and keeps them."""
+    result = await services.delete_candidates({"city": "Amman"}, dry_run=True)
+    assert result == {"matched": 2, "deleted": 0}
+    assert await Candidate.count() == 3
+
+
+async def test_delete_counts_the_deleted_candidates(services: CandidateServices) -> None:
+    """Only the matching candidates are deleted."""
+    result = await services.delete_candidates({"city": "Amman"})
+    assert result == {"matched": 2, "deleted": 2}
+    assert await Candidate.find().to_list() == [await Candidate.find_one(Candidate.city == "Irbid")]
+
+
+@pytest.mark.parametrize("dry_run", [False, True])
+async def test_empty_filter_is_rejected(services: CandidateServices, dry_run: bool) -> None:
+    """A bulk write without any search term is rejected, even in a dry run, and changes nothing."""
+    with pytest.raises(HTTPException) as error:
+        await services.update_candidates({}, CandidatesUpdateIn(salary=0), dry_run=dry_run)
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException) as error:
+        await services.delete_candidates({}, dry_run=dry_run)
+    assert error.value.status_code == 400
+    assert await Candidate.find(Candidate.salary == 0).count() == 0
+    assert await Candidate.count() == 3
@@ -0,0 +1,90 @@
+"""Tests of the read-through cache of the candidate lookups."""
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from candidates.models import Candidate
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+
+pytestmark = pytest.mark.anyio
+
+
+def fail_on_db_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Make any access to the candidates collection fail the test.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): fixture that undoes the patch after the test.
+    """
+
+    def get_motor_collection() -> None:
+        raise AssertionError("The candidates collection was used.")
+
+    monkeypatch.setattr(Candidate, "get_motor_collection", get_motor_collection)
+
+
+async def test_cached_candidate_is_served_without_db_call(
+    services: CandidateServices,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A cached candidate is served from the cache only."""
+    candidate = await services.create(candidate_in())
+    first = await services.get_raw_candidate(candidate.uuid)
+
+    fail_on_db_call(monkeypatch)
+    assert await services.get_raw_candidate(candidate.uuid) is first
+    assert services.candidate_cache.stats()["hits"] == 1
+
+
+async def test_unknown_uuid_is_cached(services: CandidateServices, monkeypatch: pytest.MonkeyPatch) -> None:
+    """An unknown uuid answers 404, from the cache the second time."""
+    uuid = uuid4()
+    with pytest.raises(HTTPException):
+        await services.get_raw_candidate(uuid)
+
+    fail_on_db_call(monkeypatch)
+    with pytest.raises(HTTPException) as error:
+        await services.get_raw_candidate(uuid)
+    assert error.value.status_code == 404
+
+
+async def test_update_drops_only_the_updated_candidate(services: CandidateServices) -> None:
+    """Updating a candidate reads it again and keeps the other candidates cached."""
+    updated = await services.create(candidate_in(1))
+    other = await services.create(candidate_in(2))
+    await services.get_raw_candidate(updated.uuid)
+    await services.get_raw_candidate(other.uuid)
+
+    await services.update_candidate_by_uuid(updated.uuid, candidate_in(1, salary=5000))
+    assert services.candidate_cache.get(updated.uuid) is None
+    assert services.candidate_cache.get(other.uuid) is not None
+    candidate = await services.get_raw_candidate(updated.uuid)
+    assert candidate["salary"] == 5000
+    assert candidate["revision"] == 2
+
+
+async def test_delete_drops_the_candidate(services: CandidateServices) -> None:
+    """A deleted candidate answers 404 right after the delete."""
+    candidate = await services.create(candidate_in())
+    await services.get_raw_candidate(candidate.uuid)
+
+    await services.delete_candidate_by_uuid(candidate.uuid)
+    with pytest.raises(HTTPException) as error:
+        await services.get_raw_candidate(candidate.uuid)
+    assert error.value.status_code == 404
+
+
+async def test_candidate_read_during_a_write_is_not_cached(services: CandidateServices) -> None:
+    """A candidate read while a write happens may be the old one, it is not cached."""
+    candidate = await services.create(candidate_in())
+    get_by_uuid = services.repo.get_by_uuid
+
+    async def get_by_uuid_during_write(*args, **kwargs):
+        found = await get_by_uuid(*args, **kwargs)
+        services.invalidate_caches()
+        return found
+
+    services.repo.get_by_uuid = get_by_uuid_during_write
+    await services.get_raw_candidate(candidate.uuid)
+    assert services.candidate_cache.get(candidate.uuid) is None
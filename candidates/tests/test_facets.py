@@ -0,0 +1,66 @@
+"""Tests of the faceted counts of the candidates."""
+import pytest
+
+from candidates.models import Candidate
+from candidates.schemas import CandidatesUpdateIn
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+async def _candidates(services: CandidateServices) -> None:
+    """Create two juniors and a senior."""
+    await services.create(candidate_in(1, career_level="Junior", gender="Male"))
+    await services.create(candidate_in(2, career_level="Junior", gender="Female"))
+    await services.create(candidate_in(3, career_level="Senior", gender="Female"))
+
+
+async def test_facets_count_every_value_of_the_matching_candidates(services: CandidateServices) -> None:
+    """Every facet field counts the candidates matching the filters per value."""
+    facets = await services.get_facets({"gender": "Female"})
+
+    assert facets["career_level"] == {"Junior": 1, "Senior": 1}
+    assert facets["gender"] == {"Female": 2}
+    assert facets["nationality"] == {"Jordan": 2}
+    assert facets["degree_type"] == {"Bachelor": 2}
+    assert facets["job_major"] == {"Computer Science": 2}
+
+
+async def test_cached_facets_are_served_without_db_call(
+    services: CandidateServices,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Counts of the same filters are served from the cache only."""
+    facets = await services.get_facets({})
+
+    def get_motor_collection() -> None:
+        raise AssertionError("The candidates collection was used.")
+
+    monkeypatch.setattr(Candidate, "get_motor_collection", get_motor_collection)
+    assert await services.get_facets({}) is facets
+
+
+@pytest.mark.parametrize("write", ["create", "update", "delete", "bulk update", "bulk delete"])
+async def test_write_invalidates_the_cached_facets(services: CandidateServices, write: str) -> None:
+    """Counts are counted again after any kind of candidate write."""
+    assert (await services.get_facets({}))["career_level"] == {"Junior": 2, "Senior": 1}
+    senior = (await services.repo.get_all({"career_level": "Senior"}))[0]
+
+    if write == "create":
+        await services.create(candidate_in(4, career_level="Senior"))
+        expected = {"Junior": 2, "Senior": 2}
+    elif write == "update":
+        await services.update_candidate_by_uuid(senior.uuid, candidate_in(3, career_level="Junior"))
+        expected = {"Junior": 3}
+    elif write == "delete":
+        await services.delete_candidate_by_uuid(senior.uuid)
+        expected = {"Junior": 2}
+    elif write == "bulk update":
+        await services.update_candidates({"career_level": "Junior"}, CandidatesUpdateIn(career_level="Senior"))
+        expected = {"Senior": 3}
+    else:
+        await services.delete_candidates({"career_level": "Junior"})
+        expected = {"Senior": 1}
+    assert (await services.get_facets({}))["career_level"] == expected
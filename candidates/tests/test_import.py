@@ -0,0 +1,67 @@
+"""Tests of the import of CSV files."""
+import csv
+from typing import AsyncIterator
+
+import pytest
+
+from candidates.models import Candidate
+from candidates.services import CSV_COLUMNS, CandidateServices
+
+pytestmark = pytest.mark.anyio
+
+HEADER = ",".join(column for column in CSV_COLUMNS if column != "UUID")
+
+
+def csv_line(index: int, last_name: str = "Smith", skills: str = "python;mongodb") -> str:
+    """Build the line of a valid candidate.
+
+    Args:
+        index (int): number of the candidate, used in the email.
+        last_name (str): last name, as written in the file.
+        skills (str): skills, as written in the file.
+
+    Returns:
+        str: the CSV line.
+    """
+    return (
+        f"John,{last_name},candidate{index}@example.com,Junior,Computer Science,2,Bachelor,{skills},"
+        "Jordan,Amman,1000,Male"
+    )
+
+
+async def as_lines(*lines: str) -> AsyncIterator[str]:
+    """Stream the lines of a file.
+
+    Args:
+        lines (str): lines of the file.
+
+    Yields:
+        str: the lines.
+    """
+    for line in lines:
+        yield line
+
+
+async def test_stray_quote_and_multi_line_value_are_imported(services: CandidateServices) -> None:
+    """A quote inside a value and a quoted value with a line break do not stop the import."""
+    lines = [HEADER, csv_line(1, last_name='O"Brien'), *csv_line(2, skills='"python\nmongodb"').split("\n")]
+    lines.append(csv_line(3, last_name=""))
+
+    result = await services.import_candidates(as_lines(*lines), "csv")
+    assert result["inserted"] == 2
+    assert result["errors"][0]["line"] == 5
+    assert await Candidate.find(Candidate.last_name == 'O"Brien').count() == 1
+
+
+async def test_record_over_the_size_limit_stops_the_import(services: CandidateServices) -> None:
+    """The rows before a record that can not be parsed are imported and the record is reported."""
+    lines = [HEADER, csv_line(1), csv_line(2, last_name='"Smith'), *["more"] * 10]
+    limit = csv.field_size_limit()
+    csv.field_size_limit(200)
+    try:
+        result = await services.import_candidates(as_lines(*lines), "csv")
+    finally:
+        csv.field_size_limit(limit)
+    assert result["inserted"] == 1
+    assert result["failed"] == 1
+    assert result["errors"][0]["line"] == 3
@@ -0,0 +1,82 @@
+"""Tests of the cache of the candidates pages."""
+import json
+
+import pytest
+
+from candidates.models import Candidate
+from candidates.schemas import CandidatesUpdateIn
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+from utils.etags import content_etag
+
+pytestmark = pytest.mark.anyio
+
+FIELDS = ("email", "salary")
+
+
+@pytest.fixture(autouse=True)
+async def _candidates(services: CandidateServices) -> None:
+    """Create three candidates."""
+    for index in range(3):
+        await services.create(candidate_in(index, salary=1000 * index))
+
+
+async def test_page_is_encoded_with_the_etag_of_its_bytes(services: CandidateServices) -> None:
+    """The cached page is the JSON of the page read from the db, its ETag is built from those bytes."""
+    body, etag = await services.get_all_candidates({}, 2, None, FIELDS)
+
+    page = json.loads(body)
+    assert page["items"] == [
+        {"email": "candidate0@example.com", "salary": 0},
+        {"email": "candidate1@example.com", "salary": 1000},
+    ]
+    assert page["next_cursor"]
+    assert etag == content_etag(body)
+    assert services.listing_cache.stats()["bytes"] == len(body)
+
+
+async def test_cached_page_is_served_without_db_call_or_serialization(
+    services: CandidateServices,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A hit returns the cached bytes and ETag as they are."""
+    cached = await services.get_all_candidates({}, 2, None, FIELDS)
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("The page was read or encoded again.")
+
+    monkeypatch.setattr(Candidate, "get_motor_collection", fail)
+    monkeypatch.setattr("candidates.services.pydantic_core.to_json", fail)
+    assert await services.get_all_candidates({}, 2, None, FIELDS) is cached
+
+
+async def test_pages_are_cached_per_search_criteria_and_page(services: CandidateServices) -> None:
+    """Different filters, cursors or fields are different pages."""
+    first_body, _ = await services.get_all_candidates({}, 2, None, FIELDS)
+    cursor = json.loads(first_body)["next_cursor"]
+
+    second_body, _ = await services.get_all_candidates({}, 2, cursor, FIELDS)
+    filtered_body, _ = await services.get_all_candidates({"salary": 2000}, 2, None, FIELDS)
+    assert json.loads(second_body)["items"] == [{"email": "candidate2@example.com", "salary": 2000}]
+    assert json.loads(filtered_body)["items"] == [{"email": "candidate2@example.com", "salary": 2000}]
+    assert second_body == filtered_body
+    assert len(services.listing_cache) == 3
+
+
+async def test_write_changes_the_page_and_its_etag(services: CandidateServices) -> None:
+    """A write through the service serves the page read again, with a new ETag."""
+    body, etag = await services.get_all_candidates({}, 2, None, FIELDS)
+
+    await services.update_candidates({"salary": 0}, CandidatesUpdateIn(salary=500))
+    new_body, new_etag = await services.get_all_candidates({}, 2, None, FIELDS)
+    assert json.loads(new_body)["items"][0] == {"email": "candidate0@example.com", "salary": 500}
+    assert new_etag != etag
+
+
+async def test_write_that_does_not_change_the_page_keeps_its_etag(services: CandidateServices) -> None:
+    """The ETag depends on the page only, a write to a candidate of another page keeps it."""
+    _, etag = await services.get_all_candidates({"salary": 0}, 2, None, FIELDS)
+
+    await services.update_candidates({"salary": 2000}, CandidatesUpdateIn(city="Irbid"))
+    _, new_etag = await services.get_all_candidates({"salary": 0}, 2, None, FIELDS)
+    assert new_etag == etag
@@ -0,0 +1,96 @@
+"""Tests of the keyset pagination of the candidates listing, against an in-memory MongoDB."""
+from typing import Any
+from uuid import uuid4
+
+import pytest
+from bson import Binary
+from fastapi import HTTPException
+
+from candidates.schemas import CandidateSort
+from candidates.services import CandidateServices
+from utils.pagination import encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+# Salaries repeat, so the pages sorted by salary have to break the ties with _id.
+CANDIDATES = [{"email": f"candidate{index}@example.com", "salary": index % 4 * 1000} for index in range(11)]
+
+
+@pytest.fixture(autouse=True)
+async def _candidates(services: CandidateServices) -> None:
+    """Insert CANDIDATES, mongomock ignores uuidRepresentation so the uuids are written as the app writes them."""
+    await services.repo.collection().insert_many(
+        [{**candidate, "uuid": Binary.from_uuid(uuid4())} for candidate in CANDIDATES],
+    )
+
+
+async def read_all_pages(
+    services: CandidateServices,
+    limit: int,
+    sort: CandidateSort | None = None,
+) -> list[list[dict[str, Any]]]:
+    """Follow the cursors of the listing until the last page.
+
+    Args:
+        services (CandidateServices): the services to read the pages with.
+        limit (int): size of the pages.
+        sort (CandidateSort | None): sort order of the candidates.
+
+    Returns:
+        list[list[dict[str, Any]]]: the candidates of every page.
+    """
+    pages = []
+    cursor = None
+    while True:
+        page = await services.read_candidates_page({}, limit, cursor, ("email", "salary"), sort)
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize(
+    ("sort", "expected"),
+    [
+        (None, CANDIDATES),
+        (CandidateSort.salary, sorted(CANDIDATES, key=lambda candidate: candidate["salary"])),
+        # Descending sorts break the ties by descending _id.
+        (CandidateSort.salary_desc, sorted(CANDIDATES, key=lambda candidate: candidate["salary"])[::-1]),
+    ],
+    ids=["_id", "salary", "-salary"],
+)
+async def test_pages_return_every_candidate_once_in_order(
+    services: CandidateServices,
+    sort: CandidateSort | None,
+    expected: list[dict[str, Any]],
+) -> None:
+    """Pages return every candidate once in order."""
+    pages = await read_all_pages(services, 3, sort)
+
+    assert [len(page) for page in pages] == [3, 3, 3, 2]
+    assert [candidate for page in pages for candidate in page] == expected
+
+
+async def test_last_full_page_has_no_next_cursor(services: CandidateServices) -> None:
+    """Last full page has no next cursor."""
+    pages = await read_all_pages(services, len(CANDIDATES))
+
+    assert len(pages) == 1
+    assert len(pages[0]) == len(CANDIDATES)
+
+
+async def test_sort_field_is_not_returned_when_not_requested(services: CandidateServices) -> None:
+    """Sort field is not returned when not requested."""
+    page = await services.read_candidates_page({}, 3, None, ("email",), CandidateSort.salary)
+
+    assert all(set(candidate) == {"email"} for candidate in page["items"])
+    assert page["next_cursor"] is not None
+
+
+async def test_cursor_of_a_listing_is_rejected_by_a_keyword_search(services: CandidateServices) -> None:
+    """Cursor of a listing is rejected by a keyword search."""
+    cursor = encode_cursor((await services.repo.collection().find_one())["_id"])
+
+    with pytest.raises(HTTPException) as error:
+        await services.read_candidates_page({"$text": {"$search": "candidate"}}, 3, cursor, None, None)
+    assert error.value.status_code == 400
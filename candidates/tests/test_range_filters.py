@@ -0,0 +1,71 @@
+"""Tests of the salary and experience range filters."""
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from candidates.schemas import CandidateSort
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+async def _candidates(services: CandidateServices) -> None:
+    """Create candidates with 0 to 4 years of experience and a salary of 1000 per year."""
+    for index in range(5):
+        await services.create(candidate_in(index, years_of_experience=index, salary=1000 * index))
+
+
+async def salaries(services: CandidateServices, filters: dict, sort: CandidateSort | None = None) -> list[float]:
+    """List the salaries of the candidates matching the filters.
+
+    Args:
+        services (CandidateServices): the candidate services.
+        filters (dict): search criteria generated by build_filters.
+        sort (CandidateSort | None): order of the candidates.
+
+    Returns:
+        list[float]: salary of each candidate of the first page.
+    """
+    body, _ = await services.get_all_candidates(filters, 10, None, ("salary",), sort)
+    return [item["salary"] for item in json.loads(body)["items"]]
+
+
+async def test_ranges_are_inclusive_operators(services: CandidateServices) -> None:
+    """Each bound becomes an inclusive operator, and an exact value is kept along the range."""
+    filters = services.build_filters(salary_min=1000, salary_max=3000, years_of_experience=2, experience_min=1)
+    assert filters == {"salary": {"$gte": 1000, "$lte": 3000}, "years_of_experience": {"$eq": 2, "$gte": 1}}
+
+
+async def test_zero_experience_is_a_filter(services: CandidateServices) -> None:
+    """years_of_experience=0 filters on 0 instead of being ignored."""
+    assert services.build_filters(years_of_experience=0) == {"years_of_experience": 0}
+
+
+@pytest.mark.parametrize(
+    ("terms", "detail"),
+    [
+        ({"salary_min": 3000, "salary_max": 1000}, "salary_min must not be greater than salary_max."),
+        ({"experience_min": 4, "experience_max": 2}, "experience_min must not be greater than experience_max."),
+    ],
+)
+async def test_minimum_greater_than_maximum_is_rejected(services: CandidateServices, terms: dict, detail: str) -> None:
+    """A range with its minimum over its maximum answers a 422."""
+    with pytest.raises(HTTPException) as error:
+        services.build_filters(**terms)
+    assert error.value.status_code == 422
+    assert error.value.detail == detail
+
+
+async def test_listing_is_filtered_by_the_ranges(services: CandidateServices) -> None:
+    """Only the candidates inside both ranges are listed, bounds included."""
+    filters = services.build_filters(salary_min=1000, salary_max=3000, experience_max=2)
+    assert await salaries(services, filters) == [1000, 2000]
+
+
+async def test_listing_is_sorted_by_the_range_field(services: CandidateServices) -> None:
+    """A range combines with a descending sort on the same field."""
+    filters = services.build_filters(salary_min=2000)
+    assert await salaries(services, filters, CandidateSort.salary_desc) == [4000, 3000, 2000]
@@ -0,0 +1,29 @@
+"""Tests of the CSV report of the candidates."""
+import csv
+import io
+
+import pytest
+
+from candidates.services import CSV_COLUMNS, CandidateServices
+from candidates.tests.factories import candidate_in
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_header_is_sent_before_the_rows(services: CandidateServices) -> None:
+    """The first chunk is the header alone and the next ones hold at most chunk_size rows."""
+    for index in range(5):
+        await services.create(candidate_in(index))
+
+    chunks = [chunk async for chunk in services.generate_csv_file_with_all_candidates(chunk_size=2)]
+    rows = [list(csv.reader(io.StringIO(chunk))) for chunk in chunks]
+    assert rows[0] == [list(CSV_COLUMNS)]
+    assert [len(chunk) for chunk in rows[1:]] == [2, 2, 1]
+    emails = [row[3] for chunk in rows[1:] for row in chunk]
+    assert sorted(emails) == [f"candidate{index}@example.com" for index in range(5)]
+
+
+async def test_empty_collection_gives_the_header_only(services: CandidateServices) -> None:
+    """A report without candidates is the header alone."""
+    chunks = [chunk async for chunk in services.generate_csv_file_with_all_candidates(chunk_size=2)]
+    assert chunks == [",".join(CSV_COLUMNS) + "\r\n"]
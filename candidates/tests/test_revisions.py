@@ -0,0 +1,44 @@
+"""Tests of the revision and updated_at maintained by the writes of the repo."""
+import pytest
+
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_sets_the_first_revision(services: CandidateServices) -> None:
+    """A created candidate starts at revision 1."""
+    candidate = await services.create(candidate_in())
+    assert candidate.revision == 1
+    assert candidate.updated_at is not None
+
+
+async def test_update_that_changes_nothing_keeps_the_revision(services: CandidateServices) -> None:
+    """An update with the current values neither bumps the revision nor touches updated_at."""
+    candidate = await services.create(candidate_in())
+    raw = await services.repo.get_by_uuid(candidate.uuid, raw=True)
+
+    unchanged = await services.repo.update(candidate.uuid, {"salary": 1000, "city": "Amman"})
+    assert unchanged.revision == 1
+    assert (await services.repo.get_by_uuid(candidate.uuid, raw=True))["updated_at"] == raw["updated_at"]
+
+
+async def test_update_that_changes_a_value_bumps_the_revision(services: CandidateServices) -> None:
+    """An update that changes one of the values bumps the revision once."""
+    candidate = await services.create(candidate_in())
+
+    updated = await services.repo.update(candidate.uuid, {"salary": 1000, "city": "Irbid"})
+    assert updated.revision == 2
+    assert updated.city == "Irbid"
+
+
+async def test_update_many_bumps_only_the_changed_documents(services: CandidateServices) -> None:
+    """A bulk update bumps the revision of the documents it changes and counts the others as matched."""
+    changed = await services.create(candidate_in(1, salary=1000))
+    unchanged = await services.create(candidate_in(2, salary=2000))
+
+    matched, modified = await services.repo.update_many({}, {"salary": 2000})
+    assert (matched, modified) == (2, 1)
+    assert (await services.repo.get_by_uuid(changed.uuid)).revision == 2
+    assert (await services.repo.get_by_uuid(unchanged.uuid)).revision == 1
@@ -0,0 +1,87 @@
+"""Tests of the server side time limits of the reads."""
+from typing import Any
+from uuid import uuid4
+
+import pytest
+
+from candidates.models import Candidate
+from candidates.services import CandidateServices
+from candidates.tests.factories import candidate_in
+from core.common_repos import AGGREGATION_READ, LISTING_READ, LOOKUP_READ, REPORT_READ
+
+pytestmark = pytest.mark.anyio
+
+MAX_TIME_MS = {LOOKUP_READ: 100, LISTING_READ: 200, AGGREGATION_READ: 300, REPORT_READ: 400}
+
+
+class RecordingCollection:
+    """Collection that records the options of the reads and runs them on the wrapped collection."""
+
+    def __init__(self, collection: Any, calls: list[tuple[str, dict[str, Any]]]) -> None:
+        """Class constructor.
+
+        Args:
+            collection (Any): the wrapped collection.
+            calls (list[tuple[str, dict[str, Any]]]): name and keyword arguments of every read.
+        """
+        self.collection = collection
+        self.calls = calls
+
+    def with_options(self, **options: Any) -> "RecordingCollection":
+        """Keep recording the reads of the collection with other options."""
+        return RecordingCollection(self.collection.with_options(**options), self.calls)
+
+    def __getattr__(self, name: str) -> Any:
+        """Record the calls of the read methods."""
+        method = getattr(self.collection, name)
+        if name not in ("find", "find_one", "aggregate", "count_documents"):
+            return method
+
+        def read(*args: Any, **kwargs: Any) -> Any:
+            self.calls.append((name, kwargs))
+            return method(*args, **kwargs)
+
+        return read
+
+
+@pytest.fixture()
+async def calls(services: CandidateServices, monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, dict[str, Any]]]:
+    """Create a candidate, set the time limits and record the raw reads."""
+    await services.create(candidate_in())
+    services.repo.max_time_ms = MAX_TIME_MS
+    recorded: list[tuple[str, dict[str, Any]]] = []
+    collection = Candidate.get_motor_collection()
+    monkeypatch.setattr(Candidate, "get_motor_collection", lambda: RecordingCollection(collection, recorded))
+    return recorded
+
+
+async def test_lookup_has_the_lookup_limit(services: CandidateServices, calls: list) -> None:
+    """A raw lookup by uuid sends the lookup limit as max_time_ms."""
+    await services.repo.get_by_uuid(uuid4(), raw=True)
+    assert calls == [("find_one", {"max_time_ms": 100})]
+
+
+async def test_page_has_the_listing_limit(services: CandidateServices, calls: list) -> None:
+    """A raw page sends the listing limit as max_time_ms."""
+    assert len(await services.repo.get_page({}, 10, raw=True)) == 1
+    assert calls == [("find", {"max_time_ms": 200})]
+
+
+async def test_aggregations_have_the_aggregation_limit(services: CandidateServices, calls: list) -> None:
+    """Counts and facets send the aggregation limit as maxTimeMS, the option name of aggregate."""
+    assert await services.repo.count({}) == 1
+    assert await services.repo.count_by_fields({}, ["city"]) == {"city": {"Amman": 1}}
+    assert calls == [("count_documents", {"maxTimeMS": 300}), ("aggregate", {"maxTimeMS": 300})]
+
+
+async def test_report_has_the_report_limit(services: CandidateServices, calls: list) -> None:
+    """The report cursor sends the report limit as max_time_ms."""
+    assert len([candidate async for candidate in services.repo.iter_raw({}, batch_size=5)]) == 1
+    assert calls == [("find", {"batch_size": 5, "max_time_ms": 400})]
+
+
+async def test_reads_without_limit_send_no_option(services: CandidateServices, calls: list) -> None:
+    """A kind of read with a limit of 0 sends no time limit."""
+    services.repo.max_time_ms = {**MAX_TIME_MS, LISTING_READ: 0}
+    await services.repo.get_page({}, 10, raw=True)
+    assert calls == [("find", {})]
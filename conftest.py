@@ -0,0 +1,21 @@
+"""Shared fixtures of the tests."""
+import os
+
+import pytest
+
+# Settings without a default, the tests never connect to a server.
+for name, value in {
+    "DATABASE_URL": "mongodb://localhost:27017/tests",
+    "MONGODB_HOST": "localhost",
+    "MONGODB_PORT": "27017",
+    "MONGODB_USER": "tests",
+    "MONGODB_PASSWORD": "tests",
+    "MONGODB_DATABASE": "tests",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture()
+def anyio_backend() -> str:
+    """Run the async tests on asyncio, the loop the app runs on."""
+    return "asyncio"
@@ -0,0 +1,144 @@
+"""A module that has the in-process caches.
+
+Caches are per worker process, each gunicorn worker has its own entries,
+so every entry has a TTL that bounds how stale another worker can be.
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Protocol
+
+
+def canonical_key(data: Any) -> str:
+    """Build a cache key that does not depend on the order of dict keys.
+
+    Args:
+        data (Any): JSON like data, values that are not JSON types are converted using str.
+
+    Returns:
+        str: canonical JSON representation of the data.
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class Cache(Protocol):
+    """Interface of the caches the services accept, LRUCache is the in-process implementation."""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get the value of a key, default if it is missing or expired."""
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, size: int = 0) -> None:
+        """Set the value of a key, for ttl seconds or the default TTL of the cache, size is its weight in bytes."""
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key from the cache if it is there."""
+
+    def clear(self) -> None:
+        """Remove every entry."""
+
+    def stats(self) -> dict[str, int | float]:
+        """Counters of the cache."""
+
+
+class LRUCache:
+    """Bounded cache where every entry expires after a TTL.
+
+    When the cache is full, or the sizes of the entries go over max_bytes,
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60, max_bytes: int = 0) -> None:
+        """Class constructor.
+
+        Args:
+            max_size (int): maximum number of entries.
+            ttl (float): default time to live of the entries in seconds.
+            max_bytes (int): maximum sum of the sizes given to set, 0 means no limit.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Number of entries, including the expired ones not evicted yet."""
+        return len(self.entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get the value of a key.
+
+        Args:
+            key (Hashable): key of the entry.
+            default (Any): value to return if the key is missing or expired.
+
+        Returns:
+            Any: the cached value or default.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            self.delete(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, size: int = 0) -> None:
+        """Set the value of a key, evicting the least recently used entries if the cache is full.
+
+        A value bigger than max_bytes is not cached.
+
+        Args:
+            key (Hashable): key of the entry.
+            value (Any): value to cache.
+            ttl (float | None): time to live of this entry in seconds, the cache TTL if None.
+            size (int): approximate size of the value in bytes, counted against max_bytes.
+        """
+        self.delete(key)
+        if self.max_bytes and size > self.max_bytes:
+            return
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value, size)
+        self.bytes += size
+        while len(self.entries) > self.max_size or (self.max_bytes and self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key from the cache if it is there.
+
+        Args:
+            key (Hashable): key of the entry.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """Counters of the cache.
+
+        Returns:
+            dict[str, int | float]: size, bytes, hits, misses, evictions and hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,32 +1,246 @@
 """A module that has common repositories to use."""
-from typing import Any
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
 from uuid import UUID
 
-from beanie import Document
-from fastapi import HTTPException
+from beanie import Document, UpdateResponse
+from bson import Binary, ObjectId
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred, _ServerMode
+
+from core.settings import Settings
+
+# Server error code of a write that violates a unique index.
+DUPLICATE_KEY_ERROR = 11000
+
+# Kinds of reads, each one has its own time limit.
+# The heavy ones can be routed away from the primary, the lookups and the writes use the primary.
+LOOKUP_READ = "lookup"
+LISTING_READ = "listing"
+REPORT_READ = "report"
+AGGREGATION_READ = "aggregation"
+
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def read_preferences_from_settings(settings: Settings) -> dict[str, _ServerMode]:
+    """Build the read preference of each kind of heavy read from the settings.
+
+    Args:
+        settings (Settings): the app settings.
+
+    Returns:
+        dict[str, _ServerMode]: pymongo read preference per kind of read.
+    """
+    modes = {
+        LISTING_READ: settings.LISTING_READ_PREFERENCE,
+        REPORT_READ: settings.REPORT_READ_PREFERENCE,
+        AGGREGATION_READ: settings.AGGREGATION_READ_PREFERENCE,
+    }
+    max_staleness = settings.READ_MAX_STALENESS_SECONDS
+    return {
+        read: Primary() if mode == "primary" else READ_PREFERENCES[mode](max_staleness=max_staleness)
+        for read, mode in modes.items()
+    }
+
+
+def max_time_ms_from_settings(settings: Settings) -> dict[str, int]:
+    """Build the server side time limit of each kind of read from the settings.
+
+    Args:
+        settings (Settings): the app settings.
+
+    Returns:
+        dict[str, int]: time limit in milliseconds per kind of read, 0 for no limit.
+    """
+    return {
+        LOOKUP_READ: settings.LOOKUP_MAX_TIME_MS,
+        LISTING_READ: settings.LISTING_MAX_TIME_MS,
+        AGGREGATION_READ: settings.AGGREGATION_MAX_TIME_MS,
+        REPORT_READ: settings.REPORT_MAX_TIME_MS,
+    }
+
+
+@asynccontextmanager
+async def closing_cursor(cursor: Any) -> AsyncIterator[Any]:
+    """Close a cursor when the block exits, killing it on the server if it is not exhausted.
+
+    The block is usually left early because the task reading the cursor was cancelled,
+    e.g. the client disconnected, so the close is shielded from the cancellation.
+
+    Args:
+        cursor (Any): motor cursor or command cursor.
+
+    Yields:
+        Any: the cursor.
+    """
+    try:
+        yield cursor
+    finally:
+        await asyncio.shield(cursor.close())
 
 
 class AbstractRepo:
     """Basic repo that represent the data layer for the passed model."""
 
-    def __init__(self, model: Document) -> None:
+    def __init__(
+        self,
+        model: Document,
+        duplicate_key_detail: str = "Email already used.",
+        read_preferences: dict[str, _ServerMode] | None = None,
+        max_time_ms: dict[str, int] | None = None,
+    ) -> None:
         """Class constructor.
 
         Args:
             model (Document): an instance of beanie document.
+            duplicate_key_detail (str): error message to return when a write violates a unique index.
+            read_preferences (dict[str, _ServerMode] | None): read preference per kind of heavy read,
+            the reads that are not listed use the primary.
+            max_time_ms (dict[str, int] | None): server side time limit in milliseconds per kind of read,
+            the reads that are not listed have no limit.
         """
         self.model = model
+        self.duplicate_key_detail = duplicate_key_detail
+        self.read_preferences = read_preferences or {}
+        self.max_time_ms = max_time_ms or {}
+        # Models with a revision field get revision and updated_at maintained on every write.
+        self.versioned = "revision" in model.model_fields
+
+    def duplicate_key_exception(self) -> HTTPException:
+        """Build the exception to raise when a write violates a unique index.
+
+        Returns:
+            HTTPException: 400 error with the configured message.
+        """
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=self.duplicate_key_detail,
+        )
+
+    def collection(self, read: str | None = None) -> AsyncIOMotorCollection:
+        """Get the motor collection of the model routed for a kind of read.
+
+        Args:
+            read (str | None): kind of heavy read, None for the writes and the reads that need the primary.
+
+        Returns:
+            AsyncIOMotorCollection: the collection with the read preference of the kind of read.
+        """
+        collection = self.model.get_motor_collection()
+        read_preference = self.read_preferences.get(read)
+        if read_preference is None:
+            return collection
+        return collection.with_options(read_preference=read_preference)
+
+    def time_limit(self, read: str, option: str = "max_time_ms") -> dict[str, int]:
+        """Build the option that stops a kind of read on the server when it runs over its time limit.
+
+        A read over its limit raises ExecutionTimeout, answered with a 504 by the app.
+
+        Args:
+            read (str): kind of read.
+            option (str): name of the option, max_time_ms for find and maxTimeMS for aggregate and count.
+
+        Returns:
+            dict[str, int]: keyword argument of the read, empty if the read has no time limit.
+        """
+        max_time_ms = self.max_time_ms.get(read)
+        return {option: max_time_ms} if max_time_ms else {}
 
-    async def get_by_uuid(self, uuid: UUID) -> Document | None:
+    def version_fields(self) -> dict[str, Any]:
+        """Build the $set and $inc of an update that maintain revision and updated_at.
+
+        Returns:
+            dict[str, Any]: the update operators, empty if the model is not versioned.
+        """
+        if not self.versioned:
+            return {}
+        return {"$set": {"updated_at": datetime.now(timezone.utc)}, "$inc": {"revision": 1}}
+
+    def build_update(self, updated_data: dict[str, Any]) -> dict[str, Any]:
+        """Build the update that sets the data and maintains the revision.
+
+        Args:
+            updated_data (dict[str, Any]): values of the fields to set.
+
+        Returns:
+            dict[str, Any]: A valid MongoDB update.
+        """
+        update = self.version_fields()
+        update["$set"] = {**updated_data, **update.get("$set", {})}
+        return update
+
+    def changes_filter(self, updated_data: dict[str, Any]) -> dict[str, Any]:
+        """Build the criteria that selects the documents an update would change.
+
+        Documents that already have every value are left out, so they do not get a new revision
+        and are not counted as modified.
+
+        Args:
+            updated_data (dict[str, Any]): values of the fields to set, at least one.
+
+        Returns:
+            dict[str, Any]: A valid MongoDB search criteria.
+        """
+        return {"$or": [{field: {"$ne": value}} for field, value in updated_data.items()]}
+
+    async def get_by_uuid(
+        self,
+        uuid: UUID,
+        raw: bool = False,
+        projection: dict[str, Any] | None = None,
+    ) -> Document | dict[str, Any] | None:
         """Find an element by uuid.
 
         Args:
             uuid (UUID): uuid of the object.
+            raw (bool): return the raw dict instead of a beanie document.
+            projection (dict[str, Any] | None): fields to return in raw mode, all of them if None.
 
         Returns:
-            Document | None: None if the object is not found else an instance of Document.
+            Document | dict[str, Any] | None: None if the object is not found else an instance of Document,
+            or the raw document in raw mode.
         """
-        return await self.model.find_one(self.model.uuid == uuid)
+        time_limit = self.time_limit(LOOKUP_READ)
+        if raw:
+            filters = {"uuid": Binary.from_uuid(uuid)}
+            return await self.model.get_motor_collection().find_one(filters, projection, **time_limit)
+        return await self.model.find_one(self.model.uuid == uuid, **time_limit)
+
+    async def get_by_uuids(
+        self,
+        uuids: list[UUID],
+        raw: bool = False,
+        projection: dict[str, Any] | None = None,
+    ) -> list[Document] | list[dict[str, Any]]:
+        """Find the elements of a list of uuids with a single query.
+
+        Args:
+            uuids (list[UUID]): uuids of the objects.
+            raw (bool): return raw dicts instead of beanie documents.
+            projection (dict[str, Any] | None): fields to return in raw mode, all of them if None.
+
+        Returns:
+            list[Document] | list[dict[str, Any]]: the objects found, in no particular order.
+        """
+        time_limit = self.time_limit(LOOKUP_READ)
+        if raw:
+            filters = {"uuid": {"$in": [Binary.from_uuid(uuid) for uuid in uuids]}}
+            cursor = self.model.get_motor_collection().find(filters, projection, **time_limit)
+            async with closing_cursor(cursor):
+                return await cursor.to_list(None)
+        return await self.model.find({"uuid": {"$in": uuids}}, **time_limit).to_list()
 
     async def get_by_email(self, email: str) -> Document | None:
         """Find an element by email.
@@ -42,35 +256,95 @@ class AbstractRepo:
     async def create(self, model: Document) -> Document:
         """Create the Document in the db.
 
+        Uniqueness is enforced by the unique indexes of the model,
+        so there is no need to look for an existing document first.
+
         Args:
             model (Document): an instance of the required Document to create.
 
+        Raises:
+            HTTPException: if the document violates a unique index.
+
         Returns:
             Document: an instance of created Document.
         """
-        return await model.create()
+        if self.versioned:
+            model.revision = 1
+            model.updated_at = datetime.now(timezone.utc)
+        try:
+            created = await model.create()
+        except DuplicateKeyError:
+            raise self.duplicate_key_exception()
+        return created
+
+    async def insert_many(self, documents: list[dict[str, Any]]) -> list[int]:
+        """Insert raw documents in a single unordered bulk write.
+
+        The documents are not validated by beanie, they must already have the shape of the model.
+        A document that violates a unique index does not stop the others from being inserted.
+
+        Args:
+            documents (list[dict[str, Any]]): raw documents to insert.
+
+        Raises:
+            BulkWriteError: if a document failed for another reason than a unique index.
+
+        Returns:
+            list[int]: indexes of the documents rejected by a unique index.
+        """
+        if self.versioned:
+            updated_at = datetime.now(timezone.utc)
+            for document in documents:
+                document.update(revision=1, updated_at=updated_at)
+        rejected = []
+        try:
+            await self.model.get_motor_collection().insert_many(documents, ordered=False)
+        except BulkWriteError as error:
+            for write_error in error.details["writeErrors"]:
+                if write_error["code"] != DUPLICATE_KEY_ERROR:
+                    raise
+                rejected.append(write_error["index"])
+        return rejected
 
     async def update(self, uuid: UUID, updated_data: dict[str, Any]) -> Document:
         """Update the DB document.
 
+        The update is done with a single find_one_and_update call
+        that returns the document after the update. It only matches the document
+        if one of the values changes, an update that changes nothing is followed by
+        a lookup instead and leaves the revision and updated_at as they are.
+
         Args:
             uuid (UUID): uuid of the object.
             updated_data (dict[str, Any]): The new data to replace the old data in DB.
 
         Raises:
-            HTTPException: if the object is not found.
+            HTTPException: if the object is not found or the new data violates a unique index.
 
         Returns:
             Document: same document with the new data.
         """
-        model_object = await self.get_by_uuid(uuid)
+        model_object = None
+        if updated_data:
+            try:
+                model_object = await self.model.find_one(
+                    self.model.uuid == uuid,
+                    self.changes_filter(updated_data),
+                ).update(
+                    self.build_update(updated_data),
+                    response_type=UpdateResponse.NEW_DOCUMENT,
+                )
+            except DuplicateKeyError:
+                raise self.duplicate_key_exception()
+        if model_object:
+            return model_object
+        model_object = await self.model.find_one(self.model.uuid == uuid)
         if not model_object:
             raise HTTPException(
                 status_code=404,
                 detail=f"{self.model.__name__} not found",
             )
-        await model_object.update({"$set": updated_data})
-        return await self.get_by_uuid(uuid)
+        return model_object
 
     async def delete(self, uuid: UUID) -> None:
         """Delete the required document.
@@ -81,13 +355,64 @@ class AbstractRepo:
         Raises:
             HTTPException: if the object is not found.
         """
-        model_object = await self.get_by_uuid(uuid)
-        if not model_object:
+        result = await self.model.find_one(self.model.uuid == uuid).delete_one()
+        if not result or not result.deleted_count:
             raise HTTPException(
                 status_code=404,
                 detail=f"{self.model.__name__} not found",
             )
-        await model_object.delete()
+
+    async def update_many(self, filters: dict[str, Any], updated_data: dict[str, Any]) -> tuple[int, int]:
+        """Set the same data on every document matching the filters with a single update_many.
+
+        The update only targets the documents it changes, so the revision and updated_at
+        of the others are left as they are. The matching documents are counted before the update.
+
+        Args:
+            filters (dict[str, Any]): A valid MongoDB search criteria
+            updated_data (dict[str, Any]): raw values of the fields to set.
+
+        Raises:
+            HTTPException: if the new data violates a unique index.
+
+        Returns:
+            tuple[int, int]: number of matched documents and number of modified documents.
+        """
+        matched = await self.count(filters)
+        try:
+            result = await self.model.get_motor_collection().update_many(
+                {"$and": [filters, self.changes_filter(updated_data)]},
+                self.build_update(updated_data),
+            )
+        except DuplicateKeyError:
+            raise self.duplicate_key_exception()
+        return max(matched, result.modified_count), result.modified_count
+
+    async def delete_many(self, filters: dict[str, Any]) -> int:
+        """Delete every document matching the filters with a single delete_many.
+
+        Args:
+            filters (dict[str, Any]): A valid MongoDB search criteria
+
+        Returns:
+            int: number of deleted documents.
+        """
+        result = await self.model.get_motor_collection().delete_many(filters)
+        return result.deleted_count
+
+    async def count(self, filters: dict[str, Any]) -> int:
+        """Count the documents matching the filters.
+
+        Args:
+            filters (dict[str, Any]): A valid MongoDB search criteria
+
+        Returns:
+            int: number of matching documents.
+        """
+        return await self.model.get_motor_collection().count_documents(
+            filters,
+            **self.time_limit(AGGREGATION_READ, "maxTimeMS"),
+        )
 
     async def get_all(self, filters: dict[str, Any]) -> list[Document] | None:
         """Get all documents based on the provided filters.
@@ -99,4 +424,166 @@ class AbstractRepo:
             list[Document] | None: Return None of no objects
             founded else return founded objects.
         """
-        return await self.model.find(filters).to_list()
+        return await self.model.find(filters, **self.time_limit(LISTING_READ)).to_list()
+
+    async def get_page(
+        self,
+        filters: dict[str, Any],
+        limit: int,
+        after: ObjectId | None = None,
+        raw: bool = False,
+        projection: dict[str, Any] | None = None,
+        sort_field: str = "_id",
+        direction: int = ASCENDING,
+        after_value: Any = None,
+    ) -> list[Document] | list[dict[str, Any]]:
+        """Get one page of documents ordered by sort_field then _id.
+
+        Keyset pagination, the page starts right after the provided (sort_field value, _id)
+        so the cost of a page does not depend on how deep the client is,
+        as long as an index on (sort_field, _id) is there to serve the sort.
+
+        In raw mode the projected documents are returned as motor reads them,
+        skipping beanie and pydantic validation which dominate the CPU of big pages,
+        and they are read with the listing read preference.
+
+        Args:
+            filters (dict[str, Any]): A valid MongoDB search criteria
+            limit (int): Maximum number of documents to return.
+            after (ObjectId | None): _id of the last document of the previous page.
+            raw (bool): return raw dicts instead of beanie documents.
+            projection (dict[str, Any] | None): fields to return in raw mode, all of them if None.
+            sort_field (str): field to sort by, _id by default.
+            direction (int): ASCENDING or DESCENDING.
+            after_value (Any): sort_field value of the last document of the previous page.
+
+        Returns:
+            list[Document] | list[dict[str, Any]]: documents of the page.
+        """
+        if after is not None:
+            filters = {"$and": [filters, self.keyset_criteria(after, sort_field, direction, after_value)]}
+        sort = [("_id", direction)]
+        if sort_field != "_id":
+            sort.insert(0, (sort_field, direction))
+        time_limit = self.time_limit(LISTING_READ)
+        if raw:
+            cursor = self.collection(LISTING_READ).find(filters, projection, **time_limit).sort(sort).limit(limit)
+            async with closing_cursor(cursor):
+                return await cursor.to_list(None)
+        return await self.model.find(filters, **time_limit).sort(sort).limit(limit).to_list()
+
+    def keyset_criteria(self, after: ObjectId, sort_field: str, direction: int, after_value: Any) -> dict[str, Any]:
+        """Build the criteria that selects the documents after the last one of a page.
+
+        Args:
+            after (ObjectId): _id of the last document of the previous page.
+            sort_field (str): field the page is sorted by.
+            direction (int): ASCENDING or DESCENDING.
+            after_value (Any): sort_field value of the last document of the previous page.
+
+        Returns:
+            dict[str, Any]: A valid MongoDB search criteria.
+        """
+        operator = "$gt" if direction == ASCENDING else "$lt"
+        if sort_field == "_id":
+            return {"_id": {operator: after}}
+        return {"$or": [{sort_field: {operator: after_value}}, {sort_field: after_value, "_id": {operator: after}}]}
+
+    async def get_text_page(
+        self,
+        filters: dict[str, Any],
+        limit: int,
+        after: tuple[float, ObjectId] | None = None,
+        raw: bool = False,
+        projection: dict[str, Any] | None = None,
+    ) -> list[tuple[Document | dict[str, Any], float]]:
+        """Get one page of documents matching a $text search ordered by relevance.
+
+        The filters must contain a $text criteria, documents are sorted
+        by text score then _id, and the page starts right after the provided
+        (score, _id) so the text index is used for every page.
+        The aggregation uses the listing read preference.
+
+        Args:
+            filters (dict[str, Any]): A valid MongoDB search criteria with a $text criteria.
+            limit (int): Maximum number of documents to return.
+            after (tuple[float, ObjectId] | None): score and _id of the last document of the previous page.
+            raw (bool): return raw dicts instead of beanie documents.
+            projection (dict[str, Any] | None): fields to return in raw mode, all of them if None.
+
+        Returns:
+            list[tuple[Document | dict[str, Any], float]]: documents of the page with their text score.
+        """
+        pipeline: list[dict[str, Any]] = [
+            {"$match": filters},
+            {"$addFields": {"_score": {"$meta": "textScore"}}},
+        ]
+        if after is not None:
+            score, last_id = after
+            pipeline.append(
+                {"$match": {"$or": [{"_score": {"$lt": score}}, {"_score": score, "_id": {"$gt": last_id}}]}},
+            )
+        pipeline += [{"$sort": {"_score": -1, "_id": 1}}, {"$limit": limit}]
+        if raw and projection:
+            pipeline.append({"$project": {**projection, "_id": 1, "_score": 1}})
+        results = []
+        cursor = self.collection(LISTING_READ).aggregate(pipeline, **self.time_limit(LISTING_READ, "maxTimeMS"))
+        async with closing_cursor(cursor):
+            async for document in cursor:
+                score = document.pop("_score")
+                results.append((document if raw else self.model.model_validate(document), score))
+        return results
+
+    async def count_by_fields(self, filters: dict[str, Any], fields: list[str]) -> dict[str, dict[Any, int]]:
+        """Count the documents matching the filters per value of each field.
+
+        All the counts are computed by a single $facet aggregation,
+        run with the aggregation read preference.
+
+        Args:
+            filters (dict[str, Any]): A valid MongoDB search criteria
+            fields (list[str]): fields to count the values of.
+
+        Returns:
+            dict[str, dict[Any, int]]: number of documents per value, for each field.
+        """
+        pipeline = [
+            {"$match": filters},
+            {"$facet": {field: [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}] for field in fields}},
+        ]
+        cursor = self.collection(AGGREGATION_READ).aggregate(pipeline, **self.time_limit(AGGREGATION_READ, "maxTimeMS"))
+        async with closing_cursor(cursor):
+            result = await cursor.to_list(None)
+        facets = result[0] if result else {}
+        return {field: {count["_id"]: count["count"] for count in facets.get(field, [])} for field in fields}
+
+    async def iter_raw(
+        self,
+        filters: dict[str, Any],
+        projection: dict[str, Any] | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over the raw documents matching the filters.
+
+        Documents are read from a motor cursor in batches and are not
+        hydrated into beanie documents, so memory does not grow with the result.
+        This is the read of the reports, it uses the report read preference and time limit.
+        The cursor is killed on the server if the iteration stops early.
+
+        Args:
+            filters (dict[str, Any]): A valid MongoDB search criteria
+            projection (dict[str, Any] | None): fields to return, all of them if None.
+            batch_size (int): number of documents per cursor batch.
+
+        Yields:
+            dict[str, Any]: raw document.
+        """
+        cursor = self.collection(REPORT_READ).find(
+            filters,
+            projection,
+            batch_size=batch_size,
+            **self.time_limit(REPORT_READ),
+        )
+        async with closing_cursor(cursor):
+            async for document in cursor:
+                yield document
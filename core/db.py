@@ -2,13 +2,99 @@
 from logging import info
 
 from beanie import init_beanie
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
 
 from candidates.models import Candidate
+from core.monitoring import command_monitor, pool_monitor
 from core.settings import Settings
+from core.slow_queries import slow_query_monitor
 from users.models import User
 
+DOCUMENT_MODELS = [User, Candidate]
+
+
+def get_mongodb_client() -> AsyncIOMotorClient:
+    """Create a new motor client using the configured connection string.
+
+    UUIDs are stored as standard binary UUIDs (what beanie writes),
+    so raw documents read with motor have UUID values too.
+
+    The pool, timeouts and compression come from the settings,
+    and the pool and command listeners collect their metrics.
+    The slow query listener is added when the slow query log is enabled.
+
+    Returns:
+        AsyncIOMotorClient: motor client connected to DATABASE_URL.
+    """
+    settings = Settings()
+    options = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxConnecting": settings.MONGODB_MAX_CONNECTING,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+    }
+    slow_query_monitor.configure(
+        settings.SLOW_QUERY_THRESHOLD_MS,
+        settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+        settings.SLOW_QUERY_COLLECTION_SIZE_BYTES,
+        settings.SLOW_QUERY_EXPLAIN_MAX_TIME_MS,
+    )
+    event_listeners = [pool_monitor, command_monitor]
+    if slow_query_monitor.enabled:
+        event_listeners.append(slow_query_monitor)
+    if settings.MONGODB_COMPRESSORS:
+        options["compressors"] = settings.MONGODB_COMPRESSORS
+        options["zlibCompressionLevel"] = settings.MONGODB_ZLIB_COMPRESSION_LEVEL
+    return AsyncIOMotorClient(
+        settings.DATABASE_URL,
+        uuidRepresentation="standard",
+        event_listeners=event_listeners,
+        **options,
+    )
+
+
+async def query_timeout_handler(request: Request, exc: ExecutionTimeout) -> JSONResponse:
+    """Answer a request whose query was stopped by the server because it ran over its time limit.
+
+    Args:
+        request (Request): the request.
+        exc (ExecutionTimeout): the error raised by the query.
+
+    Returns:
+        JSONResponse: 504 error.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "The query took too long, narrow the search criteria."},
+    )
+
+
+async def database_unavailable_handler(request: Request, exc: ConnectionFailure) -> JSONResponse:
+    """Answer a request that could not reach the database.
+
+    It is raised when no server can be selected or when the connection pool
+    stays full for longer than the wait queue timeout.
+
+    Args:
+        request (Request): the request.
+        exc (ConnectionFailure): the error raised by the driver.
+
+    Returns:
+        JSONResponse: 503 error, the client can retry.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The database is unavailable, retry later."},
+        headers={"Retry-After": "1"},
+    )
+
 
 async def db_lifespan(app: FastAPI):
     """Function to start the connection with mongo db.
@@ -19,14 +105,13 @@ async def db_lifespan(app: FastAPI):
     Raises:
         Exception: if the connection failed
     """
-    CONNECTION_STRING = Settings().DATABASE_URL
-    app.mongodb_client = AsyncIOMotorClient(CONNECTION_STRING)
+    app.mongodb_client = get_mongodb_client()
     app.database = app.mongodb_client.get_default_database()
     ping_response = await app.database.command("ping")
     if int(ping_response["ok"]) != 1:
         raise Exception("Problem connecting to database cluster.")
     else:
-        await init_beanie(database=app.database, document_models=[User, Candidate])
+        await init_beanie(database=app.database, document_models=DOCUMENT_MODELS)
         info("Connected to database cluster.")
 
     yield
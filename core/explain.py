@@ -0,0 +1,152 @@
+"""A module that helps reading MongoDB query plans."""
+from dataclasses import dataclass, field
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.read_preferences import _ServerMode
+
+
+@dataclass
+class ExplainSummary:
+    """The numbers of an explain("executionStats") output we care about."""
+
+    stages: list[str] = field(default_factory=list)
+    indexes: list[str] = field(default_factory=list)
+    keys_examined: int = 0
+    docs_examined: int = 0
+    returned: int = 0
+    millis: int = 0
+
+    @property
+    def collection_scan(self) -> bool:
+        """True if the winning plan scans the whole collection."""
+        return "COLLSCAN" in self.stages
+
+    @property
+    def docs_examined_per_returned(self) -> float:
+        """Number of documents read to return one document, 1 is ideal."""
+        return self.docs_examined / max(self.returned, 1)
+
+
+def plan_stages(plan: Any) -> list[str]:
+    """Collect the stage names of a query plan, from the top stage down.
+
+    Args:
+        plan (Any): winning plan, or any part of it.
+
+    Returns:
+        list[str]: stage names such as IXSCAN, FETCH or COLLSCAN.
+    """
+    stages: list[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages += plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages += plan_stages(value)
+    return stages
+
+
+def plan_indexes(plan: Any) -> list[str]:
+    """Collect the names of the indexes scanned by a query plan.
+
+    Args:
+        plan (Any): winning plan, or any part of it.
+
+    Returns:
+        list[str]: index names such as _id_ or career_level_1_job_major_1__id_1.
+    """
+    indexes: list[str] = []
+    if isinstance(plan, dict):
+        if "indexName" in plan:
+            indexes.append(plan["indexName"])
+        for value in plan.values():
+            indexes += plan_indexes(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            indexes += plan_indexes(value)
+    return indexes
+
+
+def summarize_explain(explain: dict[str, Any]) -> ExplainSummary:
+    """Build an ExplainSummary out of an explain("executionStats") output.
+
+    The plan of an aggregation that is not fully pushed down to the query layer
+    is the one of its first stage, the $cursor that reads the collection.
+
+    Args:
+        explain (dict[str, Any]): explain command response.
+
+    Returns:
+        ExplainSummary: summary of the winning plan and its execution.
+    """
+    if "queryPlanner" not in explain and explain.get("stages"):
+        explain = explain["stages"][0].get("$cursor", {})
+    stats = explain.get("executionStats", {})
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    return ExplainSummary(
+        stages=plan_stages(winning_plan),
+        indexes=plan_indexes(winning_plan),
+        keys_examined=stats.get("totalKeysExamined", 0),
+        docs_examined=stats.get("totalDocsExamined", 0),
+        returned=stats.get("nReturned", 0),
+        millis=stats.get("executionTimeMillis", 0),
+    )
+
+
+async def explain_find(
+    collection: AsyncIOMotorCollection,
+    filters: dict[str, Any],
+    sort: dict[str, int] | None = None,
+    limit: int = 0,
+) -> ExplainSummary:
+    """Run explain("executionStats") on a find command.
+
+    Args:
+        collection (AsyncIOMotorCollection): collection to query.
+        filters (dict[str, Any]): A valid MongoDB search criteria.
+        sort (dict[str, int] | None): sort specification of the find.
+        limit (int): limit of the find, 0 means no limit.
+
+    Returns:
+        ExplainSummary: summary of the winning plan and its execution.
+    """
+    find: dict[str, Any] = {"find": collection.name, "filter": filters}
+    if sort:
+        find["sort"] = sort
+    if limit:
+        find["limit"] = limit
+    return await explain_command(collection.database, find)
+
+
+async def explain_command(
+    database: AsyncIOMotorDatabase,
+    command: dict[str, Any],
+    verbosity: str = "executionStats",
+    read_preference: _ServerMode | None = None,
+    max_time_ms: int = 0,
+) -> ExplainSummary:
+    """Run explain on a command.
+
+    With the executionStats verbosity the command is run once, with queryPlanner
+    it is only planned and the execution numbers of the summary are 0.
+
+    Args:
+        database (AsyncIOMotorDatabase): database of the command.
+        command (dict[str, Any]): find, aggregate, count or distinct command, its name first.
+        verbosity (str): executionStats or queryPlanner.
+        read_preference (_ServerMode | None): server to explain on, the primary if None.
+        max_time_ms (int): time limit of the explained command, it replaces the one of the command, 0 to keep it.
+
+    Raises:
+        ExecutionTimeout: if the command runs over the time limit.
+
+    Returns:
+        ExplainSummary: summary of the winning plan and its execution.
+    """
+    if max_time_ms:
+        command = {**command, "maxTimeMS": max_time_ms}
+    explain = await database.command("explain", command, verbosity=verbosity, read_preference=read_preference)
+    return summarize_explain(explain)
@@ -0,0 +1,372 @@
+"""A module that exposes the metrics in the Prometheus text format.
+
+Every gunicorn worker has its own counters. When METRICS_DIR is set, each worker
+writes its samples to a file of the directory every few seconds and the /metrics
+endpoint adds up the files of all the workers, so the scraped values are the ones
+of the whole server whatever worker answers the scrape. The counters of a worker
+that exited are kept, so they never go down, its gauges are dropped.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from collections import defaultdict
+from typing import Any, Callable
+
+# Content type of the Prometheus text format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Metric family, sample name and sorted labels of a sample.
+SampleKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+
+class Exposition:
+    """Samples of a set of metrics in the Prometheus data model."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.families: dict[str, tuple[str, str]] = {}
+        self.samples: dict[SampleKey, float] = {}
+
+    def add(self, family: str, kind: str, description: str, value: float, sample: str = "", **labels: Any) -> None:
+        """Add a value to a sample, the values of the same sample are summed.
+
+        Args:
+            family (str): name of the metric.
+            kind (str): counter, gauge or histogram.
+            description (str): help text of the metric.
+            value (float): the value.
+            sample (str): name of the sample if it is not the name of the metric, e.g. the _bucket of a histogram.
+            labels (Any): labels of the sample.
+        """
+        self.families.setdefault(family, (kind, description))
+        key = (family, sample or family, tuple(sorted((name, str(label)) for name, label in labels.items())))
+        self.samples[key] = self.samples.get(key, 0) + value
+
+    def counter(self, name: str, description: str, value: float, **labels: Any) -> None:
+        """Add a counter sample.
+
+        Args:
+            name (str): name of the metric, ending with _total.
+            description (str): help text of the metric.
+            value (float): the count.
+            labels (Any): labels of the sample.
+        """
+        self.add(name, "counter", description, value, **labels)
+
+    def gauge(self, name: str, description: str, value: float, **labels: Any) -> None:
+        """Add a gauge sample.
+
+        Args:
+            name (str): name of the metric.
+            description (str): help text of the metric.
+            value (float): the current value.
+            labels (Any): labels of the sample.
+        """
+        self.add(name, "gauge", description, value, **labels)
+
+    def histogram(self, name: str, description: str, stats: dict[str, Any], **labels: Any) -> None:
+        """Add the samples of a histogram.
+
+        Args:
+            name (str): name of the metric.
+            description (str): help text of the metric.
+            stats (dict[str, Any]): stats of a LatencyStats.
+            labels (Any): labels of the samples.
+        """
+        for bound, count in stats["buckets"].items():
+            self.add(name, "histogram", description, count, f"{name}_bucket", le=bound, **labels)
+        self.add(name, "histogram", description, stats["sum"], f"{name}_sum", **labels)
+        self.add(name, "histogram", description, stats["count"], f"{name}_count", **labels)
+
+    def merge(self, other: "Exposition", gauges: bool = True) -> None:
+        """Add the samples of another exposition to this one.
+
+        Args:
+            other (Exposition): the samples to add.
+            gauges (bool): False to skip the gauges, e.g. of a worker that exited.
+        """
+        for (family, sample, labels), value in other.samples.items():
+            kind, description = other.families[family]
+            if kind == "gauge" and not gauges:
+                continue
+            self.add(family, kind, description, value, sample, **dict(labels))
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the exposition to JSON compatible data.
+
+        Returns:
+            dict[str, Any]: the families and the samples.
+        """
+        return {
+            "families": self.families,
+            "samples": [[family, sample, labels, value] for (family, sample, labels), value in self.samples.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Exposition":
+        """Build an exposition from the data of to_dict.
+
+        Args:
+            data (dict[str, Any]): the families and the samples.
+
+        Returns:
+            Exposition: the exposition.
+        """
+        exposition = cls()
+        exposition.families = {family: tuple(value) for family, value in data["families"].items()}
+        for family, sample, labels, value in data["samples"]:
+            exposition.samples[(family, sample, tuple(tuple(label) for label in labels))] = value
+        return exposition
+
+    def render(self) -> str:
+        """Render the samples in the Prometheus text format.
+
+        Returns:
+            str: the metrics page.
+        """
+        samples = defaultdict(list)
+        for (family, sample, labels), value in self.samples.items():
+            samples[family].append((sample, labels, value))
+        lines = []
+        for family in sorted(samples):
+            kind, description = self.families[family]
+            lines.append(f"# HELP {family} {escape(description, quotes=False)}")
+            lines.append(f"# TYPE {family} {kind}")
+            for sample, labels, value in samples[family]:
+                lines.append(f"{sample}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    """Format the labels of a sample.
+
+    Args:
+        labels (tuple[tuple[str, str], ...]): names and values of the labels.
+
+    Returns:
+        str: the labels between braces, empty if there are none.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+def escape(text: str, quotes: bool = True) -> str:
+    """Escape a help text or a label value.
+
+    Args:
+        text (str): the text.
+        quotes (bool): escape the double quotes too, they are only escaped in label values.
+
+    Returns:
+        str: the text with its backslashes, line feeds and double quotes escaped.
+    """
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if quotes else text
+
+
+def format_value(value: float) -> str:
+    """Format the value of a sample.
+
+    Args:
+        value (float): the value.
+
+    Returns:
+        str: integers without decimals, floats with all their digits.
+    """
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def add_request_metrics(exposition: Exposition, stats: dict[str, Any]) -> None:
+    """Add the metrics of the requests.
+
+    Args:
+        exposition (Exposition): where to add them.
+        stats (dict[str, Any]): stats of a RequestMonitor.
+    """
+    exposition.gauge("http_requests_in_flight", "Requests being handled.", stats["in_flight"])
+    for route in stats["routes"]:
+        labels = {"method": route["method"], "route": route["route"]}
+        exposition.histogram(
+            "http_request_duration_seconds",
+            "Time to handle a request, until its last byte is sent.",
+            route["latency"],
+            **labels,
+        )
+        for status_code, count in route["responses"].items():
+            exposition.counter("http_responses_total", "Responses per status.", count, status=status_code, **labels)
+        for part, part_stats in route["parts"].items():
+            exposition.histogram(
+                "http_request_part_duration_seconds",
+                "Time spent in mongo, auth, bcrypt and serialization by the requests that used them.",
+                part_stats,
+                part=part,
+                **labels,
+            )
+
+
+def add_mongodb_metrics(exposition: Exposition, pool_stats: dict[str, Any], command_stats: dict[str, Any]) -> None:
+    """Add the metrics of the MongoDB connection pools and commands.
+
+    Args:
+        exposition (Exposition): where to add them.
+        pool_stats (dict[str, Any]): stats of a PoolMonitor.
+        command_stats (dict[str, Any]): stats of a CommandMonitor.
+    """
+    for server, server_stats in pool_stats["servers"].items():
+        exposition.gauge("mongodb_pool_connections", "Open connections.", server_stats["open"], server=server)
+        exposition.gauge(
+            "mongodb_pool_checked_out_connections",
+            "Connections in use.",
+            server_stats["checked_out"],
+            server=server,
+        )
+        exposition.gauge("mongodb_pool_max_size", "Pool size limit.", server_stats["max_pool_size"], server=server)
+    for reason, count in pool_stats["checkout_failures"].items():
+        exposition.counter("mongodb_pool_checkout_failures_total", "Failed connection checkouts.", count, reason=reason)
+    exposition.histogram(
+        "mongodb_pool_checkout_wait_seconds",
+        "Time waited for a connection.",
+        pool_stats["checkout_wait"],
+    )
+    for command, stats in command_stats.items():
+        exposition.histogram("mongodb_command_duration_seconds", "Duration of the commands.", stats, command=command)
+        exposition.counter("mongodb_command_failures_total", "Failed commands.", stats["failures"], command=command)
+
+
+def add_cache_metrics(exposition: Exposition, cache: str, stats: dict[str, Any]) -> None:
+    """Add the metrics of a cache.
+
+    Args:
+        exposition (Exposition): where to add them.
+        cache (str): name of the cache.
+        stats (dict[str, Any]): stats of an LRUCache.
+    """
+    exposition.gauge("cache_entries", "Entries in the cache.", stats["size"], cache=cache)
+    exposition.gauge("cache_bytes", "Approximate size of the entries in the cache.", stats["bytes"], cache=cache)
+    exposition.counter("cache_hits_total", "Cache hits.", stats["hits"], cache=cache)
+    exposition.counter("cache_misses_total", "Cache misses.", stats["misses"], cache=cache)
+    exposition.counter("cache_evictions_total", "Entries evicted to make room.", stats["evictions"], cache=cache)
+
+
+def add_executor_metrics(exposition: Exposition, executor: str, stats: dict[str, Any]) -> None:
+    """Add the metrics of a BoundedExecutor.
+
+    Args:
+        exposition (Exposition): where to add them.
+        executor (str): name of the executor.
+        stats (dict[str, Any]): stats of the executor.
+    """
+    exposition.gauge("executor_running", "Calls running.", stats["running"], executor=executor)
+    exposition.gauge("executor_waiting", "Calls waiting for a worker.", stats["waiting"], executor=executor)
+    exposition.counter("executor_completed_total", "Completed calls.", stats["completed"], executor=executor)
+    exposition.counter("executor_rejected_total", "Calls rejected, queue full.", stats["rejected"], executor=executor)
+
+
+def add_read_coalescing_metrics(exposition: Exposition, stats: dict[str, Any]) -> None:
+    """Add the metrics of a SingleFlight.
+
+    Args:
+        exposition (Exposition): where to add them.
+        stats (dict[str, Any]): stats of the SingleFlight.
+    """
+    exposition.gauge("read_coalescing_in_flight", "Reads in flight.", stats["in_flight"])
+    exposition.counter("read_coalescing_executed_total", "Reads executed.", stats["executed"])
+    exposition.counter("read_coalescing_deduplicated_total", "Reads that joined one in flight.", stats["deduplicated"])
+    exposition.counter("read_coalescing_abandoned_total", "Reads cancelled by all their callers.", stats["abandoned"])
+
+
+def add_slow_query_metrics(exposition: Exposition, stats: dict[str, Any]) -> None:
+    """Add the metrics of a SlowQueryMonitor.
+
+    Args:
+        exposition (Exposition): where to add them.
+        stats (dict[str, Any]): stats of the SlowQueryMonitor.
+    """
+    exposition.counter("slow_queries_total", "Commands over the slow query threshold.", stats["slow"])
+    exposition.counter("slow_query_explains_total", "Slow query shapes explained.", stats["explained"])
+    exposition.counter("slow_queries_dropped_total", "Slow queries not recorded.", stats["dropped"])
+
+
+def pid_alive(pid: int) -> bool:
+    """Check if a process is running.
+
+    Args:
+        pid (int): id of the process.
+
+    Returns:
+        bool: True if the process exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_worker_metrics(directory: str, exposition: Exposition) -> None:
+    """Write the samples of this worker to its file of the metrics directory.
+
+    The samples are written to a temporary file that replaces the file of the worker,
+    so a reader never sees a partial file.
+
+    Args:
+        directory (str): the metrics directory.
+        exposition (Exposition): samples of this worker.
+    """
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=f"{os.getpid()}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(exposition.to_dict(), file)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def merge_worker_metrics(directory: str, exposition: Exposition) -> Exposition:
+    """Add up the samples of this worker and the files of the other workers.
+
+    Args:
+        directory (str): the metrics directory.
+        exposition (Exposition): current samples of this worker, used instead of its file.
+
+    Returns:
+        Exposition: the samples of the whole server.
+    """
+    merged = Exposition()
+    merged.merge(exposition)
+    for name in os.listdir(directory):
+        pid = name.removesuffix(".json")
+        if not name.endswith(".json") or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                worker = Exposition.from_dict(json.load(file))
+        except (OSError, ValueError):
+            continue
+        merged.merge(worker, gauges=pid_alive(int(pid)))
+    return merged
+
+
+async def export_worker_metrics(directory: str, collect: Callable[[], Exposition], interval: float) -> None:
+    """Write the samples of this worker every interval seconds, and a last time when cancelled.
+
+    Args:
+        directory (str): the metrics directory.
+        collect (Callable[[], Exposition]): function that collects the samples of this worker.
+        interval (float): seconds between two writes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    try:
+        while True:
+            write_worker_metrics(directory, collect())
+            await asyncio.sleep(interval)
+    finally:
+        write_worker_metrics(directory, collect())
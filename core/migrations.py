@@ -0,0 +1,112 @@
+"""A module that has the data migrations to run against existing collections.
+
+Migrations work on the raw motor collections instead of the beanie models,
+because beanie tries to build the declared indexes on init and that fails
+while the data still violates them.
+"""
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, UpdateOne
+
+UUID_INDEX_NAME = "uuid_1"
+
+
+@dataclass
+class UUIDMigrationReport:
+    """Outcome of the uuid migration for a single collection."""
+
+    collection: str
+    backfilled: int = 0
+    duplicates: list[str] = field(default_factory=list)
+    duplicate_emails: list[str] = field(default_factory=list)
+    index_created: bool = False
+    uses_index: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """True when the collection is fully indexed by uuid and its unique email index can be built."""
+        return not self.duplicates and not self.duplicate_emails and self.index_created and self.uses_index
+
+
+async def backfill_uuid(collection: AsyncIOMotorCollection, batch_size: int = 1000) -> int:
+    """Set a new uuid on every document that does not have one.
+
+    Args:
+        collection (AsyncIOMotorCollection): collection to backfill.
+        batch_size (int): number of updates to send in one bulk write.
+
+    Returns:
+        int: number of updated documents.
+    """
+    updated = 0
+    operations: list[UpdateOne] = []
+    async for document in collection.find({"uuid": None}, {"_id": 1}):
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {"uuid": Binary.from_uuid(uuid4())}}))
+        if len(operations) >= batch_size:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+    if operations:
+        result = await collection.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+    return updated
+
+
+async def find_duplicates(collection: AsyncIOMotorCollection, field_name: str = "uuid") -> list[str]:
+    """Find the values of a field that are shared by more than one document.
+
+    Args:
+        collection (AsyncIOMotorCollection): collection to check.
+        field_name (str): field that must be unique.
+
+    Returns:
+        list[str]: duplicated values.
+    """
+    pipeline = [
+        {"$group": {"_id": f"${field_name}", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    return [str(group["_id"]) async for group in collection.aggregate(pipeline, allowDiskUse=True)]
+
+
+async def uuid_lookup_uses_index(collection: AsyncIOMotorCollection) -> bool:
+    """Check that a lookup by uuid is served by an index scan.
+
+    Args:
+        collection (AsyncIOMotorCollection): collection to check.
+
+    Returns:
+        bool: True if the winning plan of a uuid lookup has an IXSCAN stage.
+    """
+    explain = await collection.find({"uuid": Binary.from_uuid(uuid4())}).explain()
+    return "IXSCAN" in str(explain["queryPlanner"]["winningPlan"])
+
+
+async def migrate_uuid_index(collection: AsyncIOMotorCollection, batch_size: int = 1000) -> UUIDMigrationReport:
+    """Backfill missing uuids, create the unique uuid index and verify it.
+
+    The index is not created when duplicated uuids are found,
+    they have to be resolved manually first. Duplicated emails are reported too,
+    beanie builds the unique email index when the app starts and fails on them.
+
+    Args:
+        collection (AsyncIOMotorCollection): collection to migrate.
+        batch_size (int): number of updates to send in one bulk write.
+
+    Returns:
+        UUIDMigrationReport: what was done on the collection.
+    """
+    report = UUIDMigrationReport(collection=collection.name)
+    report.backfilled = await backfill_uuid(collection, batch_size)
+    report.duplicate_emails = await find_duplicates(collection, "email")
+    report.duplicates = await find_duplicates(collection)
+    if report.duplicates:
+        return report
+    await collection.create_index([("uuid", ASCENDING)], unique=True, name=UUID_INDEX_NAME)
+    index = (await collection.index_information()).get(UUID_INDEX_NAME, {})
+    report.index_created = bool(index.get("unique"))
+    report.uses_index = await uuid_lookup_uses_index(collection)
+    return report
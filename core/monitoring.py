@@ -0,0 +1,362 @@
+"""A module that collects the request, MongoDB connection pool and command metrics.
+
+pymongo calls the listeners from the threads motor runs it in,
+so every counter is updated under a lock. motor runs them with a copy
+of the context of the request, so the command time is added to the request it belongs to.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from pymongo import monitoring
+
+# Upper bounds in seconds of the latency histograms buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Parts of a request timed separately, they can overlap: auth includes its user lookup in mongo.
+MONGO = "mongo"
+AUTH = "auth"
+BCRYPT = "bcrypt"
+SERIALIZATION = "serialization"
+REQUEST_PARTS = (MONGO, AUTH, BCRYPT, SERIALIZATION)
+
+
+class LatencyStats:
+    """Count, sum, max and histogram of durations."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Class constructor.
+
+        Args:
+            buckets (tuple[float, ...]): sorted upper bounds in seconds of the histogram buckets.
+        """
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Record a duration.
+
+        Args:
+            seconds (float): the duration.
+        """
+        with self.lock:
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.bucket_counts[index] += 1
+                    break
+
+    def stats(self) -> dict[str, float | int | dict[str, int]]:
+        """Summary of the recorded durations.
+
+        Returns:
+            dict[str, float | int | dict[str, int]]: count, sum, mean and max in seconds, and the
+            cumulative number of durations under each bucket bound, the Prometheus histogram shape.
+        """
+        with self.lock:
+            cumulative = {}
+            total = 0
+            for bound, count in zip(self.buckets, self.bucket_counts):
+                total += count
+                cumulative[str(bound)] = total
+            cumulative["+Inf"] = self.count
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "mean": self.sum / self.count if self.count else 0.0,
+                "max": self.max,
+                "buckets": cumulative,
+            }
+
+
+class RequestTimings:
+    """Time spent in each part of one request."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.seconds: defaultdict[str, float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def add(self, part: str, seconds: float) -> None:
+        """Add time to a part of the request.
+
+        Args:
+            part (str): one of REQUEST_PARTS.
+            seconds (float): the time spent.
+        """
+        with self.lock:
+            self.seconds[part] += seconds
+
+
+# Timings of the request being handled, set by the metrics middleware.
+request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def add_request_time(part: str, seconds: float) -> None:
+    """Add time to a part of the current request, if there is one.
+
+    Args:
+        part (str): one of REQUEST_PARTS.
+        seconds (float): the time spent.
+    """
+    timings = request_timings.get()
+    if timings is not None:
+        timings.add(part, seconds)
+
+
+@contextmanager
+def timed(part: str) -> Iterator[None]:
+    """Add the time spent in the block to a part of the current request.
+
+    Args:
+        part (str): one of REQUEST_PARTS.
+
+    Yields:
+        None: nothing.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_request_time(part, time.perf_counter() - start)
+
+
+class RequestMonitor:
+    """Track the latency, responses and time breakdown of the requests per route."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.latency: dict[tuple[str, str], LatencyStats] = {}
+        self.responses: defaultdict[tuple[str, str], defaultdict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.parts: dict[tuple[str, str], dict[str, LatencyStats]] = {}
+
+    def started(self) -> None:
+        """Count a request being handled."""
+        with self.lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status_code: int, seconds: float, timings: RequestTimings) -> None:
+        """Record a handled request.
+
+        A part is recorded only for the requests that spent time in it, so its quantiles
+        are not pulled toward 0 by the requests that did not use it, and its count is
+        the number of requests of the route that used it.
+
+        Args:
+            method (str): HTTP method.
+            route (str): path template of the route, not the path, to keep the number of routes bounded.
+            status_code (int): status code of the response.
+            seconds (float): time to handle the request, until its last byte is sent.
+            timings (RequestTimings): time spent in each part of the request.
+        """
+        key = (method, route)
+        with self.lock:
+            self.in_flight -= 1
+            self.responses[key][status_code] += 1
+            if key not in self.latency:
+                self.latency[key] = LatencyStats()
+                self.parts[key] = {part: LatencyStats() for part in REQUEST_PARTS}
+            latency = self.latency[key]
+            parts = self.parts[key]
+        latency.observe(seconds)
+        with timings.lock:
+            spent = dict(timings.seconds)
+        for part, stats in parts.items():
+            if spent.get(part):
+                stats.observe(spent[part])
+
+    def stats(self) -> dict:
+        """Requests in flight and latency, responses and time breakdown per route.
+
+        Returns:
+            dict: number of requests in flight and the stats of each route.
+        """
+        with self.lock:
+            in_flight = self.in_flight
+            routes = [
+                (method, route, latency, dict(self.responses[(method, route)]), self.parts[(method, route)])
+                for (method, route), latency in sorted(self.latency.items())
+            ]
+        return {
+            "in_flight": in_flight,
+            "routes": [
+                {
+                    "method": method,
+                    "route": route,
+                    "latency": latency.stats(),
+                    "responses": {str(status_code): count for status_code, count in sorted(responses.items())},
+                    "parts": {part: stats.stats() for part, stats in parts.items()},
+                }
+                for method, route, latency, responses, parts in routes
+            ],
+        }
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Track the connections and the checkout wait times of the pools."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.lock = threading.Lock()
+        self.max_pool_size: dict[str, int] = {}
+        self.open: defaultdict[str, int] = defaultdict(int)
+        self.checked_out: defaultdict[str, int] = defaultdict(int)
+        self.checkout_failures: defaultdict[str, int] = defaultdict(int)
+        self.checkout_wait = LatencyStats()
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        """Record the size limit of a new pool."""
+        with self.lock:
+            self.max_pool_size[self.server(event)] = event.options.get("maxPoolSize", 100)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        """Nothing to record."""
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        """Nothing to record, the closed connections are reported one by one."""
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        """Forget a closed pool."""
+        with self.lock:
+            self.max_pool_size.pop(self.server(event), None)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        """Count a new connection."""
+        with self.lock:
+            self.open[self.server(event)] += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        """Nothing to record."""
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        """Count a closed connection."""
+        with self.lock:
+            self.open[self.server(event)] -= 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        """Nothing to record, the wait time is reported by the checked out event."""
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        """Count a failed checkout, usually a wait queue timeout."""
+        self.checkout_wait.observe(event.duration)
+        with self.lock:
+            self.checkout_failures[event.reason] += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        """Record the time the checkout waited for a connection."""
+        self.checkout_wait.observe(event.duration)
+        with self.lock:
+            self.checked_out[self.server(event)] += 1
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        """Count a connection given back to the pool."""
+        with self.lock:
+            self.checked_out[self.server(event)] -= 1
+
+    def server(self, event: Any) -> str:
+        """Name of the server of a pool event.
+
+        Args:
+            event (Any): pool or connection event.
+
+        Returns:
+            str: host:port of the server.
+        """
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def stats(self) -> dict:
+        """Connections per server and checkout wait times.
+
+        Returns:
+            dict: open and checked out connections, pool size limit and utilization per server,
+            checkout failures per reason and the checkout wait times.
+        """
+        with self.lock:
+            servers = {
+                server: {
+                    "open": self.open[server],
+                    "checked_out": self.checked_out[server],
+                    "max_pool_size": max_pool_size,
+                    "utilization": self.checked_out[server] / max_pool_size if max_pool_size else 0.0,
+                }
+                for server, max_pool_size in self.max_pool_size.items()
+            }
+            failures = dict(self.checkout_failures)
+        return {"servers": servers, "checkout_failures": failures, "checkout_wait": self.checkout_wait.stats()}
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Track the latency of the commands per command name."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.lock = threading.Lock()
+        self.latency: dict[str, LatencyStats] = {}
+        self.failures: defaultdict[str, int] = defaultdict(int)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        """Nothing to record, the duration is reported when the command ends."""
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        """Record the duration of a command."""
+        self.observe(event.command_name, event.duration_micros / 1_000_000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        """Record the duration of a failed command and count the failure."""
+        self.observe(event.command_name, event.duration_micros / 1_000_000)
+        with self.lock:
+            self.failures[event.command_name] += 1
+
+    def observe(self, command_name: str, seconds: float) -> None:
+        """Record the duration of a command, and add it to the mongo time of the current request.
+
+        Args:
+            command_name (str): name of the command.
+            seconds (float): duration of the command.
+        """
+        self.command_latency(command_name).observe(seconds)
+        add_request_time(MONGO, seconds)
+
+    def command_latency(self, command_name: str) -> LatencyStats:
+        """Get the latency stats of a command, created on its first use.
+
+        Args:
+            command_name (str): name of the command, find, insert, aggregate...
+
+        Returns:
+            LatencyStats: latency of the command.
+        """
+        with self.lock:
+            if command_name not in self.latency:
+                self.latency[command_name] = LatencyStats()
+            return self.latency[command_name]
+
+    def stats(self) -> dict:
+        """Latency and failures per command.
+
+        Returns:
+            dict: latency stats and number of failures of each command.
+        """
+        with self.lock:
+            commands = dict(self.latency)
+            failures = dict(self.failures)
+        return {
+            name: {**latency.stats(), "failures": failures.get(name, 0)} for name, latency in sorted(commands.items())
+        }
+
+
+request_monitor = RequestMonitor()
+pool_monitor = PoolMonitor()
+command_monitor = CommandMonitor()
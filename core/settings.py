@@ -1,6 +1,10 @@
 """A module that contain global setting to use."""
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+ReadPreferenceMode = Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"]
+
 
 class Settings(BaseSettings):
     """Setting class that will set the values from .env file."""
@@ -14,4 +18,58 @@ class Settings(BaseSettings):
     MONGODB_USER: str
     MONGODB_PASSWORD: str
     MONGODB_DATABASE: str
+    # Connection pool of each worker, gunicorn runs 4 workers so the server sees up to 4 times these numbers.
+    MONGODB_MAX_POOL_SIZE: int = 25
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_CONNECTING: int = 2
+    MONGODB_MAX_IDLE_TIME_MS: int | None = 60_000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int | None = 5_000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10_000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 10_000
+    MONGODB_SOCKET_TIMEOUT_MS: int | None = None
+    # Comma separated wire compressors, zstd needs the zstandard package, e.g. "zstd,zlib".
+    MONGODB_COMPRESSORS: str = ""
+    MONGODB_ZLIB_COMPRESSION_LEVEL: int = -1
+    # Read preference of the heavy reads, writes and lookups by uuid always use the primary.
+    LISTING_READ_PREFERENCE: ReadPreferenceMode = "secondaryPreferred"
+    REPORT_READ_PREFERENCE: ReadPreferenceMode = "secondaryPreferred"
+    AGGREGATION_READ_PREFERENCE: ReadPreferenceMode = "secondaryPreferred"
+    # How far behind the primary a secondary can be to serve those reads, at least 90, -1 for no limit.
+    READ_MAX_STALENESS_SECONDS: int = 90
+    # Server side time limit of each kind of read, a read over it fails with a 504, 0 for no limit.
+    # The report limit counts the time spent by the server on the whole cursor, not the download time.
+    LOOKUP_MAX_TIME_MS: int = 1_000
+    LISTING_MAX_TIME_MS: int = 5_000
+    AGGREGATION_MAX_TIME_MS: int = 10_000
+    REPORT_MAX_TIME_MS: int = 300_000
+    FACETS_CACHE_TTL_SECONDS: float = 30
+    FACETS_CACHE_MAX_SIZE: int = 1024
+    # A candidate written through another worker is served from the cache of a worker for up to this long.
+    CANDIDATE_CACHE_TTL_SECONDS: float = 10
+    CANDIDATE_CACHE_NOT_FOUND_TTL_SECONDS: float = 5
+    CANDIDATE_CACHE_MAX_SIZE: int = 10000
+    LISTING_CACHE_TTL_SECONDS: float = 10
+    LISTING_CACHE_MAX_SIZE: int = 1024
+    LISTING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    PASSWORD_HASHING_WORKERS: int = 2
+    PASSWORD_HASHING_MAX_QUEUE: int = 64
+    # Users are cached per worker, a changed or deleted user can be authenticated by a worker for up to this long.
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 5
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    GZIP_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 5
+    # Commands slower than this are written with their query shape to the capped slow_queries collection, 0 to disable.
+    SLOW_QUERY_THRESHOLD_MS: float = 100
+    # A slow query shape is explained at most once per interval.
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = 300
+    # The explain runs the query again to count the keys and documents it examines, stopped after this long,
+    # the query is then only planned and its plan has no execution counters. 0 to only plan the queries.
+    SLOW_QUERY_EXPLAIN_MAX_TIME_MS: int = 1_000
+    SLOW_QUERY_COLLECTION_SIZE_BYTES: int = 16 * 1024 * 1024
+    # Directory shared by the gunicorn workers to add up their metrics, empty to expose the metrics of one worker.
+    METRICS_DIR: str = ""
+    METRICS_EXPORT_INTERVAL_SECONDS: float = 5
+    # /metrics and /stats answer the comma separated client IPs, and the requests with this bearer token if it is set.
+    MONITORING_ALLOWED_IPS: str = "127.0.0.1,::1"
+    MONITORING_TOKEN: str = ""
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
@@ -0,0 +1,82 @@
+"""A module that coalesces identical concurrent reads.
+
+Coalescing is per worker process, like the caches.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Run a single call at a time per key, the concurrent callers of the same key share its result.
+
+    The call runs in its own task, so a caller that is cancelled
+    does not cancel it for the other callers. It is cancelled when
+    all its callers are, e.g. every client waiting for it disconnected.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.calls: dict[Hashable, asyncio.Task] = {}
+        self.waiters: dict[asyncio.Task, int] = {}
+        self.executed = 0
+        self.deduplicated = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func, or wait for the call of the same key that is in flight.
+
+        Args:
+            key (Hashable): identifies the call, calls with the same key must return the same result.
+            func (Callable[[], Awaitable[Any]]): function that starts the call.
+
+        Returns:
+            Any: the result of the call, shared by every caller so it must not be changed.
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.finish(key, done))
+            self.executed += 1
+        else:
+            self.deduplicated += 1
+        self.waiters[task] = self.waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.waiters[task] == 1 and not task.done():
+                # Nobody is left to use the result.
+                task.cancel()
+                self.abandoned += 1
+            raise
+        finally:
+            self.waiters[task] -= 1
+            if not self.waiters[task]:
+                del self.waiters[task]
+
+    def finish(self, key: Hashable, task: asyncio.Task) -> None:
+        """Forget a finished call, the next call of its key runs again.
+
+        Args:
+            key (Hashable): key of the call.
+            task (asyncio.Task): finished task of the call.
+        """
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # Mark the exception as retrieved, the callers may all be gone.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """Counters of the coalesced calls.
+
+        Returns:
+            dict[str, int]: calls in flight, executed calls, calls that joined one in flight
+            and calls cancelled because all their callers were.
+        """
+        return {
+            "in_flight": len(self.calls),
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,410 @@
+"""A module that logs the slow MongoDB commands to find the queries that miss an index.
+
+A command slower than SLOW_QUERY_THRESHOLD_MS is written to the capped slow_queries
+collection with its query shape: the command with every value replaced by "?",
+so the queries that differ only by their values have the same shape and shape_id.
+The first time a shape is slow, and then at most once per SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+the command is explained and its plan is written with it, on the same kind of server as the
+command. The explain runs the command again to count the keys and documents it examines,
+stopped after SLOW_QUERY_EXPLAIN_MAX_TIME_MS. A command stopped by that limit, or any command
+when it is 0, is only planned: its plan has no execution counters.
+
+The listener runs in the threads of motor, it only hands the commands over
+to a task of the event loop that explains and writes them, so no database
+call is made from a listener. A capped collection is shared by all the gunicorn
+workers, which a rotating file is not, and it can be aggregated by shape.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from logging import warning
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, ExecutionTimeout, OperationFailure, PyMongoError
+from pymongo.read_preferences import Primary, _ServerMode
+
+from core.common_repos import READ_PREFERENCES
+from core.explain import ExplainSummary, explain_command
+
+SLOW_QUERIES_COLLECTION = "slow_queries"
+
+# Server error code of a create of a collection that already exists, when two workers start at the same time.
+NAMESPACE_EXISTS = 48
+
+# Fields of each explainable command that are kept to explain it, its name first.
+EXPLAIN_FIELDS = {
+    "find": ("find", "filter", "sort", "projection", "skip", "limit", "hint", "maxTimeMS"),
+    "aggregate": ("aggregate", "pipeline", "cursor", "hint", "maxTimeMS"),
+    "count": ("count", "query", "hint", "maxTimeMS"),
+    "distinct": ("distinct", "key", "query", "maxTimeMS"),
+}
+
+# Fields of each explainable command that make its query shape.
+SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+}
+
+# Values kept as they are in a shape, the order and direction of a sort matter to pick an index.
+SORT_FIELDS = ("sort", "$sort")
+
+# Slow commands waiting to be explained and written, the next ones are dropped when it is full.
+MAX_PENDING = 1000
+
+
+def query_shape(value: Any) -> Any:
+    """Replace the values of a query by "?", keeping its fields, operators and field paths.
+
+    Args:
+        value (Any): filter, pipeline or any part of them.
+
+    Returns:
+        Any: the shape of the value.
+    """
+    if isinstance(value, dict):
+        return {key: item if key in SORT_FIELDS else query_shape(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return [query_shape(item) for item in value]
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def command_shape(command_name: str, command: dict[str, Any]) -> str:
+    """Build the query shape of an explainable command.
+
+    The order of the fields is kept, the services build their queries in a stable order.
+
+    Args:
+        command_name (str): name of the command, a key of SHAPE_FIELDS.
+        command (dict[str, Any]): the command.
+
+    Returns:
+        str: JSON shape of the command.
+    """
+    shape = query_shape({field: command[field] for field in SHAPE_FIELDS[command_name] if field in command})
+    return json.dumps(shape, separators=(",", ":"), default=str)
+
+
+def read_preference_from_command(document: dict[str, Any] | None) -> _ServerMode:
+    """Build the read preference a command was sent with.
+
+    Args:
+        document (dict[str, Any] | None): $readPreference of the command, pymongo leaves it out for the primary.
+
+    Returns:
+        _ServerMode: the pymongo read preference.
+    """
+    if not document or document.get("mode") not in READ_PREFERENCES:
+        return Primary()
+    return READ_PREFERENCES[document["mode"]](
+        tag_sets=document.get("tags"),
+        max_staleness=document.get("maxStalenessSeconds", -1),
+    )
+
+
+def docs_returned(command_name: str, reply: dict[str, Any]) -> int | None:
+    """Count the documents returned by a command.
+
+    Args:
+        command_name (str): name of the command.
+        reply (dict[str, Any]): the reply of the server.
+
+    Returns:
+        int | None: number of documents of the first or next batch of a cursor,
+        or of the values of a distinct, None for the other commands.
+    """
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if command_name == "distinct":
+        return len(reply.get("values", []))
+    if command_name == "count":
+        return reply.get("n")
+    return None
+
+
+class SlowQueryMonitor(monitoring.CommandListener):
+    """Record the commands slower than a threshold, with a sampled plan of their shape."""
+
+    def __init__(
+        self,
+        threshold_ms: float = 0,
+        explain_interval: float = 300,
+        collection_size: int = 1 << 24,
+        explain_max_time_ms: int = 1000,
+    ) -> None:
+        """Class constructor.
+
+        Args:
+            threshold_ms (float): duration in milliseconds over which a command is recorded, 0 disables the monitor.
+            explain_interval (float): minimum seconds between two explains of the same shape.
+            collection_size (int): size in bytes of the capped collection.
+            explain_max_time_ms (int): time limit of the explains that run the command, 0 to only plan it.
+        """
+        self.configure(threshold_ms, explain_interval, collection_size, explain_max_time_ms)
+        self.lock = threading.Lock()
+        self.commands: dict[tuple[Any, int], tuple[str, dict[str, Any] | None, dict[str, Any] | None]] = {}
+        self.explained_at: dict[str, float] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.pending: asyncio.Queue | None = None
+        self.slow = 0
+        self.explained = 0
+        self.dropped = 0
+
+    def configure(
+        self,
+        threshold_ms: float,
+        explain_interval: float,
+        collection_size: int,
+        explain_max_time_ms: int = 1000,
+    ) -> None:
+        """Set the threshold, the explains and the size of the collection.
+
+        Args:
+            threshold_ms (float): duration in milliseconds over which a command is recorded, 0 disables the monitor.
+            explain_interval (float): minimum seconds between two explains of the same shape.
+            collection_size (int): size in bytes of the capped collection.
+            explain_max_time_ms (int): time limit of the explains that run the command, 0 to only plan it.
+        """
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.collection_size = collection_size
+        self.explain_max_time_ms = explain_max_time_ms
+
+    @property
+    def enabled(self) -> bool:
+        """True if slow commands are recorded."""
+        return self.threshold_ms > 0
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        """Keep the collection of the command, and what is needed to explain it on the same kind of server."""
+        if self.pending is None:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = command.get("collection")
+        if not isinstance(collection, str) or collection == SLOW_QUERIES_COLLECTION:
+            return
+        explainable = None
+        if event.command_name in EXPLAIN_FIELDS:
+            explainable = {field: command[field] for field in EXPLAIN_FIELDS[event.command_name] if field in command}
+        with self.lock:
+            self.commands[(event.connection_id, event.request_id)] = (
+                collection,
+                explainable,
+                command.get("$readPreference"),
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        """Record the command if it is slow."""
+        self.finished(event, docs_returned(event.command_name, event.reply), None)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        """Record the command if it is slow, e.g. stopped by its time limit."""
+        self.finished(event, None, event.failure.get("codeName", "failed"))
+
+    def finished(self, event: Any, docs: int | None, error: str | None) -> None:
+        """Hand a slow command over to the event loop.
+
+        Args:
+            event (Any): succeeded or failed command event.
+            docs (int | None): number of documents returned.
+            error (str | None): error code name of a failed command, the message can contain values.
+        """
+        with self.lock:
+            started = self.commands.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms:
+            return
+        collection, command, read_preference = started
+        entry: dict[str, Any] = {
+            "at": datetime.now(timezone.utc),
+            "command": event.command_name,
+            "database": event.database_name,
+            "collection": collection,
+            "duration_ms": duration_ms,
+            "docs_returned": docs,
+        }
+        if command is not None:
+            entry["read_preference"] = (read_preference or {}).get("mode", "primary")
+            entry["shape"] = command_shape(event.command_name, command)
+            entry["shape_id"] = hashlib.blake2b(entry["shape"].encode(), digest_size=8).hexdigest()
+            if not self.should_explain(entry["shape_id"]):
+                command = None
+        if error:
+            entry["error"] = error
+        loop = self.loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self.enqueue, entry, command, read_preference)
+        except RuntimeError:
+            # The loop is closed, the app is shutting down.
+            pass
+
+    def should_explain(self, shape_id: str) -> bool:
+        """Check if a shape is due for an explain, and mark it explained.
+
+        Args:
+            shape_id (str): id of the shape.
+
+        Returns:
+            bool: True if the shape was not explained in the last explain_interval seconds.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now - self.explained_at.get(shape_id, -self.explain_interval) < self.explain_interval:
+                return False
+            self.explained_at[shape_id] = now
+            return True
+
+    def enqueue(
+        self,
+        entry: dict[str, Any],
+        command: dict[str, Any] | None,
+        read_preference: dict[str, Any] | None = None,
+    ) -> None:
+        """Queue a slow command, runs in the event loop.
+
+        Args:
+            entry (dict[str, Any]): the slow command record.
+            command (dict[str, Any] | None): the command to explain, None to not explain it.
+            read_preference (dict[str, Any] | None): $readPreference the command was sent with.
+        """
+        if self.pending is None:
+            return
+        if self.pending.full():
+            self.dropped += 1
+            return
+        self.slow += 1
+        self.pending.put_nowait((entry, command, read_preference))
+
+    async def run(self, client: AsyncIOMotorClient) -> None:
+        """Explain and write the slow commands until cancelled.
+
+        Args:
+            client (AsyncIOMotorClient): client to run the explains and the writes with.
+        """
+        database = client.get_default_database()
+        try:
+            await database.create_collection(SLOW_QUERIES_COLLECTION, capped=True, size=self.collection_size)
+        except CollectionInvalid:
+            pass
+        except PyMongoError as error:
+            if not isinstance(error, OperationFailure) or error.code != NAMESPACE_EXISTS:
+                # Writing to a collection that is not capped would grow it forever.
+                warning(f"Slow query log disabled, can not create {SLOW_QUERIES_COLLECTION}: {error}")
+                return
+        self.loop = asyncio.get_running_loop()
+        self.pending = asyncio.Queue(maxsize=MAX_PENDING)
+        try:
+            while True:
+                entry, command, read_preference = await self.pending.get()
+                await self.record(client, database, entry, command, read_preference)
+        finally:
+            self.pending = None
+            self.loop = None
+            with self.lock:
+                self.commands.clear()
+
+    async def record(
+        self,
+        client: AsyncIOMotorClient,
+        database: AsyncIOMotorDatabase,
+        entry: dict[str, Any],
+        command: dict[str, Any] | None,
+        read_preference: dict[str, Any] | None = None,
+    ) -> None:
+        """Explain a slow command if needed and write it.
+
+        Args:
+            client (AsyncIOMotorClient): client to run the explain with.
+            database (AsyncIOMotorDatabase): database of the slow_queries collection.
+            entry (dict[str, Any]): the slow command record.
+            command (dict[str, Any] | None): the command to explain, None to not explain it.
+            read_preference (dict[str, Any] | None): $readPreference the command was sent with.
+        """
+        try:
+            if command is not None:
+                plan, verbosity = await self.explain(client[entry["database"]], command, read_preference)
+                self.explained += 1
+                entry["plan"] = {
+                    "verbosity": verbosity,
+                    "stages": plan.stages,
+                    "indexes": plan.indexes,
+                    "collection_scan": plan.collection_scan,
+                }
+                if verbosity == "executionStats":
+                    entry["plan"].update(
+                        keys_examined=plan.keys_examined,
+                        docs_examined=plan.docs_examined,
+                        returned=plan.returned,
+                        millis=plan.millis,
+                    )
+        except PyMongoError as error:
+            entry["explain_error"] = str(error)
+        try:
+            await database[SLOW_QUERIES_COLLECTION].insert_one(entry)
+        except PyMongoError:
+            self.dropped += 1
+
+    async def explain(
+        self,
+        database: AsyncIOMotorDatabase,
+        command: dict[str, Any],
+        read_preference: dict[str, Any] | None = None,
+    ) -> tuple[ExplainSummary, str]:
+        """Explain a command on the kind of server it was sent to.
+
+        The command is run with the executionStats verbosity under explain_max_time_ms,
+        if it runs over that limit it is explained again with queryPlanner, which only plans it.
+
+        Args:
+            database (AsyncIOMotorDatabase): database of the command.
+            command (dict[str, Any]): the command to explain.
+            read_preference (dict[str, Any] | None): $readPreference the command was sent with.
+
+        Returns:
+            tuple[ExplainSummary, str]: the plan, and the verbosity it was explained with.
+        """
+        server = read_preference_from_command(read_preference)
+        if self.explain_max_time_ms:
+            try:
+                plan = await explain_command(
+                    database,
+                    command,
+                    read_preference=server,
+                    max_time_ms=self.explain_max_time_ms,
+                )
+                return plan, "executionStats"
+            except ExecutionTimeout:
+                pass
+        plan = await explain_command(database, command, verbosity="queryPlanner", read_preference=server)
+        return plan, "queryPlanner"
+
+    def stats(self) -> dict[str, int | float]:
+        """Counters of the slow commands.
+
+        Returns:
+            dict[str, int | float]: threshold, recorded, explained and dropped slow commands.
+        """
+        return {
+            "threshold_ms": self.threshold_ms,
+            "slow": self.slow,
+            "explained": self.explained,
+            "dropped": self.dropped,
+            "pending": self.pending.qsize() if self.pending is not None else 0,
+        }
+
+
+# Configured from the settings by get_mongodb_client.
+slow_query_monitor = SlowQueryMonitor()
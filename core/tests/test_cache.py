@@ -0,0 +1,134 @@
+"""Tests of the in-process LRU cache."""
+import pytest
+
+from core import cache as cache_module
+from core.cache import LRUCache, canonical_key
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Replace the monotonic clock of the cache by a list whose first item is the current time."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_canonical_key_ignores_the_order_of_dict_keys() -> None:
+    """Canonical key ignores the order of dict keys."""
+    assert canonical_key({"a": 1, "b": {"c": 2, "d": 3}}) == canonical_key({"b": {"d": 3, "c": 2}, "a": 1})
+    assert canonical_key({"a": [1, 2]}) != canonical_key({"a": [2, 1]})
+
+
+def test_get_returns_default_for_a_missing_key() -> None:
+    """A missing key returns the default."""
+    cache = LRUCache()
+
+    assert cache.get("missing", "default") == "default"
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_the_default_ttl(clock: list[float]) -> None:
+    """Entries expire after the default TTL."""
+    cache = LRUCache(ttl=10)
+    cache.set("key", "value")
+
+    clock[0] += 9.9
+    assert cache.get("key") == "value"
+    clock[0] += 0.1
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_ttl_of_an_entry_overrides_the_default_one(clock: list[float]) -> None:
+    """The TTL of an entry overrides the default one."""
+    cache = LRUCache(ttl=60)
+    cache.set("short", "value", ttl=5)
+    cache.set("default", "value")
+
+    clock[0] += 5
+    assert cache.get("short") is None
+    assert cache.get("default") == "value"
+
+
+def test_least_recently_used_entry_is_evicted_when_full() -> None:
+    """Least recently used entry is evicted when full."""
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_are_evicted_over_max_bytes() -> None:
+    """Least recently used entries are evicted over max_bytes."""
+    cache = LRUCache(max_bytes=100)
+    cache.set("a", "a", size=40)
+    cache.set("b", "b", size=40)
+    cache.set("c", "c", size=40)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+    assert cache.stats()["bytes"] == 80
+
+
+def test_value_bigger_than_max_bytes_is_not_cached() -> None:
+    """A value bigger than max_bytes is not cached."""
+    cache = LRUCache(max_bytes=100)
+    cache.set("a", "a", size=40)
+    cache.set("big", "big", size=101)
+
+    assert cache.get("big") is None
+    assert cache.get("a") == "a"
+    assert cache.stats()["bytes"] == 40
+
+
+def test_set_replaces_the_size_of_an_existing_key() -> None:
+    """Set replaces the size of an existing key."""
+    cache = LRUCache(max_bytes=100)
+    cache.set("a", "a", size=60)
+    cache.set("a", "a", size=30)
+
+    assert cache.stats()["bytes"] == 30
+    assert cache.stats()["evictions"] == 0
+
+
+def test_delete_and_clear_release_the_bytes() -> None:
+    """Delete and clear release the bytes."""
+    cache = LRUCache()
+    cache.set("a", "a", size=10)
+    cache.set("b", "b", size=20)
+
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.stats()["bytes"] == 20
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+    assert len(cache) == 0
+
+
+def test_expired_entry_releases_its_bytes(clock: list[float]) -> None:
+    """Expired entry releases its bytes."""
+    cache = LRUCache(ttl=1)
+    cache.set("a", "a", size=10)
+
+    clock[0] += 1
+    cache.get("a")
+    assert cache.stats()["bytes"] == 0
+
+
+def test_hit_ratio() -> None:
+    """The hit ratio is the share of the lookups that hit."""
+    cache = LRUCache()
+    assert cache.stats()["hit_ratio"] == 0
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    assert cache.stats()["hit_ratio"] == 0.75
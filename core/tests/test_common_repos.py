@@ -0,0 +1,52 @@
+"""Tests of the routing and the time limits of the repo reads."""
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, Secondary, SecondaryPreferred
+
+from candidates.models import Candidate
+from core.common_repos import (
+    AGGREGATION_READ,
+    LISTING_READ,
+    LOOKUP_READ,
+    REPORT_READ,
+    AbstractRepo,
+    read_preferences_from_settings,
+)
+from core.settings import Settings
+
+
+def test_read_preferences_come_from_the_settings() -> None:
+    """Each kind of heavy read gets its own mode with the configured max staleness."""
+    settings = Settings(
+        LISTING_READ_PREFERENCE="secondary",
+        REPORT_READ_PREFERENCE="primary",
+        AGGREGATION_READ_PREFERENCE="secondaryPreferred",
+        READ_MAX_STALENESS_SECONDS=120,
+    )
+
+    read_preferences = read_preferences_from_settings(settings)
+    assert read_preferences == {
+        LISTING_READ: Secondary(max_staleness=120),
+        REPORT_READ: Primary(),
+        AGGREGATION_READ: SecondaryPreferred(max_staleness=120),
+    }
+    assert LOOKUP_READ not in read_preferences
+
+
+def test_unknown_read_preference_is_rejected() -> None:
+    """A read preference mode that pymongo does not have is refused when the settings are read."""
+    with pytest.raises(ValueError, match="LISTING_READ_PREFERENCE"):
+        Settings(LISTING_READ_PREFERENCE="secondaryOnly")
+
+
+def test_collection_is_routed_per_kind_of_read(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Heavy reads use their read preference, the other reads and the writes use the primary."""
+    client = AsyncIOMotorClient("mongodb://localhost:27017", connect=False)
+    monkeypatch.setattr(Candidate, "get_motor_collection", lambda: client["tests"]["candidates"])
+    repo = AbstractRepo(Candidate, read_preferences={LISTING_READ: Secondary(max_staleness=90)})
+    try:
+        assert repo.collection(LISTING_READ).read_preference == Secondary(max_staleness=90)
+        assert repo.collection(REPORT_READ).read_preference == Primary()
+        assert repo.collection().read_preference == Primary()
+    finally:
+        client.close()
@@ -0,0 +1,182 @@
+"""Tests of the Prometheus exposition and of the merge of the metrics of the workers."""
+import json
+import multiprocessing
+import os
+from pathlib import Path
+
+import pytest
+
+from core import metrics
+from core.metrics import Exposition, merge_worker_metrics, write_worker_metrics
+
+HISTOGRAM_STATS = {"buckets": {"0.1": 1, "+Inf": 2}, "sum": 0.35, "count": 2}
+
+
+def worker_exposition(requests: int, in_flight: int) -> Exposition:
+    """Build the samples of a worker.
+
+    Args:
+        requests (int): value of the counter.
+        in_flight (int): value of the gauge.
+
+    Returns:
+        Exposition: a counter, a gauge and a histogram.
+    """
+    exposition = Exposition()
+    exposition.counter("requests_total", "Requests.", requests, route="/")
+    exposition.gauge("in_flight", "Requests being handled.", in_flight)
+    exposition.histogram("duration_seconds", "Duration.", HISTOGRAM_STATS, route="/")
+    return exposition
+
+
+def write_worker_file(directory: Path, pid: int, exposition: Exposition) -> None:
+    """Write the metrics file of another worker.
+
+    Args:
+        directory (Path): the metrics directory.
+        pid (int): process id of the worker.
+        exposition (Exposition): samples of the worker.
+    """
+    (directory / f"{pid}.json").write_text(json.dumps(exposition.to_dict()))
+
+
+def test_samples_with_the_same_labels_are_summed() -> None:
+    """Samples with the same labels are summed."""
+    exposition = Exposition()
+    exposition.counter("requests_total", "Requests.", 1, route="/", method="GET")
+    exposition.counter("requests_total", "Requests.", 2, method="GET", route="/")
+    exposition.counter("requests_total", "Requests.", 4, method="POST", route="/")
+
+    assert exposition.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{method="GET",route="/"} 3',
+        'requests_total{method="POST",route="/"} 4',
+    ]
+
+
+def test_render_histogram_and_escaped_labels() -> None:
+    """Histograms are rendered with their samples and escaped labels."""
+    exposition = Exposition()
+    exposition.histogram("duration_seconds", "Duration.", HISTOGRAM_STATS, route='/a"b\\')
+
+    assert exposition.render().splitlines()[2:] == [
+        'duration_seconds_bucket{le="0.1",route="/a\\"b\\\\"} 1',
+        'duration_seconds_bucket{le="+Inf",route="/a\\"b\\\\"} 2',
+        'duration_seconds_sum{route="/a\\"b\\\\"} 0.35',
+        'duration_seconds_count{route="/a\\"b\\\\"} 2',
+    ]
+
+
+def test_help_text_is_escaped() -> None:
+    """Backslashes and line feeds of a help text are escaped, its quotes are kept."""
+    exposition = Exposition()
+    exposition.gauge("paths", 'Paths like "C:\\data"\nper worker.', 1)
+
+    assert exposition.render().splitlines()[0] == '# HELP paths Paths like "C:\\\\data"\\nper worker.'
+
+
+def test_to_dict_round_trips_through_json() -> None:
+    """The samples written by a worker are read back unchanged."""
+    exposition = worker_exposition(3, 1)
+
+    restored = Exposition.from_dict(json.loads(json.dumps(exposition.to_dict())))
+    assert restored.samples == exposition.samples
+    assert restored.render() == exposition.render()
+
+
+def test_merge_adds_up_counters_gauges_and_histograms() -> None:
+    """Merging adds up the counters, gauges and histograms."""
+    merged = worker_exposition(3, 1)
+    merged.merge(worker_exposition(4, 2))
+
+    lines = merged.render().splitlines()
+    assert 'requests_total{route="/"} 7' in lines
+    assert "in_flight 3" in lines
+    assert 'duration_seconds_bucket{le="+Inf",route="/"} 4' in lines
+    assert 'duration_seconds_sum{route="/"} 0.7' in lines
+    assert 'duration_seconds_count{route="/"} 4' in lines
+
+
+def test_merge_without_gauges_keeps_the_counters() -> None:
+    """Merging without the gauges keeps the counters."""
+    merged = worker_exposition(3, 1)
+    merged.merge(worker_exposition(4, 2), gauges=False)
+
+    lines = merged.render().splitlines()
+    assert 'requests_total{route="/"} 7' in lines
+    assert "in_flight 1" in lines
+
+
+def test_merge_worker_metrics_adds_up_the_files_of_the_other_workers(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """merge_worker_metrics adds up the files of the other workers."""
+    monkeypatch.setattr(metrics, "pid_alive", lambda pid: pid == 101)
+    write_worker_file(tmp_path, 101, worker_exposition(10, 2))
+    # A worker that exited, its counters are kept and its gauges dropped.
+    write_worker_file(tmp_path, 102, worker_exposition(20, 5))
+    # The file of this worker is older than its current samples, it is ignored.
+    write_worker_file(tmp_path, os.getpid(), worker_exposition(1000, 1000))
+    (tmp_path / "103.json").write_text("{")
+    (tmp_path / "103.json.tmp").write_text("{}")
+    (tmp_path / "other.json").write_text("{}")
+
+    lines = merge_worker_metrics(str(tmp_path), worker_exposition(1, 1)).render().splitlines()
+    assert 'requests_total{route="/"} 31' in lines
+    assert "in_flight 3" in lines
+
+
+def test_write_worker_metrics_replaces_the_file_of_the_worker(tmp_path: Path) -> None:
+    """write_worker_metrics replaces the file of the worker."""
+    write_worker_metrics(str(tmp_path), worker_exposition(1, 1))
+    write_worker_metrics(str(tmp_path), worker_exposition(2, 1))
+
+    assert os.listdir(tmp_path) == [f"{os.getpid()}.json"]
+    written = Exposition.from_dict(json.loads((tmp_path / f"{os.getpid()}.json").read_text()))
+    assert written.samples == worker_exposition(2, 1).samples
+
+
+def write_rounds(directory: str, rounds: int, start: multiprocessing.Event) -> None:
+    """Write the metrics of a worker process, with a counter that grows every round.
+
+    Args:
+        directory (str): the metrics directory.
+        rounds (int): number of writes.
+        start (multiprocessing.Event): set once the reader is ready.
+    """
+    start.wait()
+    for count in range(1, rounds + 1):
+        exposition = Exposition()
+        exposition.counter("writes_total", "Writes.", count, worker=os.getpid())
+        exposition.counter("all_writes_total", "Writes of all the workers.", count)
+        write_worker_metrics(directory, exposition)
+
+
+def test_merge_reads_complete_files_while_workers_write(tmp_path: Path) -> None:
+    """A merge running while the workers replace their files never misses a worker nor sees a value go down."""
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    workers = [context.Process(target=write_rounds, args=(str(tmp_path), 300, start)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        write_worker_file(tmp_path, worker.pid, Exposition())
+    start.set()
+
+    last: dict[str, float] = {}
+    while any(worker.is_alive() for worker in workers) or not last:
+        samples = merge_worker_metrics(str(tmp_path), Exposition()).samples
+        values = {dict(labels)["worker"]: value for (family, _, labels), value in samples.items() if labels}
+        assert set(last) <= set(values)
+        for worker, value in values.items():
+            assert value >= last.get(worker, 0)
+        last.update(values)
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    merged = merge_worker_metrics(str(tmp_path), Exposition()).render().splitlines()
+    assert "all_writes_total 1200" in merged
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{worker.pid}.json" for worker in workers)
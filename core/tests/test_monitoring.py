@@ -0,0 +1,112 @@
+"""Tests of the MongoDB connection pool and command listeners."""
+from types import SimpleNamespace
+
+import pytest
+
+from core.db import get_mongodb_client
+from core.monitoring import (
+    MONGO,
+    CommandMonitor,
+    PoolMonitor,
+    RequestTimings,
+    command_monitor,
+    pool_monitor,
+    request_timings,
+)
+
+SERVER = ("db", 27017)
+
+
+def pool_event(**fields: object) -> SimpleNamespace:
+    """Build a pool event of SERVER.
+
+    Args:
+        fields (object): other attributes of the event.
+
+    Returns:
+        SimpleNamespace: the event, with the attributes the listener reads.
+    """
+    return SimpleNamespace(address=SERVER, **fields)
+
+
+def command_event(name: str, micros: int) -> SimpleNamespace:
+    """Build the end event of a command.
+
+    Args:
+        name (str): name of the command.
+        micros (int): duration of the command in microseconds.
+
+    Returns:
+        SimpleNamespace: the event, with the attributes the listener reads.
+    """
+    return SimpleNamespace(command_name=name, duration_micros=micros)
+
+
+def test_pool_monitor_counts_connections_and_checkouts() -> None:
+    """Open and checked out connections follow the events, and the utilization uses the pool size."""
+    monitor = PoolMonitor()
+    monitor.pool_created(pool_event(options={"maxPoolSize": 4}))
+    for _ in range(3):
+        monitor.connection_created(pool_event())
+    monitor.connection_closed(pool_event())
+    monitor.connection_checked_out(pool_event(duration=0.002))
+    monitor.connection_checked_out(pool_event(duration=0.02))
+    monitor.connection_checked_in(pool_event())
+    monitor.connection_check_out_failed(pool_event(reason="timeout", duration=5))
+
+    stats = monitor.stats()
+    assert stats["servers"] == {"db:27017": {"open": 2, "checked_out": 1, "max_pool_size": 4, "utilization": 0.25}}
+    assert stats["checkout_failures"] == {"timeout": 1}
+    assert stats["checkout_wait"]["count"] == 3
+    assert stats["checkout_wait"]["max"] == 5
+
+
+def test_pool_monitor_forgets_closed_pools() -> None:
+    """A closed pool is not reported anymore."""
+    monitor = PoolMonitor()
+    monitor.pool_created(pool_event(options={}))
+    assert monitor.stats()["servers"]["db:27017"]["max_pool_size"] == 100
+
+    monitor.pool_closed(pool_event())
+    assert monitor.stats()["servers"] == {}
+
+
+def test_command_monitor_records_latency_and_failures() -> None:
+    """Commands are timed per name, and the failed ones are counted."""
+    monitor = CommandMonitor()
+    monitor.succeeded(command_event("find", 2_000))
+    monitor.succeeded(command_event("find", 4_000))
+    monitor.failed(command_event("insert", 1_000))
+
+    stats = monitor.stats()
+    assert list(stats) == ["find", "insert"]
+    assert stats["find"]["count"] == 2
+    assert stats["find"]["mean"] == pytest.approx(0.003)
+    assert stats["find"]["failures"] == 0
+    assert stats["insert"]["failures"] == 1
+
+
+def test_command_time_is_added_to_the_current_request() -> None:
+    """The duration of a command is part of the mongo time of the request that ran it."""
+    timings = RequestTimings()
+    token = request_timings.set(timings)
+    try:
+        CommandMonitor().succeeded(command_event("find", 1_500))
+    finally:
+        request_timings.reset(token)
+    assert timings.seconds == {MONGO: pytest.approx(0.0015)}
+
+
+def test_client_has_the_pool_settings_and_the_listeners(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The client is built with the pool settings and reports to the monitors."""
+    monkeypatch.setenv("MONGODB_MAX_POOL_SIZE", "7")
+    monkeypatch.setenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "250")
+    client = get_mongodb_client()
+    try:
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.options.pool_options.wait_queue_timeout == 0.25
+        listeners = client.options.event_listeners
+        assert pool_monitor in listeners
+        assert command_monitor in listeners
+    finally:
+        client.close()
@@ -0,0 +1,121 @@
+"""Tests of the coalescing of identical concurrent reads."""
+import asyncio
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+class Call:
+    """A call that blocks until it is released, counting how many times it ran."""
+
+    def __init__(self, result: object = "result") -> None:
+        """Class constructor.
+
+        Args:
+            result (object): value returned by the call, raised if it is an exception.
+        """
+        self.result = result
+        self.runs = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> object:
+        """Run the call."""
+        self.runs += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_calls_of_a_key_share_one_execution() -> None:
+    """Concurrent calls of a key share one execution."""
+    single_flight = SingleFlight()
+    call = Call()
+    callers = [asyncio.ensure_future(single_flight.do("key", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    call.release.set()
+    assert await asyncio.gather(*callers) == ["result"] * 3
+    assert call.runs == 1
+    assert single_flight.stats() == {"in_flight": 0, "executed": 1, "deduplicated": 2, "abandoned": 0}
+
+
+async def test_different_keys_are_not_coalesced() -> None:
+    """Different keys are not coalesced."""
+    single_flight = SingleFlight()
+    first, second = Call("first"), Call("second")
+    callers = [
+        asyncio.ensure_future(single_flight.do("first", first)),
+        asyncio.ensure_future(single_flight.do("second", second)),
+    ]
+    await asyncio.sleep(0)
+
+    first.release.set()
+    second.release.set()
+    assert await asyncio.gather(*callers) == ["first", "second"]
+    assert single_flight.stats()["executed"] == 2
+
+
+async def test_finished_call_runs_again() -> None:
+    """A finished call runs again for the next caller."""
+    single_flight = SingleFlight()
+    call = Call()
+    call.release.set()
+
+    await single_flight.do("key", call)
+    await single_flight.do("key", call)
+    assert call.runs == 2
+
+
+async def test_exception_is_raised_to_every_caller() -> None:
+    """The exception of a call is raised to every caller."""
+    single_flight = SingleFlight()
+    call = Call(ValueError("failed"))
+    callers = [asyncio.ensure_future(single_flight.do("key", call)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    call.release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert [str(result) for result in results] == ["failed", "failed"]
+    assert single_flight.stats()["in_flight"] == 0
+
+
+async def test_cancelled_caller_does_not_cancel_the_call_of_the_others() -> None:
+    """A cancelled caller does not cancel the call of the others."""
+    single_flight = SingleFlight()
+    call = Call()
+    cancelled = asyncio.ensure_future(single_flight.do("key", call))
+    waiting = asyncio.ensure_future(single_flight.do("key", call))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+    assert await waiting == "result"
+    assert cancelled.cancelled()
+    assert not call.cancelled
+    assert single_flight.stats()["abandoned"] == 0
+
+
+async def test_call_is_cancelled_when_every_caller_is() -> None:
+    """The call is cancelled when every caller is."""
+    single_flight = SingleFlight()
+    call = Call()
+    callers = [asyncio.ensure_future(single_flight.do("key", call)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert call.cancelled
+    assert single_flight.stats() == {"in_flight": 0, "executed": 1, "deduplicated": 1, "abandoned": 1}
+    assert not single_flight.waiters
@@ -0,0 +1,147 @@
+"""Tests of the slow query log."""
+import json
+from typing import Any
+
+import pytest
+from pymongo.errors import ExecutionTimeout
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from core import slow_queries
+from core.explain import ExplainSummary
+from core.slow_queries import SlowQueryMonitor, command_shape, query_shape, read_preference_from_command
+
+
+class Clock:
+    """Monotonic clock moved by the tests."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Current time."""
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """Replace the monotonic clock of the slow query monitor."""
+    clock = Clock()
+    monkeypatch.setattr(slow_queries.time, "monotonic", clock)
+    return clock
+
+
+def test_query_shape_replaces_the_values() -> None:
+    """Values become "?" while fields, operators, field paths and sorts are kept."""
+    shape = query_shape(
+        {
+            "city": "Amman",
+            "salary": {"$gte": 1000, "$lte": 2000},
+            "$or": [{"skills": {"$in": ["python", "go"]}}, {"years_of_experience": 3}],
+            "sort": {"salary": -1, "_id": -1},
+        },
+    )
+    assert shape == {
+        "city": "?",
+        "salary": {"$gte": "?", "$lte": "?"},
+        "$or": [{"skills": {"$in": "?"}}, {"years_of_experience": "?"}],
+        "sort": {"salary": -1, "_id": -1},
+    }
+
+
+def test_query_shape_keeps_the_field_paths_of_a_pipeline() -> None:
+    """Field paths of the stages are kept, the values of the match are not."""
+    pipeline = [{"$match": {"city": "Irbid"}}, {"$group": {"_id": "$city", "count": {"$sum": 1}}}]
+    assert query_shape(pipeline) == [{"$match": {"city": "?"}}, {"$group": {"_id": "$city", "count": {"$sum": "?"}}}]
+
+
+def test_command_shape_ignores_the_values_and_the_other_fields() -> None:
+    """Commands that differ by their values, limit or time limit have the same shape."""
+    first = {"find": "candidates", "filter": {"city": "Amman"}, "sort": {"_id": 1}, "limit": 10, "maxTimeMS": 5}
+    second = {"find": "candidates", "filter": {"city": "Irbid"}, "sort": {"_id": 1}, "limit": 50}
+    other = {"find": "candidates", "filter": {"gender": "Male"}, "sort": {"_id": 1}}
+
+    assert command_shape("find", first) == command_shape("find", second)
+    assert command_shape("find", first) != command_shape("find", other)
+    assert json.loads(command_shape("find", first)) == {"filter": {"city": "?"}, "sort": {"_id": 1}}
+
+
+def test_read_preference_is_rebuilt_from_the_command() -> None:
+    """The explain goes to the kind of server the command was sent to."""
+    assert read_preference_from_command(None) == Primary()
+    document = {"mode": "secondaryPreferred", "maxStalenessSeconds": 90}
+    assert read_preference_from_command(document) == SecondaryPreferred(max_staleness=90)
+
+
+def test_a_shape_is_explained_once_per_interval(clock: Clock) -> None:
+    """A shape is explained the first time it is slow, then once the interval is over."""
+    monitor = SlowQueryMonitor(threshold_ms=100, explain_interval=300)
+
+    assert monitor.should_explain("a")
+    assert not monitor.should_explain("a")
+    assert monitor.should_explain("b")
+    clock.now += 299
+    assert not monitor.should_explain("a")
+    clock.now += 1
+    assert monitor.should_explain("a")
+
+
+class FakeCollection:
+    """Collection that keeps the inserted documents."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.documents: list[dict[str, Any]] = []
+
+    async def insert_one(self, document: dict[str, Any]) -> None:
+        """Keep the document."""
+        self.documents.append(document)
+
+
+@pytest.fixture()
+def explains(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, int]]:
+    """Record the explains, the ones run under a time limit over 500 ms time out."""
+    calls = []
+
+    async def explain_command(database: Any, command: dict[str, Any], **options: Any) -> ExplainSummary:
+        verbosity = options.get("verbosity", "executionStats")
+        calls.append((verbosity, options.get("max_time_ms", 0)))
+        if verbosity == "executionStats" and options["max_time_ms"] > 500:
+            raise ExecutionTimeout("operation exceeded time limit", 50)
+        return ExplainSummary(stages=["FETCH", "IXSCAN"], indexes=["city_1"], keys_examined=7, docs_examined=5)
+
+    monkeypatch.setattr(slow_queries, "explain_command", explain_command)
+    return calls
+
+
+@pytest.mark.parametrize(
+    ("max_time_ms", "calls", "counters"),
+    [
+        (100, [("executionStats", 100)], {"keys_examined": 7, "docs_examined": 5, "returned": 0, "millis": 0}),
+        (1000, [("executionStats", 1000), ("queryPlanner", 0)], {}),
+        (0, [("queryPlanner", 0)], {}),
+    ],
+)
+@pytest.mark.anyio()
+async def test_plan_has_the_execution_counters_when_the_explain_runs_in_time(
+    explains: list[tuple[str, int]],
+    max_time_ms: int,
+    calls: list[tuple[str, int]],
+    counters: dict[str, int],
+) -> None:
+    """The explain runs the command under the time limit, or only plans it when the limit is hit or 0."""
+    monitor = SlowQueryMonitor(threshold_ms=100, explain_max_time_ms=max_time_ms)
+    collection = FakeCollection()
+    command = {"find": "candidates", "filter": {"city": "Amman"}}
+
+    await monitor.record({"tests": None}, {"slow_queries": collection}, {"database": "tests"}, command)
+    (entry,) = collection.documents
+    assert entry["plan"] == {
+        "verbosity": calls[-1][0],
+        "stages": ["FETCH", "IXSCAN"],
+        "indexes": ["city_1"],
+        "collection_scan": False,
+        **counters,
+    }
+    assert explains == calls
+    assert monitor.stats()["explained"] == 1
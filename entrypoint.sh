@@ -1,3 +1,7 @@
 #!/bin/bash
 
+# The workers add up their metrics in this directory, it is emptied so the counters start from 0.
+export METRICS_DIR="${METRICS_DIR:-/tmp/elevatus-metrics}"
+rm -rf "$METRICS_DIR" && mkdir -p "$METRICS_DIR"
+
 gunicorn main:create_app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
\ No newline at end of file
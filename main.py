@@ -1,12 +1,34 @@
 """This module is the start module to generate FastApi app."""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from fastapi import FastAPI, status
+from fastapi import Depends, FastAPI, Response, status
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
 
 from auth.routers import router as auth_router
 from candidates import routers as candidate_router
-from core.db import db_lifespan
+from core.db import database_unavailable_handler, db_lifespan, query_timeout_handler
+from core.metrics import (
+    CONTENT_TYPE,
+    Exposition,
+    add_cache_metrics,
+    add_executor_metrics,
+    add_mongodb_metrics,
+    add_read_coalescing_metrics,
+    add_request_metrics,
+    add_slow_query_metrics,
+    export_worker_metrics,
+    merge_worker_metrics,
+)
+from core.monitoring import command_monitor, pool_monitor, request_monitor
+from core.slow_queries import slow_query_monitor
 from DIContainer import DIContainer
 from users import routers as user_routers
+from utils.compression import GZipMiddleware
+from utils.metrics import MetricsMiddleware
+from utils.responses import TimedJSONResponse
+from utils.security import check_monitoring_access, password_executor, principal_cache
 
 
 def config_dependencies_wiring(container: DIContainer) -> None:
@@ -21,17 +43,72 @@ def config_dependencies_wiring(container: DIContainer) -> None:
     container.wire(packages=["candidates", "users"])
 
 
+def collect_metrics(container: DIContainer) -> Exposition:
+    """Collect the metrics of this worker.
+
+    Args:
+        container (DIContainer): the container of the app, with its caches.
+
+    Returns:
+        Exposition: the samples of the requests, database, caches and executors of this worker.
+    """
+    exposition = Exposition()
+    add_request_metrics(exposition, request_monitor.stats())
+    add_mongodb_metrics(exposition, pool_monitor.stats(), command_monitor.stats())
+    add_cache_metrics(exposition, "principal", principal_cache.stats())
+    add_cache_metrics(exposition, "facets", container.facets_cache().stats())
+    add_cache_metrics(exposition, "candidate", container.candidate_cache().stats())
+    add_cache_metrics(exposition, "listing", container.listing_cache().stats())
+    add_executor_metrics(exposition, "password_hashing", password_executor.stats())
+    add_read_coalescing_metrics(exposition, container.single_flight().stats())
+    add_slow_query_metrics(exposition, slow_query_monitor.stats())
+    return exposition
+
+
 def create_app() -> None:
     """This function is the starter function for our server."""
-    app = FastAPI(lifespan=db_lifespan)
+    container = DIContainer()
+    config_dependencies_wiring(container)
+    settings = container.settings()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        """Connect to the database and run the background tasks of the worker.
+
+        The metrics are shared if METRICS_DIR is set and the slow queries are recorded if the log is enabled.
+        """
+        async with asynccontextmanager(db_lifespan)(app):
+            background = []
+            if settings.METRICS_DIR:
+                background.append(
+                    export_worker_metrics(
+                        settings.METRICS_DIR,
+                        lambda: collect_metrics(container),
+                        settings.METRICS_EXPORT_INTERVAL_SECONDS,
+                    ),
+                )
+            if slow_query_monitor.enabled:
+                background.append(slow_query_monitor.run(app.mongodb_client))
+            tasks = [asyncio.create_task(coroutine) for coroutine in background]
+            yield
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    app = FastAPI(lifespan=lifespan, default_response_class=TimedJSONResponse)
     app.include_router(user_routers.router)
     app.include_router(candidate_router.candidate_router)
     app.include_router(candidate_router.all_candidate_router)
     app.include_router(candidate_router.generate_report_router)
     app.include_router(auth_router)
-
-    container = DIContainer()
-    config_dependencies_wiring(container)
+    app.add_exception_handler(ExecutionTimeout, query_timeout_handler)
+    app.add_exception_handler(ConnectionFailure, database_unavailable_handler)
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.GZIP_MINIMUM_SIZE,
+        compress_level=settings.GZIP_COMPRESS_LEVEL,
+    )
+    app.add_middleware(MetricsMiddleware)
 
     @app.get("/health", status_code=status.HTTP_200_OK, tags=["health-check"])
     async def health() -> dict:
@@ -43,4 +120,49 @@ def create_app() -> None:
         """
         return {"message": "App is running!"}
 
+    @app.get(
+        "/stats",
+        status_code=status.HTTP_200_OK,
+        tags=["health-check"],
+        dependencies=[Depends(check_monitoring_access)],
+    )
+    async def stats() -> dict:
+        """
+        Counters of the in-process caches and executors of this worker.
+
+        Returns:
+            dict: stats of each cache and executor by name
+        """
+        return {
+            "requests": request_monitor.stats(),
+            "principal_cache": principal_cache.stats(),
+            "facets_cache": container.facets_cache().stats(),
+            "candidate_cache": container.candidate_cache().stats(),
+            "listing_cache": container.listing_cache().stats(),
+            "read_coalescing": container.single_flight().stats(),
+            "password_hashing": password_executor.stats(),
+            "mongodb_pool": pool_monitor.stats(),
+            "mongodb_commands": command_monitor.stats(),
+            "slow_queries": slow_query_monitor.stats(),
+        }
+
+    @app.get(
+        "/metrics",
+        status_code=status.HTTP_200_OK,
+        tags=["health-check"],
+        response_class=Response,
+        dependencies=[Depends(check_monitoring_access)],
+    )
+    async def metrics() -> Response:
+        """
+        Metrics of the server in the Prometheus text format.
+
+        Returns:
+            Response: the metrics of all the workers if METRICS_DIR is set, else of this worker
+        """
+        exposition = collect_metrics(container)
+        if settings.METRICS_DIR:
+            exposition = merge_worker_metrics(settings.METRICS_DIR, exposition)
+        return Response(exposition.render(), media_type=CONTENT_TYPE)
+
     return app
@@ -0,0 +1,214 @@
+"""This module has the management commands to run against the database.
+
+Usage:
+    python manage.py --help
+"""
+import asyncio
+
+import typer
+
+from candidates.benchmarks import BENCHMARK_COLLECTION, QueryBenchmark, benchmark_keyword_search, benchmark_listing
+from candidates.index_report import index_usage_report
+from candidates.models import Candidate
+from core.common_repos import read_preferences_from_settings
+from core.db import DOCUMENT_MODELS, get_mongodb_client
+from core.migrations import migrate_uuid_index
+from core.settings import Settings
+from core.slow_queries import SLOW_QUERIES_COLLECTION
+
+cli = typer.Typer()
+
+
+@cli.callback()
+def main() -> None:
+    """Elevatus management commands."""
+
+
+@cli.command()
+def migrate_uuid(batch_size: int = 1000) -> None:
+    """Backfill missing uuids and create the unique uuid index on every collection."""
+
+    async def run() -> bool:
+        client = get_mongodb_client()
+        database = client.get_default_database()
+        ok = True
+        for model in DOCUMENT_MODELS:
+            report = await migrate_uuid_index(database[model.Settings.collection], batch_size)
+            typer.echo(
+                f"{report.collection}: backfilled={report.backfilled} "
+                f"duplicates={len(report.duplicates)} duplicate_emails={len(report.duplicate_emails)} "
+                f"index={report.index_created} ixscan={report.uses_index}",
+            )
+            for duplicate in report.duplicates:
+                typer.echo(f"  duplicated uuid: {duplicate}")
+            for duplicate in report.duplicate_emails:
+                typer.echo(f"  duplicated email: {duplicate}")
+            ok = ok and report.ok
+        client.close()
+        return ok
+
+    if not asyncio.run(run()):
+        raise typer.Exit(code=1)
+
+
+def echo_benchmark(result: QueryBenchmark) -> None:
+    """Print one benchmark result."""
+    typer.echo(
+        f"{result.name:>8}: median={result.median_ms:.1f}ms matched={result.matched} "
+        f"plan={'>'.join(result.plan.stages)} keys_examined={result.plan.keys_examined} "
+        f"docs_examined={result.plan.docs_examined}",
+    )
+
+
+@cli.command()
+def benchmark_keyword(
+    keyword: str = "rust",
+    documents: int = 1_000_000,
+    runs: int = 5,
+    keep: bool = typer.Option(False, help="Keep the benchmark collection for the next run."),
+) -> None:
+    """Compare the regex keyword search with the text index search on a synthetic dataset."""
+
+    async def run() -> None:
+        client = get_mongodb_client()
+        database = client.get_default_database()
+        for result in await benchmark_keyword_search(database, keyword, documents, runs):
+            echo_benchmark(result)
+        if not keep:
+            await database.drop_collection(BENCHMARK_COLLECTION)
+        client.close()
+
+    asyncio.run(run())
+
+
+@cli.command()
+def benchmark_read_mode(
+    documents: int = 100_000,
+    page_size: int = 500,
+    runs: int = 20,
+    keep: bool = typer.Option(False, help="Keep the benchmark collection for the next run."),
+) -> None:
+    """Compare listing throughput of beanie hydration with the raw read mode on a synthetic dataset."""
+
+    async def run() -> None:
+        client = get_mongodb_client()
+        database = client.get_default_database()
+        for result in await benchmark_listing(database, documents, page_size, runs):
+            typer.echo(
+                f"{result.name:>8}: median={result.median_ms:.1f}ms/page "
+                f"throughput={result.docs_per_second:.0f} docs/s",
+            )
+        if not keep:
+            await database.drop_collection(BENCHMARK_COLLECTION)
+        client.close()
+
+    asyncio.run(run())
+
+
+@cli.command()
+def index_report(
+    max_ratio: float = typer.Option(10.0, help="Maximum documents examined per document returned."),
+) -> None:
+    """Explain every /all-candidates filter shape and report how it uses the indexes.
+
+    Exits with a non-zero code if a shape scans the collection, scans the _id index only
+    or examines more than max_ratio documents per returned document.
+    """
+
+    async def run() -> bool:
+        client = get_mongodb_client()
+        reports = await index_usage_report(client.get_default_database()[Candidate.Settings.collection])
+        client.close()
+        if not reports:
+            typer.echo("The candidates collection is empty, nothing to explain.")
+        ok = True
+        for report in reports:
+            plan = report.plan
+            regression = plan.collection_scan or report.unindexed_filters or plan.docs_examined_per_returned > max_ratio
+            ok = ok and not regression
+            shape = "+".join(report.shape) + (f" sort={report.sort.value}" if report.sort else "")
+            typer.echo(
+                f"{'FAIL' if regression else 'ok':>4} {shape:<48} "
+                f"{'COLLSCAN' if plan.collection_scan else 'IXSCAN':<8} plan={'>'.join(plan.stages)} "
+                f"indexes={','.join(plan.indexes) or '-'} "
+                f"keys_examined={plan.keys_examined} docs_examined={plan.docs_examined} "
+                f"returned={plan.returned} ratio={plan.docs_examined_per_returned:.1f}",
+            )
+        return ok
+
+    if not asyncio.run(run()):
+        raise typer.Exit(code=1)
+
+
+@cli.command()
+def read_routing() -> None:
+    """Show the server that serves each kind of heavy read with the configured read preferences."""
+
+    async def run() -> None:
+        client = get_mongodb_client()
+        await client.admin.command("ping")
+        typer.echo(f"primary: {client.primary} secondaries: {sorted(client.secondaries)}")
+        collection = client.get_default_database()[Candidate.Settings.collection]
+        for read, read_preference in read_preferences_from_settings(Settings()).items():
+            cursor = collection.with_options(read_preference=read_preference).find({}, {"_id": 1}).limit(1)
+            await cursor.to_list(None)
+            typer.echo(f"{read:>12}: {read_preference.mongos_mode:<18} served by {cursor.address}")
+        client.close()
+
+    asyncio.run(run())
+
+
+@cli.command()
+def slow_query_report(limit: int = typer.Option(20, help="Number of query shapes to show.")) -> None:
+    """Show the query shapes of the slow query log that took the most time, with their last plan."""
+
+    async def run() -> None:
+        client = get_mongodb_client()
+        slow_queries = client.get_default_database()[SLOW_QUERIES_COLLECTION]
+        pipeline = [
+            {"$match": {"shape_id": {"$exists": True}}},
+            {
+                "$group": {
+                    "_id": "$shape_id",
+                    "command": {"$first": "$command"},
+                    "collection": {"$first": "$collection"},
+                    "shape": {"$first": "$shape"},
+                    "count": {"$sum": 1},
+                    "total_ms": {"$sum": "$duration_ms"},
+                    "max_ms": {"$max": "$duration_ms"},
+                    "max_docs_returned": {"$max": "$docs_returned"},
+                },
+            },
+            {"$sort": {"total_ms": -1}},
+            {"$limit": limit},
+        ]
+        shapes = await slow_queries.aggregate(pipeline).to_list(None)
+        if not shapes:
+            typer.echo("No slow query recorded.")
+        for shape in shapes:
+            # The capped collection keeps the insertion order, the last explained entry has the latest plan.
+            explained = await slow_queries.find_one(
+                {"shape_id": shape["_id"], "plan": {"$exists": True}},
+                sort=[("$natural", -1)],
+            )
+            plan = explained["plan"] if explained else None
+            plan_text = "plan=?"
+            if plan:
+                plan_text = (
+                    f"{'COLLSCAN' if plan['collection_scan'] else 'IXSCAN'} plan={'>'.join(plan['stages'])} "
+                    f"indexes={','.join(plan.get('indexes', [])) or '-'} "
+                    f"keys_examined={plan.get('keys_examined', '?')} docs_examined={plan.get('docs_examined', '?')}"
+                )
+            typer.echo(
+                f"{shape['_id']} {shape['command']} {shape['collection']} count={shape['count']} "
+                f"total={shape['total_ms']:.0f}ms max={shape['max_ms']:.0f}ms "
+                f"max_returned={shape['max_docs_returned']} {plan_text}",
+            )
+            typer.echo(f"  {shape['shape']}")
+        client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    cli()
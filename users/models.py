@@ -1,5 +1,6 @@
 """A module that has the DB model for User."""
 
+from typing import Annotated
 from uuid import UUID, uuid4
 
 from beanie import Document, Indexed
@@ -9,10 +10,10 @@ from pydantic import EmailStr, Field
 class User(Document):
     """DB model to interact with User collections."""
 
-    uuid: UUID = Field(default_factory=uuid4)
+    uuid: Annotated[UUID, Indexed(unique=True)] = Field(default_factory=uuid4)
     first_name: str
     last_name: str
-    email: EmailStr = Indexed(unique=True)
+    email: Annotated[EmailStr, Indexed(unique=True)]
     hashed_password: str
 
     class Settings:
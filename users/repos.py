@@ -8,4 +8,4 @@ class UserRepo(AbstractRepo):
 
     def __init__(self) -> None:
         """Class constructor."""
-        super().__init__(User)
+        super().__init__(User, duplicate_key_detail="Email already registered.")
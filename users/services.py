@@ -1,8 +1,6 @@
 """This module has the service for interacting with User model."""
 from typing import Any
 
-from fastapi import HTTPException, status
-
 from users.models import User
 from users.repos import UserRepo
 from users.schemas import UserIn
@@ -37,17 +35,18 @@ class UserServices:
         Args:
             user (UserIn): pydantic BaseModel instance that has user's data to create.
 
+        Raises:
+            HTTPException: If the email is already registered.
+
         Returns:
             User: Instance of beanie Document that has the created instance.
         """
-        created_user = await self.repo.get_by_email(user.email)
-        if created_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered.",
-            )
+        # Hashing is expensive and signup is not authenticated, so a registered email is rejected
+        # before hashing. The unique email index still rejects the concurrent creates.
+        if await self.repo.get_by_email(user.email):
+            raise self.repo.duplicate_key_exception()
         user_data: dict[str, Any] = user.model_dump()
-        hashed_password: str = get_password_hash(user_data["password"])
+        hashed_password: str = await get_password_hash(user_data["password"])
         del user_data["password"]
         user_data.update({"hashed_password": hashed_password})
         user = User(**user_data)
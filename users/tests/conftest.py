@@ -0,0 +1,15 @@
+"""Fixtures of the users tests."""
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from core.db import DOCUMENT_MODELS
+from users.repos import UserRepo
+from users.services import UserServices
+
+
+@pytest.fixture()
+async def services() -> UserServices:
+    """User services on a fresh in-memory database."""
+    await init_beanie(database=AsyncMongoMockClient()["tests"], document_models=DOCUMENT_MODELS)
+    return UserServices(UserRepo())
@@ -0,0 +1,74 @@
+"""Tests of the creation of the users."""
+import pytest
+from fastapi import HTTPException
+
+from users.models import User
+from users.schemas import UserIn
+from users.services import UserServices
+
+pytestmark = pytest.mark.anyio
+
+
+def user_in(email: str = "user@example.com") -> UserIn:
+    """Build a valid user.
+
+    Args:
+        email (str): email of the user.
+
+    Returns:
+        UserIn: the user.
+    """
+    return UserIn(first_name="John", last_name="Smith", email=email, password="Secret1!")
+
+
+async def fake_hash(password: str) -> str:
+    """Hash a password without bcrypt.
+
+    Args:
+        password (str): the password to hash.
+
+    Returns:
+        str: the fake hash.
+    """
+    return f"hashed-{password}"
+
+
+@pytest.fixture(autouse=True)
+def _no_bcrypt(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Replace bcrypt by a cheap hash."""
+    monkeypatch.setattr("users.services.get_password_hash", fake_hash)
+
+
+async def test_create_stores_the_hashed_password(services: UserServices) -> None:
+    """A created user has the hash of the password and not the password."""
+    user = await services.create(user_in())
+    assert user.hashed_password == "hashed-Secret1!"
+    assert await services.repo.get_by_email("user@example.com") is not None
+
+
+async def test_registered_email_is_rejected_before_hashing(
+    services: UserServices,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A registered email is answered with a 400 without hashing the password."""
+    await services.create(user_in())
+
+    async def fail_hash(password: str) -> str:
+        raise AssertionError("The password was hashed.")
+
+    monkeypatch.setattr("users.services.get_password_hash", fail_hash)
+    with pytest.raises(HTTPException) as error:
+        await services.create(user_in())
+    assert error.value.status_code == 400
+    assert error.value.detail == "Email already registered."
+
+
+async def test_unique_index_rejects_a_create_that_passed_the_check(services: UserServices) -> None:
+    """A create racing another one with the same email is rejected by the unique index."""
+    await services.create(user_in())
+    duplicate = User(first_name="Jane", last_name="Smith", email="user@example.com", hashed_password="hash")
+
+    with pytest.raises(HTTPException) as error:
+        await services.repo.create(duplicate)
+    assert error.value.status_code == 400
+    assert await User.find(User.email == "user@example.com").count() == 1
@@ -0,0 +1,153 @@
+"""This module provide the gzip compression of the responses."""
+import zlib
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Content types worth compressing, the others are usually compressed already.
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson")
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Check if the client accepts gzip encoded responses.
+
+    Args:
+        accept_encoding (str): value of the Accept-Encoding header.
+
+    Returns:
+        bool: True if gzip or the wildcard is listed without q=0.
+    """
+    for coding in accept_encoding.lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() not in ("gzip", "*"):
+            continue
+        quality = params.strip().removeprefix("q=")
+        try:
+            return not params or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+class GZipMiddleware:
+    """Compress the responses with gzip when the client accepts it.
+
+    A response sent in one piece is compressed if it is at least minimum_size bytes.
+    A streamed response is always compressed, every chunk is flushed
+    as soon as it is compressed so the client receives it right away.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compress_level: int = 5) -> None:
+        """Class constructor.
+
+        Args:
+            app (ASGIApp): the wrapped application.
+            minimum_size (int): minimum size in bytes of the responses sent in one piece to compress.
+            compress_level (int): zlib compression level, 1 is the fastest and 9 the smallest.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compress_level = compress_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI request.
+
+        Args:
+            scope (Scope): connection scope.
+            receive (Receive): receive channel.
+            send (Send): send channel.
+        """
+        if scope["type"] != "http" or not accepts_gzip(Headers(scope=scope).get("accept-encoding", "")):
+            await self.app(scope, receive, send)
+            return
+        await GZipResponder(send, self.minimum_size, self.compress_level).run(self.app, scope, receive)
+
+
+class GZipResponder:
+    """Compress the messages of one response."""
+
+    def __init__(self, send: Send, minimum_size: int, compress_level: int) -> None:
+        """Class constructor.
+
+        Args:
+            send (Send): send channel of the response.
+            minimum_size (int): minimum size in bytes of the responses sent in one piece to compress.
+            compress_level (int): zlib compression level.
+        """
+        self.send = send
+        self.minimum_size = minimum_size
+        self.compress_level = compress_level
+        self.start_message: Message | None = None
+        self.compressor: Any = None
+        self.passthrough = False
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        """Run the application with a send that compresses the response.
+
+        Args:
+            app (ASGIApp): the wrapped application.
+            scope (Scope): connection scope.
+            receive (Receive): receive channel.
+        """
+        await app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        """Send a response message, compressing the body if needed.
+
+        Args:
+            message (Message): ASGI message sent by the application.
+        """
+        if message["type"] == "http.response.start":
+            # Held until the first body message tells whether to compress.
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not self.should_compress(body, more_body):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            await self.send(self.compressed_start_message())
+        data = self.compressor.compress(body)
+        data += self.compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def should_compress(self, body: bytes, more_body: bool) -> bool:
+        """Decide whether to compress the response from its headers and first body message.
+
+        Args:
+            body (bytes): first body chunk.
+            more_body (bool): True if the response is streamed.
+
+        Returns:
+            bool: True to compress the response.
+        """
+        headers = Headers(raw=self.start_message["headers"])
+        if "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    def compressed_start_message(self) -> Message:
+        """Build the start message of the compressed response.
+
+        Returns:
+            Message: the start message with the content headers of the gzip encoding.
+        """
+        headers = MutableHeaders(raw=list(self.start_message["headers"]))
+        headers["Content-Encoding"] = "gzip"
+        headers.add_vary_header("Accept-Encoding")
+        del headers["Content-Length"]
+        # The compressed bytes differ from the identity ones, so the ETag can only be weak.
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return {**self.start_message, "headers": headers.raw}
@@ -0,0 +1,50 @@
+"""This module provide the cancellation of the requests whose client disconnected."""
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+from starlette.types import Receive
+
+# Non standard status of the requests closed by the client, the client never receives it.
+CLIENT_CLOSED_REQUEST = 499
+
+T = TypeVar("T")
+
+
+async def wait_for_disconnect(receive: Receive) -> None:
+    """Wait until the client closes the connection.
+
+    Args:
+        receive (Receive): receive channel of the request, its body must not be needed anymore.
+    """
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Run the work of a request and cancel it if the client disconnects first.
+
+    The database reads of the work are cancelled with it and their cursors are killed,
+    so an abandoned request stops using the database and the connection pool.
+
+    Args:
+        request (Request): the request, it must not have a body left to read.
+        awaitable (Awaitable[T]): the work of the request.
+
+    Raises:
+        HTTPException: if the client disconnected before the work was done.
+
+    Returns:
+        T: the result of the work.
+    """
+    work = asyncio.ensure_future(awaitable)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(request.receive))
+    try:
+        done, _ = await asyncio.wait({work, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect.cancel()
+        if not work.done():
+            work.cancel()
+    if work not in done:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed the request.")
+    return work.result()
@@ -0,0 +1,65 @@
+"""This module provide helpers for conditional requests with ETags."""
+import hashlib
+from typing import Any
+
+from fastapi import Response, status
+
+from core.cache import canonical_key
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the values that identify a representation.
+
+    Args:
+        parts (Any): JSON like values, the same values always give the same ETag.
+
+    Returns:
+        str: quoted ETag.
+    """
+    digest = hashlib.blake2b(canonical_key(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def content_etag(body: bytes) -> str:
+    """Build a strong ETag from the bytes of a representation.
+
+    Args:
+        body (bytes): the encoded representation.
+
+    Returns:
+        str: quoted ETag, it changes whenever the representation does.
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against the ETag of the current representation.
+
+    If-None-Match uses the weak comparison, a W/ prefix is ignored.
+
+    Args:
+        if_none_match (str | None): value of the If-None-Match header.
+        etag (str): current ETag.
+
+    Returns:
+        bool: True if the client already has the current representation.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Build the 304 response of a representation the client already has.
+
+    Args:
+        etag (str): current ETag.
+
+    Returns:
+        Response: empty 304 response with the ETag header.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,91 @@
+"""This module provide executors to run blocking work outside of the event loop."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+
+
+class BoundedExecutor:
+    """Thread pool with a bounded concurrency and a bounded waiting queue.
+
+    At most max_workers calls run at the same time, the others wait for a slot
+    on the event loop without blocking it. When max_queue calls are already
+    waiting, new calls are rejected with a 503 instead of piling up.
+    Counters are only updated from the event loop thread, so they need no lock.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int = 0, name: str = "executor") -> None:
+        """Class constructor.
+
+        Args:
+            max_workers (int): maximum number of calls running at the same time.
+            max_queue (int): maximum number of calls waiting for a worker, 0 means unbounded.
+            name (str): prefix of the worker threads names.
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.semaphore = asyncio.Semaphore(max_workers)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run the function in the pool and wait for its result.
+
+        Args:
+            func (Callable[..., Any]): blocking function to run.
+            args (Any): arguments of the function.
+
+        Raises:
+            HTTPException: if the waiting queue is full.
+
+        Returns:
+            Any: the result of the function.
+        """
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later.",
+                headers={"Retry-After": "1"},
+            )
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+        # The slot is freed when the thread is done, not when the caller stops waiting,
+        # a cancelled caller does not let another call start while its thread still runs.
+        future.add_done_callback(self.release)
+        return await asyncio.shield(future)
+
+    def release(self, future: asyncio.Future) -> None:
+        """Free the slot of a call once its thread is done.
+
+        Args:
+            future (asyncio.Future): future of the call.
+        """
+        self.running -= 1
+        self.completed += 1
+        self.semaphore.release()
+
+    def stats(self) -> dict[str, int]:
+        """Counters of the executor.
+
+        Returns:
+            dict[str, int]: workers, running and waiting calls, completed and rejected calls.
+        """
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,59 @@
+"""This module provide the middleware that records the metrics of the requests."""
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.monitoring import RequestMonitor, RequestTimings, request_monitor, request_timings
+
+# Route label of the requests that match no route, their paths are not used to keep the number of labels bounded.
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Record the latency, status code and time breakdown of every HTTP request.
+
+    Add it last so it is the outermost middleware and its latency is the one the client sees.
+    """
+
+    def __init__(self, app: ASGIApp, monitor: RequestMonitor = request_monitor) -> None:
+        """Class constructor.
+
+        Args:
+            app (ASGIApp): the wrapped application.
+            monitor (RequestMonitor): where to record the requests.
+        """
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI request.
+
+        Args:
+            scope (Scope): connection scope.
+            receive (Receive): receive channel.
+            send (Send): send channel.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # An error that escapes the app is answered with a 500 by the server.
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        self.monitor.started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - start
+            request_timings.reset(token)
+            # The router adds the matched route to the scope.
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            self.monitor.finished(scope["method"], route, status_code, seconds, timings)
@@ -0,0 +1,56 @@
+"""This module provide helpers for keyset (cursor) pagination.
+
+The cursor returned to the client is an opaque url safe string
+that holds the sort key of the last returned document,
+its _id and optionally the value of the field the page is sorted by.
+"""
+import base64
+import json
+from typing import Any
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(last_id: ObjectId, sort_value: Any = None) -> str:
+    """Encode the sort key of the last returned document into an opaque cursor.
+
+    Args:
+        last_id (ObjectId): _id of the last document of the page.
+        sort_value (Any): JSON serializable value of the sort field of the last document, if any.
+
+    Returns:
+        str: url safe cursor.
+    """
+    data: dict[str, Any] = {"id": str(last_id)}
+    if sort_value is not None:
+        data["value"] = sort_value
+    payload = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[ObjectId, Any]:
+    """Decode a cursor generated by encode_cursor.
+
+    Args:
+        cursor (str): cursor sent by the client.
+
+    Raises:
+        HTTPException: if the cursor is malformed.
+
+    Returns:
+        tuple[ObjectId, Any]: _id and sort value of the last document of the previous page.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return ObjectId(payload["id"]), payload.get("value")
+    except (ValueError, TypeError, KeyError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
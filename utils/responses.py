@@ -0,0 +1,70 @@
+"""This module provide custom responses."""
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from core.monitoring import SERIALIZATION, timed
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response that adds its serialization time to the request metrics."""
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the content.
+
+        Args:
+            content (Any): JSON compatible python data.
+
+        Returns:
+            bytes: JSON encoded content.
+        """
+        with timed(SERIALIZATION):
+            return super().render(content)
+
+
+class RawJSONResponse(JSONResponse):
+    """JSON response that serializes plain python data without validating it.
+
+    pydantic_core serializes dicts, lists, UUIDs and datetimes straight to JSON bytes,
+    use it for data that is already in the shape of the response model.
+    Bytes are sent as they are, e.g. a cached page that is already encoded.
+    """
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the content.
+
+        Args:
+            content (Any): JSON compatible python data, or JSON encoded bytes.
+
+        Returns:
+            bytes: JSON encoded content.
+        """
+        if isinstance(content, bytes):
+            return content
+        with timed(SERIALIZATION):
+            return pydantic_core.to_json(content)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """Streaming response that closes its body iterator when the response ends.
+
+    When the client disconnects the streaming stops where it is, often while
+    the iterator waits to be resumed. Closing it right away runs its cleanup,
+    e.g. kills the database cursor it reads, instead of waiting for the garbage collector.
+    The body iterator must be an async generator.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Send the response then close the body iterator.
+
+        Args:
+            scope (Scope): connection scope.
+            receive (Receive): receive channel.
+            send (Send): send channel.
+        """
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
@@ -1,17 +1,22 @@
 """This module provide function that we will use for Authentication."""
 
+import hmac
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
+from core.cache import LRUCache
+from core.monitoring import AUTH, BCRYPT, timed
 from core.settings import Settings
 from users.models import User
+from utils.executors import BoundedExecutor
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -19,6 +24,27 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 settings = Settings()
 
+# bcrypt takes hundreds of milliseconds of CPU, it runs in its own threads
+# so a login spike slows down logins only and not the other requests.
+password_executor = BoundedExecutor(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    max_queue=settings.PASSWORD_HASHING_MAX_QUEUE,
+    name="bcrypt",
+)
+
+# Users resolved from a JWT, keyed by (email, expiration) of the token.
+# The signature is still verified on every request, only the db lookup is cached.
+# Every gunicorn worker has its own cache, a changed or deleted user is seen
+# by all the workers after PRINCIPAL_CACHE_TTL_SECONDS at most.
+principal_cache = LRUCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+# Clients allowed to read the monitoring endpoints without the monitoring token.
+monitoring_allowed_ips = {ip.strip() for ip in settings.MONITORING_ALLOWED_IPS.split(",") if ip.strip()}
+
 
 class TokenData(BaseModel):
     """Class to hold the username (user's email)."""
@@ -26,11 +52,11 @@ class TokenData(BaseModel):
     email: str | None = None
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify the user password.
 
     This function will call pwd_context.verify which is an instance
-    of CryptContext to verify the password.
+    of CryptContext to verify the password, in the password_executor threads.
 
     Args:
         plain_password (str): User's plain password.
@@ -39,13 +65,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: True if the password matched the hash, else False.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    with timed(BCRYPT):
+        return await password_executor.run(pwd_context.verify, plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """Hash the password.
 
-    Use CryptContext to hash the password.
+    Use CryptContext to hash the password, in the password_executor threads.
 
     Args:
         password (str): the password to hash.
@@ -53,7 +80,8 @@ def get_password_hash(password: str) -> str:
     Returns:
         str: The secret as encoded by the specified algorithm.
     """
-    return pwd_context.hash(password)
+    with timed(BCRYPT):
+        return await password_executor.run(pwd_context.hash, password)
 
 
 async def get_user(email: str) -> User | None:
@@ -81,7 +109,7 @@ async def authenticate_user(email: str, password: str) -> User | bool:
     user: User | None = await get_user(email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -115,13 +143,29 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
     """Get current user based on the JWT token.
 
-    This function is responsible to get the User instance using
-    the email that is encoded in the JWT token.
+    The time it takes is the auth part of the request metrics.
 
     Args:
         token (Annotated[str, Depends): FastApi oauth2_scheme will provide the function with
         the token that is attached in the Authorization header.
 
+    Returns:
+        User: User instance
+    """
+    with timed(AUTH):
+        return await get_user_from_token(token)
+
+
+async def get_user_from_token(token: str) -> User:
+    """Get the user of a JWT token.
+
+    This function is responsible to get the User instance using
+    the email that is encoded in the JWT token. Users are cached
+    until the token expires, at most PRINCIPAL_CACHE_TTL_SECONDS.
+
+    Args:
+        token (str): the JWT token.
+
     Raises:
         HTTPException: If the there is no email in the token or
         if the token is invalid or there is no user with the provided email
@@ -146,7 +190,38 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
         token_data = TokenData(email=email)
     except InvalidTokenError:
         raise credentials_exception
+    expires_at = payload.get("exp")
+    cache_key = (token_data.email, expires_at)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
     user = await get_user(email=token_data.email)
     if user is None:
         raise credentials_exception
+    ttl = principal_cache.ttl
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    principal_cache.set(cache_key, user, ttl=ttl)
     return user
+
+
+def check_monitoring_access(request: Request) -> None:
+    """Dependency that restricts the monitoring endpoints to the allowed clients.
+
+    The endpoints expose the traffic per route and the state of the caches and the database pool,
+    they answer the clients in MONITORING_ALLOWED_IPS and the requests that send
+    MONITORING_TOKEN as a bearer token, when it is set.
+
+    Args:
+        request (Request): the request to check.
+
+    Raises:
+        HTTPException: If the client is not allowed.
+    """
+    if request.client and request.client.host in monitoring_allowed_ips:
+        return
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if settings.MONITORING_TOKEN and scheme.lower() == "bearer":
+        if hmac.compare_digest(token.encode(), settings.MONITORING_TOKEN.encode()):
+            return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read the monitoring data.")
@@ -0,0 +1,165 @@
+"""This module provide helpers to consume streamed request bodies."""
+import codecs
+import csv
+from collections import deque
+from typing import Any, AsyncIterator
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], encoding: str = "utf-8-sig") -> AsyncIterator[str]:
+    """Split a stream of bytes into text lines.
+
+    Only the current chunk and the incomplete last line are kept in memory.
+
+    Args:
+        chunks (AsyncIterator[bytes]): body chunks as they are received.
+        encoding (str): encoding of the body, the default one drops a leading UTF-8 BOM.
+
+    Yields:
+        str: lines without their line ending.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_numbered_lines(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, str]]:
+    """Number the lines of a stream and skip the blank ones.
+
+    Args:
+        lines (AsyncIterator[str]): lines returned by iter_lines.
+
+    Yields:
+        tuple[int, str]: line number, starting at 1, and line.
+    """
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if line.strip():
+            yield line_number, line
+
+
+class CSVRecordError(ValueError):
+    """A CSV record that can not be parsed, the rest of the file can not be read reliably."""
+
+    def __init__(self, line: int, detail: str) -> None:
+        """Class constructor.
+
+        Args:
+            line (int): number of the first line of the record.
+            detail (str): why the record can not be parsed.
+        """
+        super().__init__(detail)
+        self.line = line
+
+
+class LineFeed:
+    """Iterator over the lines appended to it, it can be read again after it ran out of lines."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "LineFeed":
+        """Return the iterator itself."""
+        return self
+
+    def __next__(self) -> str:
+        """Pop the oldest line.
+
+        Raises:
+            StopIteration: if there is no line left, until more lines are appended.
+
+        Returns:
+            str: the line.
+        """
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+def is_complete_record(lines: list[str]) -> bool:
+    """Check whether lines hold a whole CSV record, i.e. they do not end inside a quoted value.
+
+    The lines are parsed by a scratch reader followed by a sentinel line,
+    the reader only reads the sentinel if the record goes on after the last line.
+
+    Args:
+        lines (list[str]): lines of the record, with their line ending.
+
+    Returns:
+        bool: True if the record ends with the last line, or can not be parsed.
+    """
+    scratch = csv.reader([*lines, "\n"])
+    try:
+        next(scratch)
+    except csv.Error:
+        return True
+    return scratch.line_num <= len(lines)
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, list[str]]]:
+    """Parse the rows of a streamed CSV file, a quoted value can span several lines.
+
+    A single csv.reader parses the whole file, so its line numbers are the ones of the file.
+    Lines are handed to it one whole record at a time and it never runs out of lines in the
+    middle of a record. Only a line with a quote can end a multi-line record, the others are
+    not checked. A quote inside an unquoted value is a plain character, like for csv.reader.
+
+    Args:
+        lines (AsyncIterator[str]): lines returned by iter_lines.
+
+    Raises:
+        CSVRecordError: if a record is longer than the csv field size limit or can not be parsed.
+
+    Yields:
+        tuple[int, list[str]]: number of the first line of the row, and its values. Blank rows are skipped.
+    """
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    record: list[str] = []
+    size = 0
+    async for line in lines:
+        record.append(line + "\n")
+        size += len(line) + 1
+        complete = is_complete_record(record) if '"' in line else len(record) == 1
+        if not complete:
+            if size > csv.field_size_limit():
+                raise CSVRecordError(reader.line_num + 1, "Quoted value longer than the field size limit.")
+            continue
+        line_number, row = read_record(reader, feed, record)
+        record = []
+        size = 0
+        if any(value.strip() for value in row):
+            yield line_number, row
+    if record:
+        # A quoted value that is never closed, the reader returns what it parsed.
+        yield read_record(reader, feed, record)
+
+
+def read_record(reader: Any, feed: LineFeed, record: list[str]) -> tuple[int, list[str]]:
+    """Parse a whole record with the reader of the file.
+
+    Args:
+        reader (Any): csv.reader reading the feed.
+        feed (LineFeed): lines read by the reader.
+        record (list[str]): lines of the record, with their line ending.
+
+    Raises:
+        CSVRecordError: if the record can not be parsed.
+
+    Returns:
+        tuple[int, list[str]]: number of the first line of the record, and its values.
+    """
+    line_number = reader.line_num + 1
+    feed.lines.extend(record)
+    try:
+        return line_number, next(reader)
+    except csv.Error as error:
+        raise CSVRecordError(line_number, str(error))
@@ -0,0 +1,142 @@
+"""Tests of the gzip compression of the responses."""
+import gzip
+import zlib
+from typing import Any
+
+import pytest
+from starlette.datastructures import Headers
+from starlette.types import Message, Receive, Scope, Send
+
+from utils.compression import GZipMiddleware, accepts_gzip
+
+pytestmark = pytest.mark.anyio
+
+BODY = b'{"items": []}' * 200
+
+
+def response_app(body_parts: list[bytes], headers: dict[str, str]) -> Any:
+    """Build an ASGI app that sends a response in parts.
+
+    Args:
+        body_parts (list[bytes]): body messages of the response, it is streamed if there are several.
+        headers (dict[str, str]): headers of the response.
+
+    Returns:
+        Any: the ASGI app.
+    """
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        raw_headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        await send({"type": "http.response.start", "status": 200, "headers": raw_headers})
+        for index, part in enumerate(body_parts):
+            await send({"type": "http.response.body", "body": part, "more_body": index < len(body_parts) - 1})
+
+    return app
+
+
+async def send_request(app: Any, accept_encoding: str | None = "gzip") -> list[Message]:
+    """Send a request through the middleware and collect the messages of the response.
+
+    Args:
+        app (Any): the wrapped ASGI app.
+        accept_encoding (str | None): Accept-Encoding header of the request.
+
+    Returns:
+        list[Message]: the messages sent to the server.
+    """
+    headers = [] if accept_encoding is None else [(b"accept-encoding", accept_encoding.encode())]
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    messages = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    await GZipMiddleware(app, minimum_size=1024)(scope, receive, send)
+    return messages
+
+
+def response_headers(messages: list[Message]) -> Headers:
+    """Get the headers of a response.
+
+    Args:
+        messages (list[Message]): messages of the response.
+
+    Returns:
+        Headers: headers of its start message.
+    """
+    return Headers(raw=messages[0]["headers"])
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "accepted"),
+    [
+        ("gzip", True),
+        ("GZIP", True),
+        ("deflate, gzip;q=0.5", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip;q=0.0, br", False),
+        ("gzip;q=invalid", False),
+        ("deflate, br", False),
+        ("", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str, accepted: bool) -> None:
+    """Gzip is accepted when listed, or the wildcard is, without q=0."""
+    assert accepts_gzip(accept_encoding) is accepted
+
+
+async def test_large_response_is_compressed() -> None:
+    """A response over minimum_size is compressed and its headers updated."""
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(BODY)), "ETag": '"abc"'}
+    messages = await send_request(response_app([BODY], headers))
+
+    headers = response_headers(messages)
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == 'W/"abc"'
+    assert "content-length" not in headers
+    assert gzip.decompress(messages[1]["body"]) == BODY
+    assert len(messages[1]["body"]) < len(BODY)
+
+
+async def test_weak_etag_is_kept() -> None:
+    """A weak ETag is kept as it is."""
+    messages = await send_request(response_app([BODY], {"Content-Type": "application/json", "ETag": 'W/"abc"'}))
+
+    assert response_headers(messages)["etag"] == 'W/"abc"'
+
+
+@pytest.mark.parametrize(
+    ("body", "headers", "accept_encoding"),
+    [
+        (b'{"items": []}', {"Content-Type": "application/json"}, "gzip"),
+        (BODY, {"Content-Type": "application/json"}, None),
+        (BODY, {"Content-Type": "application/json"}, "gzip;q=0"),
+        (BODY, {"Content-Type": "image/png"}, "gzip"),
+        (BODY, {"Content-Type": "application/json", "Content-Encoding": "br"}, "gzip"),
+    ],
+    ids=["small", "not accepted", "refused", "not compressible", "already encoded"],
+)
+async def test_response_is_sent_as_is(body: bytes, headers: dict[str, str], accept_encoding: str | None) -> None:
+    """Responses that must not be compressed are sent unchanged."""
+    messages = await send_request(response_app([body], headers), accept_encoding)
+
+    assert response_headers(messages).get("content-encoding") == headers.get("Content-Encoding")
+    assert messages[1]["body"] == body
+
+
+async def test_streamed_response_flushes_every_chunk() -> None:
+    """A streamed response is compressed and every chunk is flushed."""
+    chunks = [b"id,name\n", b"1,John\n", b"2,Jane\n"]
+    messages = await send_request(response_app(chunks, {"Content-Type": "text/csv"}))
+
+    assert response_headers(messages)["content-encoding"] == "gzip"
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # Each chunk can be decompressed as soon as it is received, before the end of the response.
+    assert [decompressor.decompress(message["body"]) for message in messages[1:]] == chunks
+    assert [message["more_body"] for message in messages[1:]] == [True, True, False]
+    assert decompressor.eof
@@ -0,0 +1,90 @@
+"""Tests of the cancellation of the requests whose client disconnected."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+from core.common_repos import closing_cursor
+from utils.disconnect import CLIENT_CLOSED_REQUEST, cancel_on_disconnect
+
+pytestmark = pytest.mark.anyio
+
+
+class BlockingCursor:
+    """Cursor whose read never ends, it records when it is closed."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.reading = asyncio.Event()
+        self.closed = False
+
+    async def to_list(self, length: int | None) -> list:
+        """Wait forever for the documents.
+
+        Args:
+            length (int | None): maximum number of documents.
+
+        Returns:
+            list: never returns.
+        """
+        self.reading.set()
+        await asyncio.Event().wait()
+        return []
+
+    async def close(self) -> None:
+        """Record the close, which kills the cursor on the server."""
+        self.closed = True
+
+
+def make_request(disconnected: asyncio.Event) -> Request:
+    """Build a request without body whose client disconnects when the event is set.
+
+    Args:
+        disconnected (asyncio.Event): set it to disconnect the client.
+
+    Returns:
+        Request: the request.
+    """
+
+    async def receive() -> dict:
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+
+
+async def read(cursor: BlockingCursor) -> list:
+    """Read a cursor like the repo does.
+
+    Args:
+        cursor (BlockingCursor): the cursor.
+
+    Returns:
+        list: the documents.
+    """
+    async with closing_cursor(cursor):
+        return await cursor.to_list(None)
+
+
+async def test_disconnect_cancels_the_read_and_closes_its_cursor() -> None:
+    """A client that disconnects stops the read, its cursor is closed and the request ends with a 499."""
+    disconnected = asyncio.Event()
+    cursor = BlockingCursor()
+    request = asyncio.ensure_future(cancel_on_disconnect(make_request(disconnected), read(cursor)))
+    await cursor.reading.wait()
+
+    disconnected.set()
+    with pytest.raises(HTTPException) as error:
+        await request
+    assert error.value.status_code == CLIENT_CLOSED_REQUEST
+    await asyncio.sleep(0)
+    assert cursor.closed
+
+
+async def test_result_is_returned_when_the_client_stays() -> None:
+    """The work of a client that stays connected returns its result."""
+
+    async def work() -> str:
+        return "page"
+
+    assert await cancel_on_disconnect(make_request(asyncio.Event()), work()) == "page"
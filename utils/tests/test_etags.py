@@ -0,0 +1,58 @@
+"""Tests of the ETag helpers."""
+import pytest
+
+from utils.etags import content_etag, etag_matches, make_etag, not_modified
+
+
+def test_make_etag_is_a_stable_quoted_value() -> None:
+    """make_etag returns a stable quoted value."""
+    etag = make_etag(1, {"a": 1, "b": 2}, None)
+
+    assert etag == make_etag(1, {"b": 2, "a": 1}, None)
+    assert etag.startswith('"')
+    assert etag.endswith('"')
+
+
+def test_make_etag_changes_with_its_parts() -> None:
+    """make_etag changes with its parts."""
+    assert make_etag(1, {"a": 1}) != make_etag(2, {"a": 1})
+    assert make_etag(1, {"a": 1}) != make_etag(1, {"a": 2})
+    assert make_etag(1, 2) != make_etag(12)
+
+
+@pytest.mark.parametrize(
+    ("if_none_match", "matches"),
+    [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"other", "abc"', True),
+        ('"other",W/"abc"', True),
+        ("*", True),
+        ('"other"', False),
+        ("abc", False),
+    ],
+)
+def test_etag_matches(if_none_match: str | None, matches: bool) -> None:
+    """If-None-Match matches the current ETag, weak or strong, or the wildcard."""
+    assert etag_matches(if_none_match, '"abc"') is matches
+
+
+def test_not_modified_has_no_body_and_keeps_the_etag() -> None:
+    """The 304 response has no body and keeps the ETag."""
+    response = not_modified('"abc"')
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["ETag"] == '"abc"'
+
+
+def test_content_etag_changes_with_the_bytes() -> None:
+    """The ETag of an encoded representation is a quoted hash of its bytes."""
+    etag = content_etag(b'{"items": []}')
+
+    assert etag == content_etag(b'{"items": []}')
+    assert etag != content_etag(b'{"items": [1]}')
+    assert etag.startswith('"')
+    assert etag.endswith('"')
@@ -0,0 +1,75 @@
+"""Tests of the bounded thread pool."""
+import asyncio
+import threading
+from typing import Callable
+
+import pytest
+from fastapi import HTTPException
+
+from utils.executors import BoundedExecutor
+
+pytestmark = pytest.mark.anyio
+
+
+async def wait_for(condition: Callable[[], bool]) -> None:
+    """Let the event loop run until a condition is met.
+
+    Args:
+        condition (Callable[[], bool]): function returning True once the condition is met.
+    """
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("The condition was never met.")
+
+
+async def test_full_queue_is_rejected_with_retry_after() -> None:
+    """A call is rejected with a 503 and a Retry-After once max_queue calls are waiting."""
+    executor = BoundedExecutor(max_workers=1, max_queue=1, name="test-full")
+    release = threading.Event()
+    try:
+        running = asyncio.ensure_future(executor.run(release.wait))
+        waiting = asyncio.ensure_future(executor.run(sum, [1, 2]))
+        await wait_for(lambda: executor.stats()["waiting"] == 1)
+
+        with pytest.raises(HTTPException) as error:
+            await executor.run(sum, [3])
+        assert error.value.status_code == 503
+        assert error.value.headers == {"Retry-After": "1"}
+        assert executor.stats()["rejected"] == 1
+    finally:
+        release.set()
+    assert await running is True
+    assert await waiting == 3
+    assert executor.stats() == {
+        "max_workers": 1,
+        "max_queue": 1,
+        "running": 0,
+        "waiting": 0,
+        "completed": 2,
+        "rejected": 1,
+    }
+
+
+async def test_cancelled_caller_keeps_its_slot_until_the_thread_is_done() -> None:
+    """Cancelling a caller does not let another call run while its thread is still busy."""
+    executor = BoundedExecutor(max_workers=1, name="test-cancel")
+    release = threading.Event()
+    try:
+        cancelled = asyncio.ensure_future(executor.run(release.wait))
+        await wait_for(lambda: executor.stats()["running"] == 1)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+        waiting = asyncio.ensure_future(executor.run(sum, [1, 2]))
+        await asyncio.sleep(0.01)
+        assert executor.stats()["running"] == 1
+        assert executor.stats()["waiting"] == 1
+        assert not waiting.done()
+    finally:
+        release.set()
+    assert await waiting == 3
+    await wait_for(lambda: executor.stats()["completed"] == 2)
+    assert executor.stats()["running"] == 0
@@ -0,0 +1,60 @@
+"""Tests of the keyset pagination cursors."""
+import base64
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from utils.pagination import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("sort_value", [None, 0, 1500.5, "Amman", -3])
+def test_cursor_round_trip(sort_value: object) -> None:
+    """A cursor decodes to the _id and sort value it was encoded with."""
+    last_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(last_id, sort_value)) == (last_id, sort_value)
+
+
+def test_cursor_is_url_safe_without_padding() -> None:
+    """Cursors are url safe and have no padding."""
+    for length in range(1, 6):
+        cursor = encode_cursor(ObjectId(), "x" * length)
+
+        assert "=" not in cursor
+        assert "+" not in cursor
+        assert "/" not in cursor
+
+
+def encoded(payload: bytes) -> str:
+    """Encode a payload the way encode_cursor does.
+
+    Args:
+        payload (bytes): JSON payload of the cursor.
+
+    Returns:
+        str: the cursor.
+    """
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        "%%%",
+        encoded(b"not json"),
+        encoded(b"[]"),
+        encoded(b'{"value": 1}'),
+        encoded(b'{"id": "not an object id"}'),
+        encoded(b'{"id": 1}'),
+    ],
+)
+def test_invalid_cursor_is_a_bad_request(cursor: str) -> None:
+    """A malformed cursor answers 400."""
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid cursor."
@@ -0,0 +1,78 @@
+"""Tests of the cache of the users resolved from a token."""
+import asyncio
+import time
+from datetime import timedelta
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from core.cache import LRUCache
+from utils import security
+from utils.security import create_access_token, get_user_from_token
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture()
+def lookups(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Use an empty principal cache and record the user lookups, only user@example.com exists."""
+    emails = []
+
+    async def get_user(email: str) -> object | None:
+        emails.append(email)
+        return {"email": email} if email == "user@example.com" else None
+
+    monkeypatch.setattr(security, "get_user", get_user)
+    monkeypatch.setattr(security, "principal_cache", LRUCache(max_size=10, ttl=60))
+    return emails
+
+
+async def test_cached_user_is_served_without_lookup(lookups: list[str]) -> None:
+    """The user of a token is looked up once, then served from the cache."""
+    token = create_access_token({"sub": "user@example.com"})
+
+    first = await get_user_from_token(token)
+    assert await get_user_from_token(token) is first
+    assert lookups == ["user@example.com"]
+    assert security.principal_cache.stats()["hits"] == 1
+
+
+async def test_unknown_user_is_not_cached(lookups: list[str]) -> None:
+    """A token of an unknown user is rejected on every request, after a lookup each time."""
+    token = create_access_token({"sub": "unknown@example.com"})
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await get_user_from_token(token)
+        assert error.value.status_code == 401
+    assert lookups == ["unknown@example.com"] * 2
+
+
+async def test_invalid_token_is_rejected_before_the_cache(lookups: list[str]) -> None:
+    """A token signed with another key is rejected even if its user is cached."""
+    await get_user_from_token(create_access_token({"sub": "user@example.com"}))
+
+    with pytest.raises(HTTPException) as error:
+        await get_user_from_token(jwt.encode({"sub": "user@example.com"}, "another key", security.settings.ALGORITHM))
+    assert error.value.status_code == 401
+
+
+async def test_cached_user_expires_after_the_ttl(lookups: list[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    """The user is looked up again once the cache TTL is over."""
+    monkeypatch.setattr(security, "principal_cache", LRUCache(max_size=10, ttl=0.05))
+    token = create_access_token({"sub": "user@example.com"})
+
+    await get_user_from_token(token)
+    await asyncio.sleep(0.06)
+    await get_user_from_token(token)
+    assert lookups == ["user@example.com"] * 2
+
+
+async def test_cached_user_does_not_outlive_the_token(lookups: list[str]) -> None:
+    """A token that expires before the cache TTL is cached until it expires only."""
+    token = create_access_token({"sub": "user@example.com"}, expires_delta=timedelta(seconds=5))
+
+    await get_user_from_token(token)
+    (expires_at,) = [entry[0] for entry in security.principal_cache.entries.values()]
+    assert expires_at - time.monotonic() <= 5
@@ -0,0 +1,80 @@
+"""Tests of the parsing of the streamed request bodies."""
+import csv
+from typing import AsyncIterator
+
+import pytest
+
+from utils.streams import CSVRecordError, iter_csv_rows, iter_lines
+
+pytestmark = pytest.mark.anyio
+
+
+async def as_stream(*chunks: bytes) -> AsyncIterator[bytes]:
+    """Stream body chunks.
+
+    Args:
+        chunks (bytes): chunks of the body.
+
+    Yields:
+        bytes: the chunks.
+    """
+    for chunk in chunks:
+        yield chunk
+
+
+async def parse(body: bytes, chunk_size: int = 4) -> list[tuple[int, list[str]]]:
+    """Parse a CSV body received in small chunks.
+
+    Args:
+        body (bytes): the CSV file.
+        chunk_size (int): size of the chunks the body is received in.
+
+    Returns:
+        list[tuple[int, list[str]]]: line number and values of each row.
+    """
+    starts = range(0, len(body), chunk_size)
+    chunks = [body[start:][:chunk_size] for start in starts]
+    return [row async for row in iter_csv_rows(iter_lines(as_stream(*chunks)))]
+
+
+async def test_lines_are_split_across_chunks() -> None:
+    """Lines split between chunks are joined, the BOM and the CR are dropped."""
+    lines = [line async for line in iter_lines(as_stream(b"\xef\xbb\xbfa,b\r", b"\nc,", b"d"))]
+    assert lines == ["a,b", "c,d"]
+
+
+async def test_quoted_value_spans_several_lines() -> None:
+    """A quoted value with line breaks is a single row with the line breaks kept."""
+    rows = await parse(b'name,bio\nJohn,"first\nsecond\n""third"""\nJane,short\n')
+    assert rows == [(1, ["name", "bio"]), (2, ["John", 'first\nsecond\n"third"']), (5, ["Jane", "short"])]
+
+
+async def test_stray_quote_does_not_swallow_the_next_lines() -> None:
+    """A quote inside an unquoted value is a plain character and ends nothing."""
+    rows = await parse(b'a,O"Brien,b\nc,d,e\nf,g,h\n')
+    assert rows == [(1, ["a", 'O"Brien', "b"]), (2, ["c", "d", "e"]), (3, ["f", "g", "h"])]
+
+
+async def test_line_numbers_after_multi_line_rows_and_blank_lines() -> None:
+    """Rows after multi-line values and skipped blank lines keep the line numbers of the file."""
+    rows = await parse(b'h1,h2\n"x\n\ny",1\n\n"z\nw",2\nlast,3')
+    assert [line for line, _ in rows] == [1, 2, 6, 8]
+    assert rows[1][1] == ["x\n\ny", "1"]
+
+
+async def test_unclosed_quote_returns_what_was_parsed() -> None:
+    """A quoted value that is never closed ends with the file."""
+    rows = await parse(b'a,b\nc,"open\nrest')
+    assert rows == [(1, ["a", "b"]), (2, ["c", "open\nrest\n"])]
+
+
+async def test_unclosed_quote_is_bounded_by_the_field_size_limit() -> None:
+    """A record longer than the field size limit stops the parsing with its line number."""
+    limit = csv.field_size_limit()
+    csv.field_size_limit(20)
+    try:
+        with pytest.raises(CSVRecordError) as error:
+            await parse(b'a,b\nc,"open\n' + b"more\n" * 10)
+    finally:
+        csv.field_size_limit(limit)
+    assert error.value.line == 2